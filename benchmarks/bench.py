@@ -0,0 +1,332 @@
+#! /usr/bin/env python
+"""
+Micro-benchmarks of client-side hot paths, run on synthetic payloads without network access
+
+    python benchmarks/bench.py                 # compare with benchmarks/baseline.json
+    python benchmarks/bench.py --save          # record a new baseline
+    python benchmarks/bench.py -k page -n 10   # run matching benchmarks only, with 10 repeats
+
+Each benchmark reports the best time per call over the repeats and the peak memory allocated by one call. The run
+fails when a benchmark is slower, or allocates more, than its baseline by more than the threshold. Times are compared
+relative to a fixed pure python calibration workload timed between repeats, so a slower or busier machine does not
+fail the gate; baselines are still best recorded on the machine that runs it.
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+from collections import OrderedDict
+
+import requests
+
+from requests.adapters import BaseAdapter
+
+from vat.analytics import GroupCounter
+from vat.fakebrain import SyntheticData
+from vat.page import Page, get_loads
+from vat.vectra import VectraClient
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+BENCH_URL = 'http://bench.invalid'
+
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name):
+    """
+    Register a benchmark; the decorated function does the setup and returns the callable to time
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+class PayloadAdapter(BaseAdapter):
+    """
+    requests transport serving pre-encoded pages of hosts or detections from memory
+    """
+
+    def __init__(self, pages):
+        """
+        :param pages: dict of (path, page number) to encoded response body
+        """
+        super(PayloadAdapter, self).__init__()
+        self.pages = pages
+
+    def send(self, request, stream=False, **kwargs):
+        url = requests.utils.urlparse(request.url)
+        query = dict(p.split('=', 1) for p in url.query.split('&') if '=' in p)
+        body = self.pages[(url.path.rstrip('/'), int(query.get('page', 1)))]
+
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.headers['Content-Type'] = 'application/json'
+        resp.encoding = 'utf-8'
+        resp.raw = io.BytesIO(body)
+        resp.url = request.url
+        resp.request = request
+        return resp
+
+    def close(self):
+        pass
+
+
+def encode_pages(kind, entities, page_size):
+    """
+    :rtype: dict of (path, page number) to encoded page bodies linked with next
+    """
+    path = '/api/v2/' + kind
+    pages = {}
+    count = len(entities)
+    for number, start in enumerate(range(0, count, page_size), 1):
+        next_url = '{url}{path}?page={page}&page_size={size}'.format(url=BENCH_URL, path=path, page=number + 1,
+                                                                     size=page_size)
+        pages[(path, number)] = json.dumps({
+            'count': count,
+            'next': next_url if start + page_size < count else None,
+            'previous': None,
+            'results': entities[start:start + page_size],
+        }).encode('utf-8')
+    return pages
+
+
+def bench_client(kind, entities, page_size):
+    client = VectraClient(url=BENCH_URL, token='token', retry=False)
+    client.session.mount(BENCH_URL, PayloadAdapter(encode_pages(kind, entities, page_size)))
+    return client
+
+
+_DATA = SyntheticData(hosts=2000, detections=5000, seed=0)
+_CACHE = {}
+
+
+def hosts(count=2000):
+    if ('hosts', count) not in _CACHE:
+        _CACHE[('hosts', count)] = [_DATA.host(i, url=BENCH_URL + '/api/v2') for i in range(1, count + 1)]
+    return _CACHE[('hosts', count)]
+
+
+def detections(count=5000):
+    if ('detections', count) not in _CACHE:
+        _CACHE[('detections', count)] = [_DATA.detection(i, url=BENCH_URL + '/api/v2') for i in range(1, count + 1)]
+    return _CACHE[('detections', count)]
+
+
+@benchmark('params.hosts')
+def bench_host_params():
+    args = {'state': 'active', 'threat_gte': 50, 'certainty_gte': 50, 'is_key_asset': True, 'page': 1,
+            'page_size': 5000, 'fields': 'id,name,threat,certainty', 'ordering': '-threat', 'tags': 'server',
+            'unknown': 'ignored'}
+    return lambda: VectraClient._generate_host_params(args)
+
+
+@benchmark('params.detections')
+def bench_detection_params():
+    args = {'state': 'active', 'threat_gte': 50, 'certainty_gte': 50, 'detection_type': 'Port Scan', 'page': 1,
+            'page_size': 5000, 'fields': 'id,type_vname,src_ip', 'ordering': '-last_timestamp', 'src_ip': '10.0.0.1',
+            'unknown': 'ignored'}
+    return lambda: VectraClient._generate_detection_params(args)
+
+
+@benchmark('transform_hosts')
+def bench_transform_hosts():
+    client = VectraClient(url=BENCH_URL, token='token')
+    host_list = list(range(1, 2501)) + ['{url}/api/v2/hosts/{id}'.format(url=BENCH_URL, id=i) for i in range(2501)]
+    return lambda: client._transform_hosts(host_list)
+
+
+def _page_decode(backend, raw):
+    body = encode_pages('detections', detections(), 5000)[('/api/v2/detections', 1)]
+    loads = get_loads(backend)
+
+    def run():
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.encoding = 'utf-8'
+        resp._content = body
+        return Page(resp, loads=loads, raw=raw).json()
+    return run
+
+
+@benchmark('page.decode.json')
+def bench_page_decode_json():
+    return _page_decode('json', raw=False)
+
+
+@benchmark('page.decode.fastest_raw')
+def bench_page_decode_fastest():
+    return _page_decode(None, raw=True)
+
+
+@benchmark('pages.get_all_hosts')
+def bench_get_all_hosts():
+    client = bench_client('hosts', hosts(), 200)
+    return lambda: sum(len(page.json()['results']) for page in client.get_all_hosts(page_size=200))
+
+
+@benchmark('pages.get_all_detections.workers')
+def bench_get_all_detections_workers():
+    client = bench_client('detections', detections(), 500)
+    return lambda: sum(len(page.json()['results'])
+                       for page in client.get_all_detections(page_size=500, max_workers=4))
+
+
+@benchmark('pages.iter_detections')
+def bench_iter_detections():
+    client = bench_client('detections', detections(), 500)
+    return lambda: sum(1 for _ in client.iter_detections(page_size=500))
+
+
+@benchmark('aggregate.dest_ip')
+def bench_aggregate_dest_ip():
+    results = detections()
+    counter = lambda: GroupCounter(keys=['type_vname'], detail_keys=['dst_ip'], skip_none=True)
+    return lambda: counter().update(results).most_common()
+
+
+@benchmark('aggregate.src_ip')
+def bench_aggregate_src_ip():
+    results = detections()
+    return lambda: GroupCounter(keys=['src_ip']).update(results).most_common()
+
+
+@benchmark('stix.generate_package')
+def bench_stix_package():
+    from vat.stix_taxii import TaxiiClient
+    from stix.core import STIXPackage
+    from stix.indicator import Indicator
+
+    class Content(object):
+        def __init__(self, content):
+            self.content = content
+
+    packages = []
+    for i in range(50):
+        package = STIXPackage()
+        for j in range(10):
+            indicator = Indicator(title='indicator-{0}-{1}'.format(i, j))
+            indicator.add_indicator_type('IP Watchlist')
+            package.add_indicator(indicator)
+        packages.append(Content(package.to_xml()))
+    return lambda: TaxiiClient._generate_stix_package(packages)
+
+
+def _calibration():
+    counts = {}
+    for i in range(20000):
+        key = 'k{0}'.format(i % 100)
+        counts[key] = counts.get(key, 0) + 1
+    return sorted(counts.items())
+
+
+def measure(setup, repeat):
+    """
+    Time a benchmark, alternating each repeat with a fixed pure python calibration workload
+    :rtype: dict with the best seconds per call, the median time relative to the calibration workload and the peak
+    bytes allocated by one call
+    """
+    run = setup()
+    timer = timeit.Timer(run)
+    calibration = timeit.Timer(_calibration)
+    number = timer.autorange()[0] if hasattr(timer, 'autorange') else 1
+
+    times, relative = [], []
+    for _ in range(repeat):
+        reference = calibration.timeit(number=3) / 3
+        seconds = timer.timeit(number=number) / number
+        times.append(seconds)
+        relative.append(seconds / reference)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'seconds': min(times), 'relative': sorted(relative)[len(relative) // 2], 'peak_bytes': peak}
+
+
+def compare(name, result, baseline, threshold, memory_threshold):
+    """
+    :rtype: list of regression messages
+    """
+    if not baseline:
+        return []
+    regressions = []
+    ratio = result['relative'] / baseline['relative']
+    if ratio > 1 + threshold:
+        regressions.append('{name}: {ratio:.0%} of baseline time'.format(name=name, ratio=ratio))
+    if result['peak_bytes'] > baseline['peak_bytes'] * (1 + memory_threshold) + 1024:
+        regressions.append('{name}: {ratio:.0%} of baseline peak memory'.format(
+            name=name, ratio=result['peak_bytes'] / float(max(baseline['peak_bytes'], 1))))
+    return regressions
+
+
+def format_time(seconds):
+    for unit, scale in [('s', 1), ('ms', 1e-3), ('us', 1e-6)]:
+        if seconds >= scale:
+            return '{0:.2f} {1}'.format(seconds / scale, unit)
+    return '{0:.0f} ns'.format(seconds / 1e-9)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark client-side hot paths against a stored baseline')
+    parser.add_argument('-k', dest='filter', help='only run benchmarks whose name contains this string')
+    parser.add_argument('-n', '--repeat', type=int, default=7, help='timing repeats (default: %(default)s)')
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='allowed slowdown over the baseline, 0.5 is 50%% (default: %(default)s)')
+    parser.add_argument('--memory-threshold', type=float, default=0.25,
+                        help='allowed peak memory growth over the baseline (default: %(default)s)')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline file (default: benchmarks/baseline.json)')
+    parser.add_argument('--save', action='store_true', help='store results as the new baseline')
+    args = parser.parse_args()
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    results = OrderedDict()
+    regressions = []
+    print('{0:<36}{1:>12}{2:>12}{3:>12}{4:>12}'.format('benchmark', 'time', 'baseline', 'peak KiB', 'baseline'))
+    for name, setup in BENCHMARKS.items():
+        if args.filter and args.filter not in name:
+            continue
+        try:
+            result = measure(setup, args.repeat)
+        except ImportError as e:
+            print('{0:<36}skipped ({1})'.format(name, e))
+            continue
+
+        baseline = baselines.get(name)
+        results[name] = result
+        regressions += compare(name, result, baseline, args.threshold, args.memory_threshold)
+        print('{0:<36}{1:>12}{2:>12}{3:>12.1f}{4:>12}'.format(
+            name, format_time(result['seconds']), format_time(baseline['seconds']) if baseline else '-',
+            result['peak_bytes'] / 1024.0, '{0:.1f}'.format(baseline['peak_bytes'] / 1024.0) if baseline else '-'))
+
+    if args.save:
+        baselines.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print('\nBaseline saved to {0}'.format(args.baseline))
+        return 0
+
+    if regressions:
+        print('\nRegressions over the baseline:')
+        for regression in regressions:
+            print('  ' + regression)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
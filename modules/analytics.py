@@ -0,0 +1,175 @@
+import heapq
+import threading
+
+from collections import Counter
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+def _getter(keys):
+    """
+    Function returning the tuple of values of keys from a dict (missing keys map to None)
+    """
+    keys = list(keys)
+    if not keys:
+        return lambda row: ()
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda row: (row.get(key),)
+    return lambda row: tuple(row.get(key) for key in keys)
+
+
+def flatten_details(detections):
+    """
+    Generator of (detection, detection_detail) pairs for every entry of every detection_detail_set
+    :param detections: iterable of detection dicts
+    """
+    for detection in detections:
+        for detail in detection.get('detection_detail_set') or []:
+            yield detection, detail
+
+
+class GroupCounter(object):
+    """
+    Hash based group-by/count over detections and their flattened detection_detail_set
+    Groups are tuples of the values of keys taken from the detection followed by the values of detail_keys taken from
+    each of its detection details; with detail_keys every detail is counted, otherwise every detection is counted.
+    Counters can be updated page by page and merged.
+    """
+
+    def __init__(self, keys=(), detail_keys=(), skip_none=False):
+        """
+        :param keys: detection fields to group by (ex ['type_vname'])
+        :param detail_keys: detection_detail_set fields to group by (ex ['dst_ip'])
+        :param skip_none: skip groups with a None value instead of counting them (default: False)
+        """
+        if not keys and not detail_keys:
+            raise ValueError('At least one of keys or detail_keys is required')
+
+        self.keys = list(keys)
+        self.detail_keys = list(detail_keys)
+        self.skip_none = skip_none
+        self.counts = Counter()
+        self.rows = 0
+        self._key = _getter(self.keys)
+        self._detail_key = _getter(self.detail_keys)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def update(self, detections):
+        """
+        Count detections (ex the results of one page)
+        :param detections: iterable of detection dicts
+        :rtype: GroupCounter
+        """
+        counts = self.counts
+        if self.detail_keys:
+            groups = (self._key(detection) + self._detail_key(detail)
+                      for detection, detail in flatten_details(detections))
+        else:
+            groups = (self._key(detection) for detection in detections)
+
+        for group in groups:
+            self.rows += 1
+            if not self.skip_none or None not in group:
+                counts[group] += 1
+        return self
+
+    def merge(self, other):
+        """
+        Add the counts of another counter with the same keys
+        :rtype: GroupCounter
+        """
+        if (self.keys, self.detail_keys) != (other.keys, other.detail_keys):
+            raise ValueError('Counters must group by the same keys')
+        self.counts.update(other.counts)
+        self.rows += other.rows
+        return self
+
+    def most_common(self, n=None):
+        """
+        Groups ordered by count, highest first, then by group values
+        :param n: number of groups to return (default: all)
+        :rtype: list of tuples of group values followed by the count
+        """
+        # group values may mix types across detections (ex ports as int and str), compare ties as text
+        order = lambda item: (-item[1], [str(value) for value in item[0]])
+        if n is None:
+            ordered = sorted(self.counts.items(), key=order)
+        else:
+            ordered = heapq.nsmallest(n, self.counts.items(), key=order)
+        return [group + (count,) for group, count in ordered]
+
+
+def count_by(detections, keys=(), detail_keys=(), skip_none=False, top=None):
+    """
+    Group and count detections in one call
+    Same parameters as GroupCounter; top limits the number of groups returned
+    :rtype: list of tuples of group values followed by the count
+    """
+    return GroupCounter(keys=keys, detail_keys=detail_keys, skip_none=skip_none).update(detections).most_common(top)
+
+
+def prefetch(iterable, depth=2):
+    """
+    Generator that consumes iterable in a background thread, keeping up to depth items ready
+    Used to overlap page requests and decoding with aggregation of the previous page
+    :param iterable: iterable to consume (ex page.json()['results'] for page in client.get_all_detections())
+    :param depth: number of items buffered ahead of the consumer
+    """
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except Exception as e:
+            put((None, e))
+
+    thread = threading.Thread(target=produce)
+    thread.daemon = True
+    thread.start()
+
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def detection_pages(vc, args):
+    """
+    Results of the detection pages selected by the common script arguments
+    With --all every page is requested and decoded in the background while the previous page is aggregated,
+    otherwise only the page selected by --page is returned
+    :param vc: VectraClient
+    :param args: dict of parsed arguments (state, page_size, page, fields, order and optionally all)
+    :rtype: iterable of lists of detection dicts
+    """
+    params = dict(state=args['state'], page_size=args['page_size'], page=args['page'], fields=args['fields'],
+                  ordering=args['order'])
+    if args.get('all'):
+        return prefetch(page.json()['results'] for page in vc.get_all_detections(**params))
+    return [vc.get_detections(**params).json()['results']]
@@ -0,0 +1,132 @@
+import threading
+import time
+
+from collections import OrderedDict
+
+
+class ResponseCache(object):
+    """
+    Thread safe LRU cache with per endpoint time to live
+    Keys are (path, params) tuples; the endpoint of a key is the first segment of its path (ex rules for /rules/1)
+    """
+
+    DEFAULT_TTLS = {
+        'hosts': 60,
+        'detections': 60,
+        'rules': 300,
+        'threatFeeds': 300,
+        'tagging': 30,
+    }
+
+    def __init__(self, maxsize=1024, ttl=60, ttls=None, clock=time.time):
+        """
+        Initialize response cache
+        :param maxsize: maximum number of cached entries before least recently used entries are evicted
+        :param ttl: time to live in seconds for endpoints without a specific ttl
+        :param ttls: dict of endpoint to time to live in seconds, merged over DEFAULT_TTLS (ex {'rules': 600})
+        :param clock: function returning the current time in seconds
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.ttls = dict(self.DEFAULT_TTLS, **(ttls or {}))
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def endpoint(path):
+        return path.strip('/').split('/')[0]
+
+    def ttl_for(self, path):
+        """
+        Time to live in seconds for entries of the endpoint of path
+        """
+        return self.ttls.get(self.endpoint(path), self.ttl)
+
+    def get(self, key):
+        """
+        Return cached value for key or None if missing or expired
+        :param key: (path, params) tuple
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires, value = entry
+            if expires <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            # re-insert to mark as most recently used
+            del self._entries[key]
+            self._entries[key] = entry
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Cache value for key, evicting the least recently used entries when full
+        :param key: (path, params) tuple
+        :param value: value to cache
+        :param ttl: time to live in seconds (default: ttl of the endpoint of the key)
+        """
+        ttl = self.ttl_for(key[0]) if ttl is None else ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (self.clock() + ttl, value)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, path, prefix=True):
+        """
+        Remove cached entries for path
+        :param path: path to invalidate (ex /rules/1)
+        :param prefix: also remove entries below path (ex /rules/1/...) (default: True)
+        :rtype: int number of removed entries
+        """
+        path = '/' + path.strip('/')
+        with self._lock:
+            keys = [key for key in self._entries
+                    if key[0] == path or (prefix and key[0].startswith(path + '/'))]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Cache counters
+        :rtype: dict
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': float(self.hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
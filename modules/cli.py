@@ -27,6 +27,15 @@ def commonArgs(parser):
     return parser
 
 
+def traceArgs(parser):
+    parser.add_argument('--trace',
+                        help='write a trace of requests, pages and processing stages to this file: Chrome trace '
+                             'events for .json files (open in chrome://tracing or ui.perfetto.dev), JSON lines '
+                             'otherwise')
+
+    return parser
+
+
 def getPassword():
     return getpass.getpass(prompt='Please enter password')
 
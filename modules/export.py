@@ -0,0 +1,309 @@
+import json
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from collections import namedtuple
+from datetime import datetime
+
+FORMATS = ['parquet', 'arrow']
+TIMESTAMP_FORMATS = ['%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S']
+
+# kind is one of KINDS: category is a dictionary encoded string, tags a list of strings and json a nested value
+# serialized as a JSON string; fields are read in order and the first one present is used (ex v2 and v1 names)
+Column = namedtuple('Column', ['name', 'kind', 'fields'])
+
+HOST_COLUMNS = [
+    Column('id', 'int', ['id']),
+    Column('name', 'string', ['name']),
+    Column('state', 'category', ['state']),
+    Column('threat', 'int', ['threat', 't_score']),
+    Column('certainty', 'int', ['certainty', 'c_score']),
+    Column('severity', 'category', ['severity']),
+    Column('ip', 'string', ['last_source', 'ip']),
+    Column('is_key_asset', 'bool', ['is_key_asset', 'key_asset']),
+    Column('is_targeting_key_asset', 'bool', ['is_targeting_key_asset', 'targets_key_asset']),
+    Column('sensor_name', 'category', ['sensor_name', 'sensor']),
+    Column('last_detection_timestamp', 'timestamp', ['last_detection_timestamp']),
+    Column('tags', 'tags', ['tags']),
+    Column('note', 'string', ['note']),
+    Column('detection_set', 'json', ['detection_set']),
+    Column('host_artifact_set', 'json', ['host_artifact_set']),
+]
+
+DETECTION_COLUMNS = [
+    Column('id', 'int', ['id']),
+    Column('type_vname', 'category', ['type_vname', 'detection_type']),
+    Column('category', 'category', ['category', 'detection_category']),
+    Column('state', 'category', ['state']),
+    Column('threat', 'int', ['threat', 't_score']),
+    Column('certainty', 'int', ['certainty', 'c_score']),
+    Column('src_ip', 'string', ['src_ip']),
+    Column('src_host_id', 'int', ['src_host.id']),
+    Column('is_targeting_key_asset', 'bool', ['is_targeting_key_asset', 'targets_key_asset']),
+    Column('is_triaged', 'bool', ['is_triaged']),
+    Column('triage_rule_id', 'int', ['triage_rule_id']),
+    Column('sensor_name', 'category', ['sensor_name']),
+    Column('first_timestamp', 'timestamp', ['first_timestamp']),
+    Column('last_timestamp', 'timestamp', ['last_timestamp']),
+    Column('tags', 'tags', ['tags']),
+    Column('note', 'string', ['note']),
+    Column('summary', 'json', ['summary']),
+    Column('detection_detail_set', 'json', ['detection_detail_set', 'grouped_details']),
+]
+
+
+def _parse_timestamp(value):
+    """
+    Parse a timestamp returned by the brain (ex 2018-08-31T14:02:19Z) as a naive UTC datetime
+    :rtype: datetime or None if value is empty or not a timestamp
+    """
+    if not value or isinstance(value, datetime):
+        return value or None
+
+    value = value.rstrip('Z')
+    if value.endswith('+00:00'):
+        value = value[:-6]
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    return None
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_bool(value):
+    if value is None or isinstance(value, bool):
+        return value
+    if hasattr(value, 'lower'):
+        return value.lower() in ['true', '1', 'yes']
+    return bool(value)
+
+
+def _to_string(value):
+    return None if value is None else str(value)
+
+
+def _to_tags(value):
+    return None if value is None else [str(tag) for tag in value]
+
+
+def _to_json(value):
+    return None if value is None else json.dumps(value, sort_keys=True)
+
+
+# kind: (arrow type, conversion of the entity value)
+KINDS = {
+    'int': (pa.int64(), _to_int),
+    'float': (pa.float64(), _to_float),
+    'bool': (pa.bool_(), _to_bool),
+    'string': (pa.string(), _to_string),
+    'category': (pa.dictionary(pa.int32(), pa.string()), _to_string),
+    'timestamp': (pa.timestamp('s', tz='UTC'), _parse_timestamp),
+    'tags': (pa.list_(pa.string()), _to_tags),
+    'json': (pa.string(), _to_json),
+}
+
+
+def _field_getter(fields):
+    """
+    Function returning the value of the first field present in an entity; dotted fields read nested dicts
+    """
+    paths = [field.split('.') for field in fields]
+
+    def get(entity):
+        for path in paths:
+            value = entity
+            for key in path:
+                if not isinstance(value, dict) or key not in value:
+                    break
+                value = value[key]
+            else:
+                return value
+        return None
+
+    return get
+
+
+class _Dictionary(object):
+    """
+    Dictionary of a category column shared by every row group
+    Values keep their index for the whole file, so later row groups only append new values to the dictionary, which
+    Arrow IPC files require and which keeps parquet dictionary pages small.
+    """
+
+    def __init__(self):
+        self.index = {}
+        self.values = []
+
+    def encode(self, values):
+        indices = []
+        for value in values:
+            if value is None:
+                indices.append(None)
+                continue
+            if value not in self.index:
+                self.index[value] = len(self.values)
+                self.values.append(value)
+            indices.append(self.index[value])
+        return pa.DictionaryArray.from_arrays(pa.array(indices, type=pa.int32()),
+                                              pa.array(self.values, type=pa.string()))
+
+
+class ColumnarExporter(object):
+    """
+    Write hosts or detections to a Parquet or Arrow IPC file, one row group at a time
+    Entities are converted to typed columns as pages arrive and buffered until row_group_size rows are ready, so an
+    export never holds more than one row group in memory. Repeated strings (ex type_vname, category, state) are
+    dictionary encoded and nested values (ex detection_detail_set) are stored as JSON strings.
+    """
+
+    def __init__(self, path, columns, format='parquet', row_group_size=10000, compression='snappy'):
+        """
+        :param path: output file
+        :param columns: list of Column (ex HOST_COLUMNS or DETECTION_COLUMNS)
+        :param format: parquet or arrow (default: parquet)
+        :param row_group_size: number of rows written per row group (default: 10000)
+        :param compression: parquet compression codec (default: snappy)
+        """
+        if format not in FORMATS:
+            raise ValueError('Supported values for format are {}'.format(', '.join(FORMATS)))
+
+        self.path = path
+        self.columns = list(columns)
+        self.format = format
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self.row_groups = 0
+        self.schema = pa.schema([pa.field(column.name, KINDS[column.kind][0]) for column in self.columns])
+
+        self._getters = [(_field_getter(column.fields), KINDS[column.kind][1]) for column in self.columns]
+        self._dictionaries = dict((column.name, _Dictionary()) for column in self.columns
+                                  if column.kind == 'category')
+        self._buffer = [[] for column in self.columns]
+        self._buffered = 0
+
+        if format == 'parquet':
+            self._writer = pq.ParquetWriter(path, self.schema, compression=compression)
+        else:
+            self._writer = pa.ipc.new_file(path, self.schema,
+                                           options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, entities):
+        """
+        Add entities to the current row group, writing it once row_group_size rows are buffered
+        :param entities: iterable of host or detection dicts
+        """
+        for entity in entities:
+            for values, (get, convert) in zip(self._buffer, self._getters):
+                values.append(convert(get(entity)))
+            self._buffered += 1
+            if self._buffered >= self.row_group_size:
+                self.flush()
+
+    def write_page(self, page):
+        """
+        Add the results of a page
+        :param page: response object or decoded dict with results
+        """
+        if hasattr(page, 'json'):
+            page = page.json()
+        self.write(page['results'])
+
+    def flush(self):
+        """
+        Write buffered rows as a row group
+        """
+        if not self._buffered:
+            return
+
+        arrays = []
+        for column, values in zip(self.columns, self._buffer):
+            if column.kind == 'category':
+                arrays.append(self._dictionaries[column.name].encode(values))
+            else:
+                arrays.append(pa.array(values, type=KINDS[column.kind][0]))
+        batch = pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+        if self.format == 'parquet':
+            self._writer.write_table(pa.Table.from_batches([batch]), row_group_size=self._buffered)
+        else:
+            self._writer.write_batch(batch)
+
+        self.rows += self._buffered
+        self.row_groups += 1
+        self._buffer = [[] for column in self.columns]
+        self._buffered = 0
+
+    def close(self):
+        """
+        Write remaining rows and close the file
+        """
+        if self._writer is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self._writer.close()
+            self._writer = None
+
+
+def _export(pages, path, columns, format, row_group_size, compression):
+    with ColumnarExporter(path, columns, format=format, row_group_size=row_group_size,
+                          compression=compression) as exporter:
+        for page in pages:
+            exporter.write_page(page)
+    return exporter.rows
+
+
+def export_hosts(client, path, format='parquet', row_group_size=10000, compression='snappy', columns=None,
+                 **kwargs):
+    """
+    Export every host to a columnar file, writing row groups while pages are retrieved
+    Other parameters are passed to client.get_all_hosts() (ex state, page_size, max_workers)
+    :param client: VectraClient
+    :param path: output file
+    :param format: parquet or arrow (default: parquet)
+    :param row_group_size: number of rows written per row group (default: 10000)
+    :param compression: parquet compression codec (default: snappy)
+    :param columns: list of Column (default: HOST_COLUMNS)
+    :rtype: int number of exported hosts
+    """
+    return _export(client.get_all_hosts(**kwargs), path, columns or HOST_COLUMNS, format, row_group_size,
+                   compression)
+
+
+def export_detections(client, path, format='parquet', row_group_size=10000, compression='snappy', columns=None,
+                      **kwargs):
+    """
+    Export every detection to a columnar file, writing row groups while pages are retrieved
+    Other parameters are passed to client.get_all_detections() (ex state, page_size, max_workers)
+    :param client: VectraClient
+    :param path: output file
+    :param format: parquet or arrow (default: parquet)
+    :param row_group_size: number of rows written per row group (default: 10000)
+    :param compression: parquet compression codec (default: snappy)
+    :param columns: list of Column (default: DETECTION_COLUMNS)
+    :rtype: int number of exported detections
+    """
+    return _export(client.get_all_detections(**kwargs), path, columns or DETECTION_COLUMNS, format,
+                   row_group_size, compression)
@@ -0,0 +1,986 @@
+import argparse
+import base64
+import json
+import random
+import re
+import threading
+import time
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlencode, urlparse
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib import urlencode
+    from urlparse import parse_qs, urlparse
+
+# detection types per category, as reported by the brain
+DETECTION_TYPES = OrderedDict([
+    ('COMMAND & CONTROL', ['Hidden HTTP Tunnel', 'Hidden HTTPS Tunnel', 'External Remote Access', 'Suspicious Relay',
+                           'Multi-home Fronted Tunnel', 'Malware Update']),
+    ('BOTNET ACTIVITY', ['Outbound DoS', 'Cryptocurrency Mining', 'Abnormal Web Activity', 'Outbound Port Sweep',
+                         'Relay Communication']),
+    ('RECONNAISSANCE', ['Port Scan', 'Internal Darknet Scan', 'SMB Account Scan', 'Port Sweep',
+                        'Suspicious LDAP Query']),
+    ('LATERAL MOVEMENT', ['Suspicious Remote Execution', 'Automated Replication', 'Brute-Force',
+                          'SQL Injection Activity', 'Shell Knocker Client']),
+    ('EXFILTRATION', ['Data Smuggler', 'Smash and Grab', 'Hidden DNS Tunnel']),
+])
+PROTOCOLS = ['tcp', 'udp']
+PORTS = [22, 53, 80, 139, 443, 445, 1433, 3389, 5985, 8080, 8443]
+DOMAINS = ['example.com', 'example.net', 'example.org', 'cdn.example.com', 'updates.example.net']
+TAGS = ['server', 'workstation', 'dmz', 'finance', 'engineering', 'vpn', 'critical']
+SENSORS = ['sensor-{0:02d}'.format(i) for i in range(1, 9)]
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 5000
+
+# query parameter: (entity field, comparison)
+HOST_FILTERS = {
+    'state': ('state', '=='),
+    'name': ('name', '=='),
+    'last_source': ('last_source', '=='),
+    'threat': ('threat', '=='),
+    't_score': ('threat', '=='),
+    'threat_gte': ('threat', '>='),
+    't_score_gte': ('threat', '>='),
+    'certainty': ('certainty', '=='),
+    'c_score': ('certainty', '=='),
+    'certainty_gte': ('certainty', '>='),
+    'c_score_gte': ('certainty', '>='),
+    'is_key_asset': ('is_key_asset', '=='),
+    'key_asset': ('is_key_asset', '=='),
+    'is_targeting_key_asset': ('is_targeting_key_asset', '=='),
+    'targets_key_asset': ('is_targeting_key_asset', '=='),
+    'has_active_traffic': ('has_active_traffic', '=='),
+    'active_traffic': ('has_active_traffic', '=='),
+    'tags': ('tags', 'contains'),
+}
+DETECTION_FILTERS = {
+    'state': ('state', '=='),
+    'src_ip': ('src_ip', '=='),
+    'host_id': ('src_host.id', '=='),
+    'category': ('category', 'iexact'),
+    'detection_category': ('category', 'iexact'),
+    'detection': ('type_vname', 'iexact'),
+    'detection_type': ('type_vname', 'iexact'),
+    'threat': ('threat', '=='),
+    't_score': ('threat', '=='),
+    'threat_gte': ('threat', '>='),
+    't_score_gte': ('threat', '>='),
+    'certainty': ('certainty', '=='),
+    'c_score': ('certainty', '=='),
+    'certainty_gte': ('certainty', '>='),
+    'c_score_gte': ('certainty', '>='),
+    'is_triaged': ('is_triaged', '=='),
+    'is_targeting_key_asset': ('is_targeting_key_asset', '=='),
+    'targets_key_asset': ('is_targeting_key_asset', '=='),
+    'tags': ('tags', 'contains'),
+}
+
+
+def _timestamp(value):
+    return value.strftime(TIMESTAMP_FORMAT) if value else None
+
+
+def _field(entity, name):
+    for key in name.split('.'):
+        if not isinstance(entity, dict):
+            return None
+        entity = entity.get(key)
+    return entity
+
+
+def _coerce(value, like):
+    """
+    Convert a query string value to the type of the entity value it is compared with
+    """
+    if isinstance(like, bool):
+        return str(value).lower() in ['true', '1', 'yes']
+    if isinstance(like, int):
+        try:
+            return int(value)
+        except ValueError:
+            return None
+    return value
+
+
+def _matches(entity, field, op, value):
+    actual = _field(entity, field)
+    if op == 'contains':
+        return value in (actual or [])
+    if actual is None:
+        return False
+    if op == 'iexact':
+        return str(actual).lower() == str(value).lower()
+
+    value = _coerce(value, actual)
+    if value is None:
+        return False
+    if op == '==':
+        return actual == value
+    if op == '>=':
+        return actual >= value
+    if op == '>':
+        return actual > value
+    if op == '<=':
+        return actual <= value
+    if op == '<':
+        return actual < value
+    raise ValueError(op)
+
+
+class SyntheticData(object):
+    """
+    Deterministic generator of realistic hosts, detections and triage rules
+    Entities are computed from their id and the seed on demand, so millions of them cost no memory and the same seed
+    always produces the same brain. Detection n belongs to host ((n - 1) % hosts) + 1 and timestamps grow with ids, so
+    the most recent detections have the highest ids.
+    """
+
+    # seconds between the last timestamps of consecutive detections
+    DETECTION_INTERVAL = 30
+
+    def __init__(self, hosts=1000, detections=5000, rules=0, seed=0, start=datetime(2019, 1, 1)):
+        """
+        :param hosts: number of hosts (default: 1000)
+        :param detections: number of detections (default: 5000)
+        :param rules: number of pre-existing triage rules (default: 0)
+        :param seed: random seed (default: 0)
+        :param start: timestamp of the first detection (default: 2019-01-01)
+        """
+        self.hosts = hosts
+        self.detections = detections
+        self.rules = rules
+        self.seed = seed
+        self.start = start
+
+    def _random(self, kind, entity_id):
+        return random.Random((self.seed << 40) ^ (kind << 36) ^ entity_id)
+
+    def _detection_timestamp(self, detection_id):
+        return self.start + timedelta(seconds=detection_id * self.DETECTION_INTERVAL)
+
+    def host_ip(self, host_id):
+        return '10.{0}.{1}.{2}'.format((host_id >> 16) & 255, (host_id >> 8) & 255, host_id & 255)
+
+    def host_detection_ids(self, host_id):
+        """
+        :rtype: range of the ids of the detections of host_id
+        """
+        return range(host_id, self.detections + 1, self.hosts)
+
+    def last_detection_id(self, host_id):
+        """
+        :rtype: int id of the most recent detection of host_id or None
+        """
+        if host_id > self.detections:
+            return None
+        return host_id + self.hosts * ((self.detections - host_id) // self.hosts)
+
+    def host(self, host_id, url=''):
+        """
+        :param host_id: id of the host
+        :param url: api url used to build entity links (ex http://127.0.0.1:8080/api/v2)
+        :rtype: dict or None if there is no such host
+        """
+        if not 1 <= host_id <= self.hosts:
+            return None
+
+        rng = self._random(1, host_id)
+        detection_ids = self.host_detection_ids(host_id)
+        last_detection = self.last_detection_id(host_id)
+        threat = rng.choice([0, 0, 0, rng.randint(1, 99)]) if last_detection else 0
+        certainty = rng.randint(1, 99) if threat else 0
+        key_asset = rng.random() < 0.05
+        severity = 'critical' if threat >= 50 and certainty >= 50 else 'high' if threat >= 50 else \
+            'medium' if certainty >= 50 else 'low'
+        ip = self.host_ip(host_id)
+
+        return {
+            'id': host_id,
+            'name': 'host-{0:07d}'.format(host_id),
+            'state': 'active' if rng.random() < 0.8 else 'inactive',
+            'threat': threat,
+            't_score': threat,
+            'certainty': certainty,
+            'c_score': certainty,
+            'severity': severity,
+            'last_source': ip,
+            'ip': ip,
+            'previous_ips': [],
+            'has_active_traffic': rng.random() < 0.3,
+            'active_traffic': False,
+            'is_key_asset': key_asset,
+            'key_asset': key_asset,
+            'is_targeting_key_asset': rng.random() < 0.05,
+            'targets_key_asset': False,
+            'last_detection_timestamp': _timestamp(self._detection_timestamp(last_detection) if last_detection else
+                                                   None),
+            'detection_set': ['{url}/detections/{id}'.format(url=url, id=i) for i in detection_ids],
+            'host_artifact_set': [{'type': 'dns', 'value': 'host-{0:07d}.corp.example.com'.format(host_id),
+                                   'source': None}],
+            'sensor': rng.choice(SENSORS),
+            'sensor_name': rng.choice(SENSORS),
+            'tags': rng.sample(TAGS, rng.randint(0, 2)),
+            'note': None,
+            'groups': [],
+            'assigned_to': None,
+            'url': '{url}/hosts/{id}'.format(url=url, id=host_id),
+            'host_url': '{url}/hosts/{id}'.format(url=url, id=host_id).replace('/api/v2', '').replace('/api', ''),
+        }
+
+    def detection_summary(self, detection_id):
+        detection = self.detection(detection_id)
+        return dict((k, detection[k]) for k in ['id', 'type_vname', 'category', 'threat', 'certainty', 'state',
+                                                'first_timestamp', 'last_timestamp'])
+
+    def detection(self, detection_id, url=''):
+        """
+        :param detection_id: id of the detection
+        :param url: api url used to build entity links (ex http://127.0.0.1:8080/api/v2)
+        :rtype: dict or None if there is no such detection
+        """
+        if not 1 <= detection_id <= self.detections:
+            return None
+
+        rng = self._random(2, detection_id)
+        host_id = (detection_id - 1) % self.hosts + 1
+        category = rng.choice(list(DETECTION_TYPES))
+        type_vname = rng.choice(DETECTION_TYPES[category])
+        threat = rng.randint(0, 99)
+        certainty = rng.randint(0, 99)
+        last_timestamp = self._detection_timestamp(detection_id)
+        first_timestamp = last_timestamp - timedelta(seconds=rng.randint(0, 86400 * 7))
+        triaged = rng.random() < 0.1
+        src_ip = self.host_ip(host_id)
+
+        details = []
+        for i in range(rng.randint(1, 4)):
+            dst_port = rng.choice(PORTS)
+            details.append({
+                'id': detection_id * 10 + i,
+                'src_ip': src_ip,
+                'dst_ip': '198.51.{0}.{1}'.format(rng.randint(0, 255), rng.randint(1, 254)),
+                'dst_port': dst_port,
+                'dst_dns': rng.choice(DOMAINS),
+                'protocol': rng.choice(PROTOCOLS),
+                'bytes_sent': rng.randint(0, 10 ** 7),
+                'bytes_received': rng.randint(0, 10 ** 7),
+                'first_timestamp': _timestamp(first_timestamp),
+                'last_timestamp': _timestamp(last_timestamp),
+            })
+
+        return {
+            'id': detection_id,
+            'category': category,
+            'detection_category': category,
+            'type_vname': type_vname,
+            'detection_type': type_vname,
+            'detection': type_vname,
+            'state': 'inactive' if triaged or rng.random() < 0.15 else 'active',
+            'threat': threat,
+            't_score': threat,
+            'certainty': certainty,
+            'c_score': certainty,
+            'first_timestamp': _timestamp(first_timestamp),
+            'last_timestamp': _timestamp(last_timestamp),
+            'src_ip': src_ip,
+            'src_host': {
+                'id': host_id,
+                'ip': src_ip,
+                'name': 'host-{0:07d}'.format(host_id),
+                'url': '{url}/hosts/{id}'.format(url=url, id=host_id),
+            },
+            'sensor': rng.choice(SENSORS),
+            'sensor_name': rng.choice(SENSORS),
+            'is_triaged': triaged,
+            'triage_rule_id': rng.randint(1, self.rules) if triaged and self.rules else None,
+            'is_targeting_key_asset': rng.random() < 0.05,
+            'targets_key_asset': False,
+            'tags': rng.sample(TAGS, rng.randint(0, 1)),
+            'note': None,
+            'assigned_to': None,
+            'summary': {'dst_ips': sorted(set(d['dst_ip'] for d in details)),
+                        'dst_ports': sorted(set(d['dst_port'] for d in details)),
+                        'bytes_sent': sum(d['bytes_sent'] for d in details)},
+            'detection_detail_set': details,
+            'grouped_details': details,
+            'url': '{url}/detections/{id}'.format(url=url, id=detection_id),
+        }
+
+    def rule(self, rule_id):
+        """
+        :rtype: dict triage rule or None if there is no such generated rule
+        """
+        if not 1 <= rule_id <= self.rules:
+            return None
+
+        rng = self._random(3, rule_id)
+        category = rng.choice(list(DETECTION_TYPES))
+        return {
+            'id': rule_id,
+            'description': 'rule-{0:05d}'.format(rule_id),
+            'detection_category': category.lower(),
+            'detection': rng.choice(DETECTION_TYPES[category]).lower(),
+            'triage_category': rng.choice(['misconfiguration', 'authorized scanner', 'backup']),
+            'is_whitelist': rng.random() < 0.2,
+            'all_hosts': False,
+            'host': [],
+            'ip': [self.host_ip(rng.randint(1, self.hosts))],
+            'sensor_luid': [],
+            'remote1_ip': [],
+            'remote1_dns': [rng.choice(DOMAINS)],
+            'remote1_port': [],
+            'priority': rule_id,
+            'created_timestamp': _timestamp(self.start),
+        }
+
+
+class Faults(object):
+    """
+    Latency, throttling and error injection applied to every request
+    """
+
+    def __init__(self, latency=0, throttle_rate=0.0, error_rate=0.0, retry_after=1, error_status=503, seed=0):
+        """
+        :param latency: seconds added to every response, or (min, max) tuple for a random latency (default: 0)
+        :param throttle_rate: fraction of requests answered with 429 and a Retry-After header (default: 0)
+        :param error_rate: fraction of requests answered with error_status (default: 0)
+        :param retry_after: Retry-After value in seconds sent with throttled responses (default: 1)
+        :param error_status: status code of injected errors (default: 503)
+        :param seed: random seed (default: 0)
+        """
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        with self._lock:
+            if isinstance(self.latency, (tuple, list)):
+                return self._random.uniform(*self.latency)
+        return self.latency
+
+    def fault(self):
+        """
+        :rtype: tuple (status, headers, body) of an injected response or None
+        """
+        with self._lock:
+            draw = self._random.random()
+        if draw < self.throttle_rate:
+            return 429, {'Retry-After': str(self.retry_after)}, {'detail': 'Request was throttled.'}
+        if draw < self.throttle_rate + self.error_rate:
+            return self.error_status, {}, {'detail': 'Injected error.'}
+        return None
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeBrain(object):
+    """
+    Local stand-in for a Vectra brain serving the v1 (/api) and v2 (/api/v2) endpoints used by VectraClient
+    Hosts and detections come from SyntheticData; tags, key assets, triage rules, proxies and threat feeds can be
+    changed through the API and are kept in memory. Lists are paginated with count, next and previous, support the
+    fields parameter, the usual filters and ordering, and faults can be injected to exercise retries and throttling.
+    Use as a context manager or call start() and stop():
+
+        with FakeBrain(hosts=100000) as brain:
+            vc = VectraClient(url=brain.url, token=brain.token)
+    """
+
+    def __init__(self, data=None, host='127.0.0.1', port=0, token='token', user='admin', password='admin',
+                 faults=None, **kwargs):
+        """
+        :param data: SyntheticData (default: built from the remaining keyword arguments, ex hosts=1000)
+        :param host: address to listen on (default: 127.0.0.1)
+        :param port: port to listen on (default: 0 for a free port)
+        :param token: API v2 token accepted by the brain, None to accept any (default: token)
+        :param user: API v1 username (default: admin)
+        :param password: API v1 password (default: admin)
+        :param faults: Faults to inject (default: None)
+        """
+        self.data = data or SyntheticData(**kwargs)
+        self.token = token
+        self.user = user
+        self.password = password
+        self.faults = faults
+        self.address = (host, port)
+
+        self.host_overrides = {}
+        self.detection_overrides = {}
+        self.rules = dict((i, self.data.rule(i)) for i in range(1, self.data.rules + 1))
+        self.proxies = {}
+        self.feeds = {}
+        self.uploads = {}
+        self.requests = 0
+        self.statuses = {}
+
+        self._next_id = {'rules': self.data.rules + 1, 'proxies': 1, 'feeds': 1}
+        self._selections = OrderedDict()
+        self._lock = threading.RLock()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def url(self):
+        """
+        Base url of the brain (ex http://127.0.0.1:8080)
+        """
+        host, port = self._server.server_address[:2] if self._server else self.address
+        return 'http://{host}:{port}'.format(host=host, port=port)
+
+    def start(self):
+        """
+        Serve requests on a background thread
+        :rtype: FakeBrain
+        """
+        brain = self
+
+        class Handler(_Handler):
+            pass
+        Handler.brain = brain
+
+        self._server = _Server(self.address, Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """
+        Serve requests until interrupted
+        """
+        if self._server is None:
+            self.start()
+        try:
+            while self._thread.is_alive():
+                self._thread.join(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def stats(self):
+        """
+        :rtype: dict with the number of requests served and responses per status code
+        """
+        with self._lock:
+            return {'requests': self.requests, 'statuses': dict(self.statuses)}
+
+    # entities
+
+    def host(self, host_id, url=''):
+        host = self.data.host(host_id, url=url)
+        if host is not None and host_id in self.host_overrides:
+            host.update(self.host_overrides[host_id])
+        return host
+
+    def detection(self, detection_id, url=''):
+        detection = self.data.detection(detection_id, url=url)
+        if detection is not None and detection_id in self.detection_overrides:
+            detection.update(self.detection_overrides[detection_id])
+        return detection
+
+    def update_host(self, host_id, **fields):
+        with self._lock:
+            self.host_overrides.setdefault(host_id, {}).update(fields)
+            self._selections.clear()
+
+    def update_detection(self, detection_id, **fields):
+        with self._lock:
+            self.detection_overrides.setdefault(detection_id, {}).update(fields)
+            self._selections.clear()
+
+    def select(self, kind, filters, ordering=None):
+        """
+        Ids of the hosts or detections matching filters, in order
+        Unfiltered queries ordered by id or last timestamp are computed without generating entities; other queries
+        scan every entity once and are cached until the next write
+        :param kind: hosts or detections
+        :param filters: list of (field, comparison, value)
+        :param ordering: field to order by, prefixed with - for descending order (ex -last_timestamp)
+        :rtype: sequence of ids
+        """
+        key = (kind, tuple(sorted(filters)), ordering)
+        with self._lock:
+            if key in self._selections:
+                return self._selections[key]
+
+        count = self.data.hosts if kind == 'hosts' else self.data.detections
+        get = self.host if kind == 'hosts' else self.detection
+        ids = range(1, count + 1)
+        if filters:
+            ids = [i for i in ids if all(_matches(get(i), field, op, value) for field, op, value in filters)]
+
+        if ordering:
+            field = ordering.lstrip('-')
+            descending = ordering.startswith('-')
+            overrides = self.host_overrides if kind == 'hosts' else self.detection_overrides
+            # generated timestamps follow ids, unless one was overridden
+            generated = not any(field in fields for fields in overrides.values())
+            if field == 'id' or (generated and kind == 'detections' and field == 'last_timestamp'):
+                sort_key = None
+            elif generated and kind == 'hosts' and field == 'last_detection_timestamp':
+                sort_key = lambda i: (self.data.last_detection_id(i) is None, self.data.last_detection_id(i))
+            else:
+                sort_key = lambda i: (_field(get(i), field) is None, _field(get(i), field))
+
+            if sort_key is None:
+                ids = list(reversed(ids)) if descending else ids
+            else:
+                # nulls sort last in ascending and first in descending order
+                ids = sorted(ids, key=sort_key, reverse=descending)
+
+        return self._remember(key, ids)
+
+    def search(self, kind, alternatives):
+        """
+        Ids of the hosts or detections matching an advanced search, in id order
+        Matches are cached like select() until the next write, so paging through results scans entities once
+        :param kind: hosts or detections
+        :param alternatives: list of lists of (field, comparison, value) terms, any list of which must all match
+        :rtype: list of ids
+        """
+        key = ('search', kind, tuple(tuple(terms) for terms in alternatives))
+        with self._lock:
+            if key in self._selections:
+                return self._selections[key]
+
+        count = self.data.hosts if kind == 'hosts' else self.data.detections
+        get = self.host if kind == 'hosts' else self.detection
+        ids = [i for i in range(1, count + 1)
+               if any(all(_matches(get(i), field, op, value) for field, op, value in terms) for terms in alternatives)]
+        return self._remember(key, ids)
+
+    def _remember(self, key, ids):
+        with self._lock:
+            self._selections[key] = ids
+            while len(self._selections) > 16:
+                self._selections.popitem(last=False)
+        return ids
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    brain = None
+
+    ROUTES = [
+        ('GET', r'hosts/?', 'list_hosts'),
+        ('GET', r'hosts/(\d+)/?', 'get_host'),
+        ('PATCH', r'hosts/(\d+)/?', 'patch_host'),
+        ('GET', r'detections/?', 'list_detections'),
+        ('GET', r'detections/(\d+)/?', 'get_detection'),
+        ('GET', r'tagging/(host|detection)/(\d+)/?', 'get_tags'),
+        ('PATCH', r'tagging/(host|detection)/(\d+)/?', 'set_tags'),
+        ('GET', r'search/(hosts|detections)/?', 'search'),
+        ('GET', r'rules/?', 'list_rules'),
+        ('POST', r'rules/?', 'create_rule'),
+        ('GET', r'rules/(\d+)/?', 'get_rule'),
+        ('PUT', r'rules/(\d+)/?', 'update_rule'),
+        ('DELETE', r'rules/(\d+)/?', 'delete_rule'),
+        ('GET', r'proxies/?', 'list_proxies'),
+        ('POST', r'proxies/?', 'create_proxy'),
+        ('GET', r'proxies/(\d+)/?', 'get_proxy'),
+        ('PATCH', r'proxies/(\d+)/?', 'update_proxy'),
+        ('DELETE', r'proxies/(\d+)/?', 'delete_proxy'),
+        ('GET', r'threatFeeds/?', 'list_feeds'),
+        ('POST', r'threatFeeds/?', 'create_feed'),
+        ('POST', r'threatFeeds/(\d+)/?', 'upload_feed'),
+        ('DELETE', r'threatFeeds/(\d+)/?', 'delete_feed'),
+    ]
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    # request handling
+
+    def _dispatch(self, method):
+        brain = self.brain
+        parsed = urlparse(self.path)
+        self.query = dict((k, v[-1]) for k, v in parse_qs(parsed.query, keep_blank_values=True).items())
+        body = self._read_body()
+
+        with brain._lock:
+            brain.requests += 1
+
+        if brain.faults is not None:
+            delay = brain.faults.delay()
+            if delay:
+                time.sleep(delay)
+
+        match = re.match(r'^/api(/v2)?/(.*)$', parsed.path)
+        if not match:
+            return self._send(404, {'detail': 'Not found.'})
+        self.version = 2 if match.group(1) else 1
+        self.api_url = 'http://{host}{api}'.format(host=self.headers.get('Host'),
+                                                   api='/api/v2' if self.version == 2 else '/api')
+
+        if not self._authorized():
+            return self._send(401, {'detail': 'Authentication credentials were not provided.'})
+
+        if brain.faults is not None:
+            fault = brain.faults.fault()
+            if fault:
+                status, headers, payload = fault
+                return self._send(status, payload, headers=headers)
+
+        allowed = False
+        for route_method, pattern, name in self.ROUTES:
+            route = re.match('^' + pattern + '$', match.group(2))
+            if route:
+                allowed = True
+                if route_method == method:
+                    try:
+                        result = getattr(self, name)(body, *route.groups())
+                    except (ValueError, KeyError, TypeError) as e:
+                        result = 400, {'detail': 'Invalid request: {0}'.format(e)}
+                    return self._send(*result)
+        if allowed:
+            return self._send(405, {'detail': 'Method "{0}" not allowed.'.format(method)})
+        return self._send(404, {'detail': 'Not found.'})
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip() or b'0', 16)
+                if not size:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b''.join(chunks)
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _authorized(self):
+        brain = self.brain
+        authorization = self.headers.get('Authorization') or ''
+        if self.version == 2:
+            return brain.token is None or authorization == 'Token {0}'.format(brain.token)
+
+        if not authorization.startswith('Basic '):
+            return False
+        credentials = '{0}:{1}'.format(brain.user, brain.password).encode('utf-8')
+        return authorization[6:].strip() == base64.b64encode(credentials).decode('ascii')
+
+    def _send(self, status, payload=None, headers=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+        with self.brain._lock:
+            self.brain.statuses[status] = self.brain.statuses.get(status, 0) + 1
+
+    @staticmethod
+    def _json(body):
+        return json.loads(body.decode('utf-8')) if body else {}
+
+    def _page_size(self):
+        return min(int(self.query.get('page_size') or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE)
+
+    def _paginate(self, ids, get):
+        """
+        Page of entities in the DRF format of the brain (count, next, previous, results)
+        """
+        page = int(self.query.get('page') or 1)
+        page_size = self._page_size()
+        start = (page - 1) * page_size
+        if page < 1 or (start and start >= len(ids)):
+            return 404, {'detail': 'Invalid page.'}
+
+        path = urlparse(self.path).path
+        base = 'http://{host}{path}'.format(host=self.headers.get('Host'), path=path)
+
+        def link(number):
+            return '{base}?{query}'.format(base=base, query=urlencode(sorted(dict(self.query, page=number).items())))
+
+        results = [self._project(get(entity_id)) for entity_id in ids[start:start + page_size]]
+
+        return 200, {
+            'count': len(ids),
+            'next': link(page + 1) if start + page_size < len(ids) else None,
+            'previous': link(page - 1) if page > 1 else None,
+            'results': results,
+        }
+
+    def _project(self, entity):
+        fields = [f for f in self.query.get('fields', '').split(',') if f]
+        return dict((k, v) for k, v in entity.items() if k in fields) if fields else entity
+
+    def _filters(self, filters):
+        return [filters[k] + (v,) for k, v in self.query.items() if k in filters and v != '']
+
+    # hosts and detections
+
+    def _host(self, host_id):
+        host = self.brain.host(host_id, url=self.api_url)
+        if host is not None and self.query.get('include_detection_summaries', '').lower() == 'true':
+            ids = list(self.brain.data.host_detection_ids(host_id))[-10:]
+            host['detection_summaries'] = [self.brain.data.detection_summary(i) for i in ids]
+        return host
+
+    def list_hosts(self, body):
+        ids = self.brain.select('hosts', self._filters(HOST_FILTERS), self.query.get('ordering'))
+        return self._paginate(ids, self._host)
+
+    def get_host(self, body, host_id):
+        host = self._host(int(host_id))
+        return (200, self._project(host)) if host else (404, {'detail': 'Not found.'})
+
+    def patch_host(self, body, host_id):
+        host_id = int(host_id)
+        if self.brain.data.host(host_id) is None:
+            return 404, {'detail': 'Not found.'}
+
+        content_type = self.headers.get('Content-Type', '')
+        if 'json' in content_type:
+            fields = self._json(body)
+        else:
+            fields = dict((k, v[-1]) for k, v in parse_qs(body.decode('utf-8')).items())
+        if 'key_asset' in fields:
+            value = fields['key_asset']
+            key_asset = value if isinstance(value, bool) else str(value).lower() == 'true'
+            self.brain.update_host(host_id, key_asset=key_asset, is_key_asset=key_asset)
+        if 'note' in fields:
+            self.brain.update_host(host_id, note=fields['note'])
+        return 200, self._host(host_id)
+
+    def list_detections(self, body):
+        ids = self.brain.select('detections', self._filters(DETECTION_FILTERS), self.query.get('ordering'))
+        return self._paginate(ids, lambda i: self.brain.detection(i, url=self.api_url))
+
+    def get_detection(self, body, detection_id):
+        detection = self.brain.detection(int(detection_id), url=self.api_url)
+        return (200, self._project(detection)) if detection else (404, {'detail': 'Not found.'})
+
+    def get_tags(self, body, kind, entity_id):
+        entity = self.brain.host(int(entity_id)) if kind == 'host' else self.brain.detection(int(entity_id))
+        if entity is None:
+            return 404, {'status': 'failure', 'message': 'Not found.'}
+        return 200, {'status': 'success', 'tag_id': str(entity_id), 'tags': entity['tags']}
+
+    def set_tags(self, body, kind, entity_id):
+        entity_id = int(entity_id)
+        tags = self._json(body)['tags']
+        if not isinstance(tags, list):
+            raise TypeError('tags must be a list')
+        if kind == 'host':
+            if self.brain.data.host(entity_id) is None:
+                return 404, {'status': 'failure', 'message': 'Not found.'}
+            self.brain.update_host(entity_id, tags=tags)
+        else:
+            if self.brain.data.detection(entity_id) is None:
+                return 404, {'status': 'failure', 'message': 'Not found.'}
+            self.brain.update_detection(entity_id, tags=tags)
+        return 200, {'status': 'success', 'tag_id': str(entity_id), 'tags': tags}
+
+    def search(self, body, kind):
+        """
+        Subset of the advanced search language: entity.field:value terms, optionally quoted or prefixed with a
+        comparison (>=, >, <=, <), combined with AND and OR (AND binds tighter)
+        """
+        query = self.query.get('query_string', '')
+        get = self._host if kind == 'hosts' else lambda i: self.brain.detection(i, url=self.api_url)
+
+        alternatives = []
+        for alternative in re.split(r'\s+OR\s+', query, flags=re.IGNORECASE):
+            terms = []
+            for term in re.split(r'\s+AND\s+', alternative.strip(), flags=re.IGNORECASE):
+                match = re.match(r'^\(?\s*\w+\.([\w.]+):(>=|<=|>|<)?"?([^"]*?)"?\s*\)?$', term.strip())
+                if not match:
+                    raise ValueError('unsupported query term {0!r}'.format(term))
+                field, op, value = match.groups()
+                terms.append((field, op or '==', value))
+            alternatives.append(terms)
+
+        return self._paginate(self.brain.search(kind, alternatives), get)
+
+    # rules
+
+    def list_rules(self, body):
+        brain = self.brain
+        with brain._lock:
+            ids = sorted(brain.rules)
+        return self._paginate(ids, lambda i: brain.rules[i])
+
+    def get_rule(self, body, rule_id):
+        rule = self.brain.rules.get(int(rule_id))
+        return (200, rule) if rule else (404, {'detail': 'Not found.'})
+
+    def create_rule(self, body):
+        rule = self._json(body)
+        for field in ['detection_category', 'detection', 'triage_category', 'description']:
+            if not rule.get(field):
+                return 400, {'detail': '{0} is required'.format(field)}
+
+        brain = self.brain
+        with brain._lock:
+            rule_id = brain._next_id['rules']
+            brain._next_id['rules'] += 1
+            rule = dict({'host': [], 'ip': [], 'sensor_luid': [], 'remote1_ip': [], 'remote1_dns': [],
+                         'remote1_port': [], 'all_hosts': False, 'is_whitelist': False}, **rule)
+            rule.update(id=rule_id, priority=rule_id, created_timestamp=_timestamp(datetime.utcnow()))
+            brain.rules[rule_id] = rule
+        return 201, rule
+
+    def update_rule(self, body, rule_id):
+        rule_id = int(rule_id)
+        brain = self.brain
+        with brain._lock:
+            if rule_id not in brain.rules:
+                return 404, {'detail': 'Not found.'}
+            rule = dict(brain.rules[rule_id], **self._json(body))
+            rule['id'] = rule_id
+            brain.rules[rule_id] = rule
+        return 200, rule
+
+    def delete_rule(self, body, rule_id):
+        with self.brain._lock:
+            if self.brain.rules.pop(int(rule_id), None) is None:
+                return 404, {'detail': 'Not found.'}
+        return 200, {'_meta': {'level': 'success', 'message': 'Successfully deleted triage rule'}}
+
+    # proxies
+
+    def list_proxies(self, body):
+        with self.brain._lock:
+            return 200, {'proxies': [self.brain.proxies[i] for i in sorted(self.brain.proxies)]}
+
+    def get_proxy(self, body, proxy_id):
+        proxy = self.brain.proxies.get(int(proxy_id))
+        return (200, {'proxies': proxy}) if proxy else (404, {'detail': 'Not found.'})
+
+    def create_proxy(self, body):
+        payload = self._json(body)['proxy']
+        brain = self.brain
+        with brain._lock:
+            proxy_id = brain._next_id['proxies']
+            brain._next_id['proxies'] += 1
+            proxy = {'id': proxy_id, 'ip': payload['address'], 'considerProxy': payload.get('considerProxy', True),
+                     'source': 'user'}
+            brain.proxies[proxy_id] = proxy
+        return 200, {'proxy': proxy}
+
+    def update_proxy(self, body, proxy_id):
+        payload = self._json(body)['proxy']
+        with self.brain._lock:
+            proxy = self.brain.proxies.get(int(proxy_id))
+            if proxy is None:
+                return 404, {'detail': 'Not found.'}
+            if payload.get('address'):
+                proxy['ip'] = payload['address']
+            if 'considerProxy' in payload:
+                proxy['considerProxy'] = payload['considerProxy']
+        return 200, {'proxy': proxy}
+
+    def delete_proxy(self, body, proxy_id):
+        with self.brain._lock:
+            if self.brain.proxies.pop(int(proxy_id), None) is None:
+                return 404, {'detail': 'Not found.'}
+        return 200, {'_meta': {'level': 'success', 'message': 'Successfully deleted proxy'}}
+
+    # threat feeds
+
+    def list_feeds(self, body):
+        with self.brain._lock:
+            return 200, {'threatFeeds': [self.brain.feeds[i] for i in sorted(self.brain.feeds)]}
+
+    def create_feed(self, body):
+        payload = self._json(body)['threatFeed']
+        brain = self.brain
+        with brain._lock:
+            feed_id = brain._next_id['feeds']
+            brain._next_id['feeds'] += 1
+            feed = dict(payload, id=str(feed_id))
+            brain.feeds[feed_id] = feed
+        return 201, {'threatFeed': feed}
+
+    def upload_feed(self, body, feed_id):
+        feed_id = int(feed_id)
+        with self.brain._lock:
+            feed = self.brain.feeds.get(feed_id)
+            if feed is None:
+                return 404, {'detail': 'Not found.'}
+            self.brain.uploads[feed_id] = len(body)
+        return 200, {'threatFeed': feed, 'bytes': len(body)}
+
+    def delete_feed(self, body, feed_id):
+        with self.brain._lock:
+            if self.brain.feeds.pop(int(feed_id), None) is None:
+                return 404, {'detail': 'Not found.'}
+            self.brain.uploads.pop(int(feed_id), None)
+        return 200, {'_meta': {'level': 'success', 'message': 'Successfully deleted threat feed'}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a synthetic Vectra brain for offline and load testing')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=8080, help='port to listen on (default: %(default)s)')
+    parser.add_argument('--token', default='token', help='API v2 token (default: %(default)s)')
+    parser.add_argument('--hosts', type=int, default=1000, help='number of hosts (default: %(default)s)')
+    parser.add_argument('--detections', type=int, default=5000, help='number of detections (default: %(default)s)')
+    parser.add_argument('--rules', type=int, default=0, help='number of triage rules (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default: %(default)s)')
+    parser.add_argument('--latency', type=float, default=0, help='seconds added to every response')
+    parser.add_argument('--throttle-rate', type=float, default=0, help='fraction of requests answered with 429')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests answered with 503')
+    args = parser.parse_args()
+
+    faults = Faults(latency=args.latency, throttle_rate=args.throttle_rate, error_rate=args.error_rate,
+                    seed=args.seed)
+    brain = FakeBrain(data=SyntheticData(hosts=args.hosts, detections=args.detections, rules=args.rules,
+                                         seed=args.seed),
+                      host=args.host, port=args.port, token=args.token, faults=faults)
+    brain.start()
+    print('Serving fake brain on {url} (token: {token})'.format(url=brain.url, token=args.token))
+    brain.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import codecs
+import json
+
+WHITESPACE = ' \t\n\r'
+
+
+class _Buffer(object):
+    """
+    Text buffer fed incrementally from an iterable of byte chunks
+    """
+
+    def __init__(self, chunks, encoding='utf-8'):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.text = ''
+        self.pos = 0
+        self.exhausted = False
+
+    def fill(self, size=1):
+        """
+        Read chunks until at least size characters are buffered past the current position
+        :rtype: bool (False when the stream is exhausted)
+        """
+        if self.pos:
+            self.text = self.text[self.pos:]
+            self.pos = 0
+
+        while len(self.text) < size and not self.exhausted:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                self.text += self.decoder.decode(b'', final=True)
+                self.exhausted = True
+            elif chunk:
+                self.text += self.decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        return len(self.text) >= size
+
+    def peek(self):
+        """
+        Skip whitespace and return the next significant character without consuming it
+        """
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                raise ValueError('Unexpected end of JSON document')
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError('Expecting {0!r} at position {1}'.format(char, self.pos))
+        self.pos += 1
+
+    def decode(self, decoder):
+        """
+        Decode the next complete JSON value, reading more chunks until the value is terminated
+        The buffered text grows geometrically between attempts so large values are not re-parsed chunk by chunk
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+                # a number at the end of the buffer may continue in the next chunk
+                if end < len(self.text) or self.exhausted:
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.exhausted:
+                    raise
+            self.fill(2 * (len(self.text) - self.pos) + 1)
+
+
+def iter_results(chunks, meta=None, key='results', encoding='utf-8'):
+    """
+    Generator to incrementally parse a paginated response and yield one entry of its result list at a time
+    Only the entry being decoded is held in memory; other top level keys (count, next) are stored in meta
+    :param chunks: iterable of bytes (ex response.iter_content())
+    :param meta: dict populated with the remaining top level keys of the document
+    :param key: top level key of the result list (default: results)
+    :param encoding: encoding of the response body (default: utf-8)
+    """
+    meta = {} if meta is None else meta
+    decoder = json.JSONDecoder()
+    buf = _Buffer(chunks, encoding=encoding)
+
+    buf.expect('{')
+    if buf.peek() == '}':
+        return
+
+    while True:
+        name = buf.decode(decoder)
+        buf.expect(':')
+
+        if name == key and buf.peek() == '[':
+            buf.pos += 1
+            if buf.peek() != ']':
+                while True:
+                    yield buf.decode(decoder)
+                    if buf.peek() == ']':
+                        break
+                    buf.expect(',')
+            buf.pos += 1
+        else:
+            meta[name] = buf.decode(decoder)
+
+        if buf.peek() == '}':
+            return
+        buf.expect(',')
@@ -0,0 +1,256 @@
+import threading
+
+from bisect import bisect_left
+from collections import OrderedDict
+
+from requests.compat import urlparse
+
+# upper bounds in seconds of the request latency buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# upper bounds in seconds of the page decoding time buckets
+DECODE_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+# upper bounds in bytes of the response size buckets
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+# name: (type, label names, buckets attribute of the registry, help text)
+METRICS = OrderedDict([
+    ('requests_total', ('counter', ('method', 'endpoint', 'status'), None,
+                        'Requests sent to the brain by method, endpoint and status code')),
+    ('request_duration_seconds', ('histogram', ('method', 'endpoint'), 'latency_buckets',
+                                  'Time from sending a request to receiving the response headers')),
+    ('response_bytes', ('histogram', ('method', 'endpoint'), 'size_buckets',
+                        'Size of response bodies')),
+    ('retries_total', ('counter', ('method', 'endpoint'), None,
+                       'Requests sent again after a connection error or a retryable status code')),
+    ('cache_requests_total', ('counter', ('endpoint', 'result'), None,
+                              'Response cache lookups by endpoint and result (hit, miss)')),
+    ('pages_total', ('counter', ('endpoint',), None,
+                     'Pages returned by get_all_* generators')),
+    ('decode_duration_seconds', ('histogram', ('endpoint',), 'decode_buckets',
+                                 'Time spent decoding the JSON body of pages')),
+])
+
+
+def endpoint_template(path):
+    """
+    Endpoint of a request path or url with ids replaced by {id}, so requests for different entities share metrics
+    ex https://brain/api/v2/hosts/12?fields=id -> /hosts/{id}
+    :param path: path relative to the api url or absolute url
+    :rtype: str
+    """
+    segments = [segment for segment in urlparse(str(path)).path.split('/') if segment]
+    if segments[:1] == ['api']:
+        segments = segments[2:] if segments[1:2] == ['v2'] else segments[1:]
+    return '/' + '/'.join('{id}' if segment.isdigit() else segment for segment in segments)
+
+
+class Histogram(object):
+    """
+    Count of observations per bucket with their sum; not thread safe on its own
+    """
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        """
+        :param buckets: sorted upper bounds of the buckets; larger values are only counted in the +Inf bucket
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """
+        :rtype: list of (upper bound, number of observations less than or equal to it), ending with +Inf
+        """
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def to_dict(self):
+        return {'count': self.count, 'sum': self.sum, 'buckets': self.cumulative()}
+
+
+class MetricsRegistry(object):
+    """
+    Thread safe in-process registry of request metrics for a VectraClient
+    Metrics are labeled by endpoint template (ex /hosts/{id}) rather than by path, so their number stays bounded
+    whatever the number of entities requested.
+    """
+
+    def __init__(self, latency_buckets=LATENCY_BUCKETS, size_buckets=SIZE_BUCKETS, decode_buckets=DECODE_BUCKETS,
+                 prefix='vectra_client'):
+        """
+        :param latency_buckets: upper bounds in seconds of the request_duration_seconds buckets
+        :param size_buckets: upper bounds in bytes of the response_bytes buckets
+        :param decode_buckets: upper bounds in seconds of the decode_duration_seconds buckets
+        :param prefix: prefix of metric names in the Prometheus export
+        """
+        self.latency_buckets = tuple(latency_buckets)
+        self.size_buckets = tuple(size_buckets)
+        self.decode_buckets = tuple(decode_buckets)
+        self.prefix = prefix
+        self._values = dict((name, {}) for name in METRICS)
+        self._lock = threading.Lock()
+
+    def inc(self, name, labels, value=1):
+        """
+        Increment a counter
+        :param name: counter name in METRICS
+        :param labels: tuple of label values in the order of the metric's label names
+        """
+        values = self._values[name]
+        with self._lock:
+            values[labels] = values.get(labels, 0) + value
+
+    def observe(self, name, labels, value):
+        """
+        Record an observation in a histogram
+        :param name: histogram name in METRICS
+        :param labels: tuple of label values in the order of the metric's label names
+        """
+        values = self._values[name]
+        with self._lock:
+            histogram = values.get(labels)
+            if histogram is None:
+                histogram = values[labels] = Histogram(getattr(self, METRICS[name][2]))
+            histogram.observe(value)
+
+    def observe_request(self, method, endpoint, seconds, response=None, error=None):
+        """
+        Record a request attempt
+        The response size is read from the Content-Length header, or from the body when it was already downloaded, so
+        streamed responses are not read early.
+        :param method: http method
+        :param endpoint: endpoint template (see endpoint_template)
+        :param seconds: time until the response was received or the request failed
+        :param response: requests.Response or None when the request failed
+        :param error: connection error raised, if any
+        """
+        labels = (method, endpoint)
+        status = str(response.status_code) if response is not None else type(error).__name__
+        self.inc('requests_total', labels + (status,))
+        self.observe('request_duration_seconds', labels, seconds)
+        if response is None:
+            return
+
+        size = response.headers.get('Content-Length')
+        if size is not None:
+            self.observe('response_bytes', labels, int(size))
+        elif getattr(response, '_content', False) not in (False, None):
+            self.observe('response_bytes', labels, len(response._content))
+
+    def observe_retry(self, method, endpoint):
+        self.inc('retries_total', (method, endpoint))
+
+    def observe_cache(self, endpoint, hit):
+        self.inc('cache_requests_total', (endpoint, 'hit' if hit else 'miss'))
+
+    def observe_page(self, endpoint):
+        self.inc('pages_total', (endpoint,))
+
+    def observe_decode(self, endpoint, seconds):
+        self.observe('decode_duration_seconds', (endpoint,), seconds)
+
+    def get(self, name, **labels):
+        """
+        Current value of a metric, summed over the label values not given
+        ex registry.get('requests_total', endpoint='/hosts', status='200')
+        :param name: metric name in METRICS
+        :rtype: number for counters, dict with count, sum and cumulative buckets for histograms
+        """
+        metric_type, label_names = METRICS[name][:2]
+        unknown = set(labels) - set(label_names)
+        if unknown:
+            raise ValueError('Unknown labels for {name}: {labels}'.format(name=name, labels=', '.join(sorted(unknown))))
+
+        with self._lock:
+            matches = [value for key, value in self._values[name].items()
+                       if all(labels.get(label, found) == found for label, found in zip(label_names, key))]
+            if metric_type == 'counter':
+                return sum(matches)
+
+            total = Histogram(getattr(self, METRICS[name][2]))
+            for histogram in matches:
+                total.counts = [a + b for a, b in zip(total.counts, histogram.counts)]
+                total.sum += histogram.sum
+                total.count += histogram.count
+            return total.to_dict()
+
+    def snapshot(self):
+        """
+        Copy of every metric
+        :rtype: dict of metric name to list of dicts with the labels and the value (counters) or count, sum and
+        cumulative buckets (histograms)
+        """
+        result = OrderedDict()
+        with self._lock:
+            for name, (metric_type, label_names, _, _) in METRICS.items():
+                samples = []
+                for key, value in sorted(self._values[name].items()):
+                    sample = {'labels': dict(zip(label_names, key))}
+                    if metric_type == 'counter':
+                        sample['value'] = value
+                    else:
+                        sample.update(value.to_dict())
+                    samples.append(sample)
+                result[name] = samples
+        return result
+
+    def reset(self):
+        """
+        Remove every recorded value
+        """
+        with self._lock:
+            for values in self._values.values():
+                values.clear()
+
+    def to_prometheus(self):
+        """
+        Metrics in the Prometheus text exposition format
+        :rtype: str
+        """
+        lines = []
+        snapshot = self.snapshot()
+        for name, (metric_type, _, _, description) in METRICS.items():
+            full_name = '{prefix}_{name}'.format(prefix=self.prefix, name=name) if self.prefix else name
+            lines.append('# HELP {name} {help}'.format(name=full_name, help=description))
+            lines.append('# TYPE {name} {type}'.format(name=full_name, type=metric_type))
+            for sample in snapshot[name]:
+                labels = sample['labels']
+                if metric_type == 'counter':
+                    lines.append(_sample(full_name, labels, sample['value']))
+                    continue
+                for bound, count in sample['buckets']:
+                    lines.append(_sample(full_name + '_bucket', dict(labels, le=_format_value(bound)), count))
+                lines.append(_sample(full_name + '_sum', labels, sample['sum']))
+                lines.append(_sample(full_name + '_count', labels, sample['count']))
+        return '\n'.join(lines) + '\n'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _sample(name, labels, value):
+    if not labels:
+        return '{name} {value}'.format(name=name, value=_format_value(value))
+    label_text = ','.join('{0}="{1}"'.format(label, _escape(labels[label])) for label in sorted(labels))
+    return '{name}{{{labels}}} {value}'.format(name=name, labels=label_text, value=_format_value(value))
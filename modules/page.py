@@ -0,0 +1,117 @@
+import json
+import time
+
+from collections import OrderedDict
+
+
+def _orjson():
+    import orjson
+    return orjson.loads
+
+
+def _ujson():
+    import ujson
+    return ujson.loads
+
+
+def _simplejson():
+    import simplejson
+    return simplejson.loads
+
+
+def _json():
+    def loads(data):
+        # json.loads only accepts bytes from python 3.6
+        if isinstance(data, bytes) and not isinstance(data, str):
+            try:
+                return json.loads(data)
+            except TypeError:
+                return json.loads(data.decode('utf-8'))
+        return json.loads(data)
+    return loads
+
+
+# JSON decoders by name, in order of preference when no backend is requested
+BACKENDS = OrderedDict([
+    ('orjson', _orjson),
+    ('ujson', _ujson),
+    ('simplejson', _simplejson),
+    ('json', _json),
+])
+
+
+def get_loads(backend=None):
+    """
+    JSON decoding function for a backend
+    :param backend: name of a backend in BACKENDS, a function decoding bytes or str, or None for the fastest installed
+    backend
+    :rtype: function
+    """
+    if callable(backend):
+        return backend
+    if backend is not None and backend not in BACKENDS:
+        raise ValueError('Supported values for backend are {}'.format(', '.join(BACKENDS)))
+
+    for name in [backend] if backend else BACKENDS:
+        try:
+            return BACKENDS[name]()
+        except ImportError:
+            if backend:
+                raise
+    return _json()
+
+
+class Page(object):
+    """
+    Page of results wrapping a response whose body is decoded once, on the first call to json()
+    Other attributes (ex status_code, headers, content) are read from the wrapped response, so a page can be used
+    wherever a response was.
+    """
+
+    def __init__(self, response, loads=None, raw=True, on_decode=None):
+        """
+        :param response: requests.Response
+        :param loads: JSON decoding function (default: the fastest installed backend)
+        :param raw: decode the response bytes directly instead of the text decoded by requests (default: True)
+        :param on_decode: function called with the seconds spent decoding the body - optional
+        """
+        self.response = response
+        self._loads = loads or get_loads()
+        self._raw = raw
+        self._on_decode = on_decode
+        self._body = None
+
+    def __getattr__(self, name):
+        if name == 'response':
+            raise AttributeError(name)
+        return getattr(self.response, name)
+
+    def __repr__(self):
+        return '<Page [{0}]>'.format(self.response.status_code)
+
+    def json(self, **kwargs):
+        """
+        Decoded body, cached after the first call
+        kwargs are accepted for compatibility with requests.Response.json() and ignored
+        :rtype: dict
+        """
+        if self._body is None:
+            if self._on_decode is None:
+                self._body = self._loads(self.response.content if self._raw else self.response.text)
+            else:
+                start = time.time()
+                self._body = self._loads(self.response.content if self._raw else self.response.text)
+                self._on_decode(time.time() - start)
+        return self._body
+
+    @property
+    def results(self):
+        return self.json()['results']
+
+    @property
+    def count(self):
+        return self.json().get('count')
+
+    @property
+    def next(self):
+        return self.json().get('next')
@@ -0,0 +1,200 @@
+import json
+import os
+import threading
+
+
+class ProjectedEntity(dict):
+    """
+    Host or detection dict that reports the fields read with entity[field], entity.get(field) and field in entity
+    A field that was not requested for this entity is fetched by requesting the entity again with the updated
+    projection. Reading the whole entity (iteration, keys, items, values, len, copy, dict() or json.dumps) fetches it
+    again with every field, so the caller never sees only the projected subset; the projection then requests every
+    field from then on.
+    """
+
+    def __init__(self, data, projection, refetch, fields=None):
+        """
+        :param data: entity dict
+        :param projection: Projection recording the fields read
+        :param refetch: function returning the entity dict for an id with the current projection
+        :param fields: fields requested for data (set) or None if data has every field
+        """
+        super(ProjectedEntity, self).__init__(data)
+        self._projection = projection
+        self._refetch = refetch
+        self._fields = fields
+
+    def _load(self, field):
+        self._projection.add(field)
+        if self._fields is None or field in self._fields or dict.__contains__(self, field):
+            return
+        fields = self._projection.query()
+        self.update(self._refetch(dict.__getitem__(self, 'id'), fields))
+        self._fields = set(fields.split(','))
+        self._projection.misses += 1
+
+    def _load_all(self):
+        if self._fields is None:
+            return
+        self.update(self._refetch(dict.__getitem__(self, 'id'), None))
+        self._fields = None
+        self._projection.misses += 1
+        self._projection.add_all()
+
+    def __getitem__(self, field):
+        self._load(field)
+        return super(ProjectedEntity, self).__getitem__(field)
+
+    def __contains__(self, field):
+        self._load(field)
+        return super(ProjectedEntity, self).__contains__(field)
+
+    def get(self, field, default=None):
+        self._load(field)
+        return super(ProjectedEntity, self).get(field, default)
+
+    def __iter__(self):
+        self._load_all()
+        return super(ProjectedEntity, self).__iter__()
+
+    def __len__(self):
+        self._load_all()
+        return super(ProjectedEntity, self).__len__()
+
+    def keys(self):
+        self._load_all()
+        return super(ProjectedEntity, self).keys()
+
+    def items(self):
+        self._load_all()
+        return super(ProjectedEntity, self).items()
+
+    def values(self):
+        self._load_all()
+        return super(ProjectedEntity, self).values()
+
+    def copy(self):
+        self._load_all()
+        return dict(self)
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+class Projection(object):
+    """
+    Minimal fields parameter learned from the fields a query actually reads
+    Entities are yielded as ProjectedEntity dicts which record every field accessed. While nothing is known the first
+    page is requested with every field; later pages only request the recorded fields. A field read for the first time
+    on a projected entity is added to the projection and that entity is fetched again by id, so callers always see the
+    same values as without a projection. Fields are saved to path so later runs of the same query start projected.
+    """
+
+    def __init__(self, path=None, fields=None, always=('id',)):
+        """
+        :param path: JSON file where learned fields are loaded from and saved to - optional
+        :param fields: fields known to be needed up front (list) - optional
+        :param always: fields always requested (default: id, required to refetch entities)
+        """
+        self.path = path
+        self.always = set(always)
+        self.fields = set(fields or [])
+        # number of entities fetched again because a field was read that had not been requested
+        self.misses = 0
+        # set once a whole entity was read, after which every field is requested
+        self.all_fields = False
+        self._learned = bool(self.fields)
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            with open(path) as f:
+                fields = json.load(f)
+            self.all_fields = '*' in fields
+            self.fields.update(field for field in fields if field != '*')
+            self._learned = True
+
+    def __len__(self):
+        return len(self.fields)
+
+    @property
+    def learning(self):
+        """
+        True until a page has been read or a field is known; entities are requested with every field while learning
+        """
+        return not self._learned and not self.fields
+
+    def add(self, field):
+        """
+        Record a field read by the caller
+        :rtype: bool True if the field was not part of the projection
+        """
+        with self._lock:
+            if field in self.fields or field in self.always:
+                return False
+            self.fields.add(field)
+            return True
+
+    def add_all(self):
+        """
+        Record that the caller reads whole entities; every field is requested from then on
+        """
+        with self._lock:
+            self.all_fields = True
+
+    def query(self):
+        """
+        Value of the fields parameter
+        :rtype: comma separated string of fields or None while learning or once whole entities were read
+        """
+        with self._lock:
+            if self.all_fields or not self._learned and not self.fields:
+                return None
+            return ','.join(sorted(self.fields | self.always))
+
+    def save(self, path=None):
+        """
+        Write learned fields to path (default: the path the projection was created with)
+        """
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            fields = ['*'] if self.all_fields else sorted(self.fields)
+        with open(path, 'w') as f:
+            json.dump(fields, f)
+
+    def iter_hosts(self, client, **kwargs):
+        """
+        Generator of every host as a ProjectedEntity
+        Same parameters as client.get_hosts() except fields; learned fields are saved when iteration ends
+        :param client: VectraClient
+        """
+        refetch = lambda host_id, fields: client.get_host_by_id(host_id=host_id, fields=fields).json()
+        return self._iter(client.get_hosts, refetch, kwargs)
+
+    def iter_detections(self, client, **kwargs):
+        """
+        Generator of every detection as a ProjectedEntity
+        Same parameters as client.get_detections() except fields; learned fields are saved when iteration ends
+        :param client: VectraClient
+        """
+        refetch = lambda detection_id, fields: client.get_detection_by_id(detection_id=detection_id,
+                                                                          fields=fields).json()
+        return self._iter(client.get_detections, refetch, kwargs)
+
+    def _iter(self, get_page, refetch, kwargs):
+        kwargs.pop('fields', None)
+        page = int(kwargs.pop('page', None) or 1)
+        try:
+            while True:
+                # fields are recomputed for every page so fields learned on previous pages are requested
+                fields = self.query()
+                body = get_page(page=page, fields=fields, **kwargs).json()
+                for entity in body['results']:
+                    yield ProjectedEntity(entity, self, refetch, set(fields.split(',')) if fields else None)
+                self._learned = True
+                if not body.get('next'):
+                    break
+                page += 1
+        finally:
+            self.save()
@@ -0,0 +1,161 @@
+import json
+import sys
+
+try:
+    _intern = sys.intern
+except AttributeError:
+    _intern = intern
+
+
+def _intern_value(value):
+    try:
+        return _intern(value)
+    except TypeError:
+        return value
+
+
+class Record(object):
+    """
+    Compact, read only view of a host or detection
+    Scalar fields listed in FIELDS are kept in slots, repeated strings listed in INTERNED and tag names are interned so
+    every record shares the same string objects, and every other field (ex detection_detail_set) is kept as a single
+    compact JSON string that is only decoded the first time one of those fields is accessed.
+    Fields are read as attributes (ex host.name) or as with a dict (ex host['name'], host.get('note')).
+    """
+
+    __slots__ = ('_nested',)
+
+    FIELDS = ()
+    INTERNED = ()
+    NAME_FIELD = 'name'
+    _slots = frozenset()
+    _interned = frozenset()
+
+    def __init__(self, data):
+        """
+        :param data: host or detection dict as returned by the API
+        """
+        nested = {}
+        for key, value in data.items():
+            if key not in self._slots:
+                nested[key] = value
+            elif key in self._interned:
+                setattr(self, key, _intern_value(value))
+            elif key == 'tags' and value is not None:
+                setattr(self, key, tuple(_intern_value(tag) for tag in value))
+            else:
+                setattr(self, key, value)
+        self._nested = json.dumps(nested, separators=(',', ':')) if nested else None
+
+    def __getattr__(self, name):
+        # only called for fields not stored in a slot, which are looked up in the nested fields
+        if name.startswith('__') or name == '_nested' or name in self._slots:
+            raise AttributeError(name)
+        nested = self._decoded()
+        if name in nested:
+            return nested[name]
+        raise AttributeError(name)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return self.__class__, (self.to_dict(),)
+
+    def __repr__(self):
+        return '{cls}(id={id!r}, name={name!r})'.format(cls=self.__class__.__name__, id=self.get('id'),
+                                                       name=self.get(self.NAME_FIELD))
+
+    def _decoded(self):
+        nested = self._nested
+        if nested is None:
+            return {}
+        if not isinstance(nested, dict):
+            nested = self._nested = json.loads(nested)
+        return nested
+
+    def get(self, key, default=None):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            return default
+
+    def keys(self):
+        """
+        :rtype: list of field names present in the record
+        """
+        return [field for field in self.FIELDS if hasattr(self, field)] + list(self._decoded())
+
+    def to_dict(self):
+        """
+        Rebuild the dict returned by the API
+        """
+        data = dict(self._decoded())
+        for field in self.FIELDS:
+            if hasattr(self, field):
+                value = getattr(self, field)
+                data[field] = list(value) if field == 'tags' and value is not None else value
+        return data
+
+
+def _record_class(name, fields, interned, name_field, doc):
+    return type(name, (Record,), {
+        '__slots__': tuple(fields),
+        '__doc__': doc,
+        'FIELDS': tuple(fields),
+        'INTERNED': tuple(interned),
+        'NAME_FIELD': name_field,
+        '_slots': frozenset(fields),
+        '_interned': frozenset(interned),
+    })
+
+
+Host = _record_class(
+    'Host',
+    fields=['id', 'name', 'state', 'threat', 't_score', 'certainty', 'c_score', 'severity', 'last_source', 'ip',
+            'is_key_asset', 'key_asset', 'is_targeting_key_asset', 'targets_key_asset', 'sensor', 'sensor_name',
+            'last_detection_timestamp', 'tags', 'note', 'url'],
+    interned=['state', 'severity', 'sensor', 'sensor_name'],
+    name_field='name',
+    doc="""
+    Host record, nested fields (ex detection_set, detection_summaries, host_artifact_set) are decoded on access
+    """)
+
+Detection = _record_class(
+    'Detection',
+    fields=['id', 'type_vname', 'detection_type', 'category', 'detection_category', 'state', 'threat', 't_score',
+            'certainty', 'c_score', 'src_ip', 'is_targeting_key_asset', 'targets_key_asset', 'is_triaged',
+            'triage_rule_id', 'sensor', 'sensor_name', 'first_timestamp', 'last_timestamp', 'tags', 'note', 'url'],
+    interned=['type_vname', 'detection_type', 'category', 'detection_category', 'state', 'sensor', 'sensor_name'],
+    name_field='type_vname',
+    doc="""
+    Detection record, nested fields (ex detection_detail_set, grouped_details, src_host, summary) are decoded on
+    access
+    """)
+
+
+def records(record_class, pages):
+    """
+    Generator of records from pages of results
+    :param record_class: Host or Detection
+    :param pages: iterable of response objects or decoded dicts with results (ex client.get_all_hosts())
+    """
+    for page in pages:
+        if hasattr(page, 'json'):
+            page = page.json()
+        for entity in page['results']:
+            yield record_class(entity)
@@ -0,0 +1,344 @@
+import json
+import threading
+import time
+
+from collections import namedtuple
+
+
+class RuleCatalog(object):
+    """
+    Local index of every triage rule by id and by name (description)
+    Every page of /rules is loaded once; rules created, updated or deleted through the client are applied to the
+    index as the writes complete, so it only has to be reloaded when it is older than ttl or a name is not found.
+    """
+
+    def __init__(self, client, ttl=300, page_size=5000, clock=time.time):
+        """
+        :param client: VectraClient (API v2)
+        :param ttl: seconds after which the catalog is reloaded on the next lookup, None to never expire
+        (default: 300)
+        :param page_size: number of rules requested per page when loading (default: 5000)
+        :param clock: function returning the current time in seconds
+        """
+        self.client = client
+        self.ttl = ttl
+        self.page_size = page_size
+        self.clock = clock
+        self.loaded_at = None
+        self.loads = 0
+        self._rules = {}
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._rules)
+
+    def __contains__(self, rule_id):
+        return self.get(rule_id) is not None
+
+    def __iter__(self):
+        """
+        Iterate over rules in id order
+        """
+        self._ensure_loaded()
+        with self._lock:
+            rules = [self._rules[rule_id] for rule_id in sorted(self._rules)]
+        return iter(rules)
+
+    @property
+    def stale(self):
+        """
+        True when the catalog was never loaded or is older than ttl
+        """
+        if self.loaded_at is None:
+            return True
+        return self.ttl is not None and self.clock() - self.loaded_at >= self.ttl
+
+    def load(self):
+        """
+        Reload every page of triage rules and rebuild the indexes
+        :rtype: int number of rules
+        """
+        started = self.clock()
+        rules = {}
+        for page in self.client._get_all_pages(self.client._get_rules_page, {'page_size': self.page_size}):
+            for rule in page.json()['results']:
+                rules[rule['id']] = rule
+
+        names = {}
+        for rule_id in sorted(rules):
+            names.setdefault(rules[rule_id].get('description'), []).append(rule_id)
+
+        with self._lock:
+            self._rules = rules
+            self._names = names
+            self.loaded_at = started
+            self.loads += 1
+        return len(rules)
+
+    def _ensure_loaded(self):
+        if self.stale:
+            self.load()
+
+    def get(self, rule_id):
+        """
+        Triage rule by id; a rule missing from the index is requested by id and added to it
+        :rtype: dict or None if there is no such rule
+        """
+        self._ensure_loaded()
+        rule_id = int(rule_id)
+        with self._lock:
+            rule = self._rules.get(rule_id)
+        if rule is not None:
+            return rule
+
+        resp = self.client.get_rules(rule_id=rule_id)
+        if resp.status_code != 200:
+            return None
+        rule = resp.json()
+        self.put(rule)
+        return rule
+
+    def find(self, name):
+        """
+        Triage rule by name (description); the catalog is reloaded once when the name is not found, in case the rule
+        was created by another client since it was loaded
+        :rtype: dict or None if there is no rule with this name; the rule with the lowest id when several share it
+        """
+        reloaded = self.stale
+        self._ensure_loaded()
+        while True:
+            with self._lock:
+                ids = self._names.get(name)
+                if ids:
+                    return self._rules[ids[0]]
+            if reloaded:
+                return None
+            self.load()
+            reloaded = True
+
+    def find_all(self, name):
+        """
+        :rtype: list of every rule with this name (description), in id order
+        """
+        self._ensure_loaded()
+        with self._lock:
+            return [self._rules[rule_id] for rule_id in self._names.get(name, [])]
+
+    def id_for(self, name):
+        """
+        :rtype: id of the rule with this name or None
+        """
+        rule = self.find(name)
+        return rule['id'] if rule else None
+
+    def put(self, rule):
+        """
+        Add or replace a rule in the index, ex after it was created or updated
+        :param rule: triage rule as returned by the api (dict)
+        """
+        rule_id = int(rule['id'])
+        with self._lock:
+            self._unindex(rule_id)
+            self._rules[rule_id] = rule
+            ids = self._names.setdefault(rule.get('description'), [])
+            ids.append(rule_id)
+            ids.sort()
+
+    def discard(self, rule_id):
+        """
+        Remove a rule from the index, ex after it was deleted
+        """
+        with self._lock:
+            self._unindex(int(rule_id))
+
+    def _unindex(self, rule_id):
+        old = self._rules.pop(rule_id, None)
+        if old is None:
+            return
+        ids = self._names.get(old.get('description'), [])
+        if rule_id in ids:
+            ids.remove(rule_id)
+        if not ids:
+            self._names.pop(old.get('description'), None)
+
+
+# scalar and list fields of a triage rule compared by the reconciler
+RULE_FIELDS = ['detection_category', 'detection', 'triage_category', 'is_whitelist', 'all_hosts']
+RULE_LIST_FIELDS = ['host', 'ip', 'sensor_luid', 'remote1_ip', 'remote1_dns', 'remote1_port']
+
+# action is create, update or delete; changes is a dict of field to (current, desired) values
+RuleChange = namedtuple('RuleChange', ['action', 'name', 'rule_id', 'changes', 'rule'])
+
+
+def load_rules(path):
+    """
+    Read desired triage rules from a JSON or YAML file (YAML requires PyYAML)
+    The file holds a list of rules, or a mapping with a rules list. Rules take the parameters of create_rule (name or
+    description, detection_category, detection_type or detection, triage_category, is_whitelist, all_hosts, host, ip,
+    sensor_luid and remote1_* lists).
+    :rtype: list of dict
+    """
+    with open(path) as f:
+        if path.endswith(('.yml', '.yaml')):
+            import yaml
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    return data['rules'] if isinstance(data, dict) else data
+
+
+class RuleReconciler(object):
+    """
+    Bring the triage rules of a brain to a desired state with as few requests as possible
+    Existing rules are read in one paginated pass and compared field by field with the desired rules, matched by name
+    (description). Only rules that differ are written: one POST per new rule, one PUT per changed rule and, when
+    prune is set, one DELETE per rule missing from the desired state. Writes are sent concurrently.
+    When several existing rules share a desired name, the one with the lowest id is kept and the others are deleted
+    with prune, or reported as an error without it, since the brain could not otherwise reach the desired state.
+    """
+
+    def __init__(self, client, prune=False, max_workers=8):
+        """
+        :param client: VectraClient (API v2)
+        :param prune: delete existing rules that are not in the desired state (default: False)
+        :param max_workers: number of concurrent writes (default: 8)
+        """
+        self.client = client
+        self.prune = prune
+        self.max_workers = max_workers
+
+    def _desired(self, rule):
+        rule = dict(rule)
+        name = rule.pop('name', None) or rule.get('description')
+        if not name:
+            raise KeyError('every desired rule needs a name or description')
+        rule['description'] = name
+        if 'detection_type' in rule:
+            rule['detection'] = rule.pop('detection_type')
+        for field in RULE_LIST_FIELDS:
+            if field in rule and not isinstance(rule[field], list):
+                raise TypeError('{} must be of type: list'.format(field))
+        if 'host' in rule:
+            rule['host'] = self.client._transform_hosts(rule['host'])
+        return rule
+
+    @staticmethod
+    def _comparable(field, value):
+        if field not in RULE_LIST_FIELDS:
+            return value.lower() if isinstance(value, str) and field != 'triage_category' else value
+        # hosts are compared by id since urls depend on the address the brain was reached at
+        if field == 'host':
+            return sorted(str(host).rstrip('/').rsplit('/', 1)[-1] for host in value or [])
+        return sorted(str(item) for item in value or [])
+
+    def _diff(self, current, desired):
+        changes = {}
+        for field in RULE_FIELDS + RULE_LIST_FIELDS:
+            if field not in desired:
+                continue
+            if self._comparable(field, current.get(field)) != self._comparable(field, desired[field]):
+                changes[field] = (current.get(field), desired[field])
+        return changes
+
+    def plan(self, desired_rules):
+        """
+        Changes needed to reach the desired state; the rule catalog is reloaded first
+        :param desired_rules: list of desired rules (see load_rules)
+        :rtype: list of RuleChange, creates then updates then deletes
+        """
+        catalog = self.client.rule_catalog
+        catalog.load()
+
+        desired = {}
+        for rule in desired_rules:
+            rule = self._desired(rule)
+            if rule['description'] in desired:
+                raise ValueError('duplicate desired rule {}'.format(rule['description']))
+            desired[rule['description']] = rule
+
+        creates, updates, deletes, duplicates = [], [], [], []
+        for name in sorted(desired):
+            current = catalog.find_all(name)
+            if not current:
+                # validate new rules before anything is written
+                self.client._generate_rule_payload(**self._create_args(desired[name]))
+                creates.append(RuleChange('create', name, None, {}, desired[name]))
+                continue
+            changes = self._diff(current[0], desired[name])
+            if changes:
+                rule = dict(current[0], **dict((field, new) for field, (old, new) in changes.items()))
+                self._validate(rule)
+                updates.append(RuleChange('update', name, current[0]['id'], changes, rule))
+            duplicates.extend(current[1:])
+
+        if duplicates and not self.prune:
+            raise ValueError('several existing rules share a desired name, use prune to delete all but the lowest '
+                             'id: {}'.format(', '.join('{} (id {})'.format(rule.get('description'), rule['id'])
+                                                       for rule in duplicates)))
+        if self.prune:
+            duplicate_ids = set(rule['id'] for rule in duplicates)
+            for rule in catalog:
+                if rule.get('description') not in desired or rule['id'] in duplicate_ids:
+                    deletes.append(RuleChange('delete', rule.get('description'), rule['id'], {}, rule))
+        return creates + updates + deletes
+
+    def apply(self, changes):
+        """
+        Apply planned changes concurrently
+        :param changes: list of RuleChange returned by plan()
+        :rtype: list of BulkResult in the order of changes, with the RuleChange as id
+        """
+        return self.client._run_bulk(self._apply_change, changes, max_workers=self.max_workers)
+
+    def sync(self, desired_rules, dry_run=False):
+        """
+        Plan and, unless dry_run is set, apply the changes needed to reach the desired state
+        :rtype: tuple (list of RuleChange, list of BulkResult or None for a dry run)
+        """
+        changes = self.plan(desired_rules)
+        return changes, None if dry_run else self.apply(changes)
+
+    def _validate(self, rule):
+        """
+        Validate a complete rule the way new rules are validated, ex an existing rule with planned changes applied
+        """
+        args = dict((field, rule[field]) for field in RULE_FIELDS + RULE_LIST_FIELDS if rule.get(field) is not None)
+        args['description'] = rule.get('description')
+        self.client._generate_rule_payload(**self._create_args(args))
+
+    @staticmethod
+    def _create_args(rule):
+        args = dict(rule)
+        args['detection_type'] = args.pop('detection', None)
+        return args
+
+    def _apply_change(self, change):
+        if change.action == 'create':
+            return self.client.create_rule(**self._create_args(change.rule))
+        if change.action == 'update':
+            return self.client.replace_rule(rule_id=change.rule_id, rule=change.rule)
+        return self.client.delete_rule(rule_id=change.rule_id)
+
+
+def format_plan(changes):
+    """
+    Human readable plan, one line per rule and one line per changed field
+    :param changes: list of RuleChange
+    :rtype: str
+    """
+    if not changes:
+        return 'No changes'
+    symbols = {'create': '+', 'update': '~', 'delete': '-'}
+    lines = []
+    for change in changes:
+        rule_id = '' if change.rule_id is None else ' (id {})'.format(change.rule_id)
+        lines.append('{symbol} {action} {name}{id}'.format(symbol=symbols[change.action], action=change.action,
+                                                         name=change.name, id=rule_id))
+        for field in sorted(change.changes):
+            old, new = change.changes[field]
+            lines.append('    {field}: {old} -> {new}'.format(field=field, old=json.dumps(old), new=json.dumps(new)))
+    counts = dict((action, sum(1 for c in changes if c.action == action)) for action in symbols)
+    lines.append('{create} to create, {update} to update, {delete} to delete'.format(**counts))
+    return '\n'.join(lines)
@@ -0,0 +1,193 @@
+import hashlib
+import re
+import time
+
+from .cache import ResponseCache
+
+# a term is a run of quoted strings, [..] or {..} ranges and characters other than whitespace, parentheses and quotes
+_TOKEN = re.compile(r'\s*(?:(\()|(\))|((?:"(?:\\.|[^"\\])*"|\[[^\]]*\]|\{[^}]*\}|[^\s()"\[\]{}])+))')
+_OPERATORS = {'AND': 'AND', '&&': 'AND', 'OR': 'OR', '||': 'OR', 'NOT': 'NOT', '!': 'NOT'}
+
+
+def _tokenize(query):
+    """
+    :rtype: list of tokens: '(', ')', AND, OR, NOT or a term
+    """
+    tokens = []
+    position = 0
+    query = query.strip()
+    while position < len(query):
+        match = _TOKEN.match(query, position)
+        if not match or match.end() == position:
+            raise ValueError('cannot tokenize query at {0}'.format(position))
+        position = match.end()
+        term = match.group(3)
+        if term is None:
+            tokens.append(match.group(1) or match.group(2))
+        elif term.upper() in _OPERATORS:
+            tokens.append(_OPERATORS[term.upper()])
+        elif tokens and tokens[-1].endswith(':'):
+            # field: value written with a space after the colon
+            tokens[-1] += term
+        else:
+            tokens.append(term)
+    return tokens
+
+
+class _Parser(object):
+    """
+    Recursive descent parser of boolean queries; NOT binds tighter than AND, which binds tighter than OR
+    Nodes are (operator, children) tuples for AND and OR, ('NOT', child) and ('TERM', text).
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        node = self.expression('OR')
+        if self.peek() is not None:
+            raise ValueError('unexpected {0!r}'.format(self.peek()))
+        return node
+
+    def expression(self, operator):
+        operand = (lambda: self.expression('AND')) if operator == 'OR' else self.negation
+        children = [operand()]
+        while self.peek() == operator:
+            self.take()
+            children.append(operand())
+        if len(children) == 1:
+            return children[0]
+
+        flat = []
+        for child in children:
+            flat.extend(child[1] if child[0] == operator else [child])
+        return operator, flat
+
+    def negation(self):
+        if self.peek() == 'NOT':
+            self.take()
+            return 'NOT', self.negation()
+        token = self.take()
+        if token == '(':
+            node = self.expression('OR')
+            if self.take() != ')':
+                raise ValueError('unbalanced parentheses')
+            return node
+        if token is None or token == ')' or token in _OPERATORS.values():
+            raise ValueError('expected a term, found {0!r}'.format(token))
+        return 'TERM', token
+
+
+def _format(node):
+    kind = node[0]
+    if kind == 'TERM':
+        return node[1]
+    if kind == 'NOT':
+        child = _format(node[1])
+        return 'NOT ' + ('({0})'.format(child) if node[1][0] in ('AND', 'OR') else child)
+
+    # AND and OR are commutative and idempotent, so operands are sorted and deduplicated
+    operands = set()
+    for child in node[1]:
+        text = _format(child)
+        operands.add('({0})'.format(text) if kind == 'AND' and child[0] == 'OR' else text)
+    if len(operands) == 1:
+        return operands.pop()
+    return ' {0} '.format(kind).join(sorted(operands))
+
+
+def normalize_query(query):
+    """
+    Canonical form of an advanced search query
+    Whitespace is collapsed, AND, OR and NOT keywords are upper cased and the operands of AND and OR are sorted, so
+    equivalent queries written differently have the same form. Terms and quoted values are left untouched. Queries
+    that cannot be parsed are only normalized for whitespace and keyword case.
+    ex 'host.threat:>=50  and (host.certainty:>=50)' -> 'host.certainty:>=50 AND host.threat:>=50'
+    :param query: advanced search query
+    :rtype: str
+    """
+    query = query or ''
+    try:
+        tokens = _tokenize(query)
+    except ValueError:
+        return ' '.join(query.split())
+    if not tokens:
+        return ''
+    try:
+        return _format(_Parser(tokens).parse())
+    except ValueError:
+        return ' '.join(tokens).replace('( ', '(').replace(' )', ')')
+
+
+def query_fingerprint(query):
+    """
+    Hash of the normalized form of query
+    :rtype: str
+    """
+    return hashlib.sha1(normalize_query(query).encode('utf-8')).hexdigest()
+
+
+class SearchCache(ResponseCache):
+    """
+    Thread safe LRU cache of advanced search pages keyed by query fingerprint, page size and page
+    Queries that only differ by whitespace, keyword case or the order of AND/OR operands share entries. Writes through
+    the client clear every cached search, since tags, key asset flags and triage rules change what queries match.
+    """
+
+    DEFAULT_TTLS = {}
+
+    def __init__(self, maxsize=256, ttl=30, clock=time.time):
+        """
+        Initialize search cache
+        :param maxsize: maximum number of cached pages before least recently used pages are evicted
+        :param ttl: time to live of cached pages in seconds
+        :param clock: function returning the current time in seconds
+        """
+        super(SearchCache, self).__init__(maxsize=maxsize, ttl=ttl, clock=clock)
+        # hits for a query written differently from the query that populated the entry
+        self.normalized_hits = 0
+
+    @staticmethod
+    def key(stype, query, page_size, page=None):
+        """
+        :rtype: (path, params) tuple
+        """
+        return '/search/' + stype, (query_fingerprint(query), int(page_size), int(page or 1))
+
+    def lookup(self, stype, query, page_size, page=None):
+        """
+        Cached response for a search or None if missing or expired
+        """
+        entry = self.get(self.key(stype, query, page_size, page))
+        if entry is None:
+            return None
+        cached_query, resp = entry
+        if cached_query != query:
+            with self._lock:
+                self.normalized_hits += 1
+        return resp
+
+    def store(self, stype, query, page_size, page, resp):
+        """
+        Cache the response of a search
+        """
+        self.set(self.key(stype, query, page_size, page), (query, resp))
+
+    def stats(self):
+        """
+        Cache counters
+        :rtype: dict
+        """
+        stats = super(SearchCache, self).stats()
+        with self._lock:
+            stats['normalized_hits'] = self.normalized_hits
+        return stats
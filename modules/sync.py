@@ -0,0 +1,246 @@
+import json
+import sqlite3
+import threading
+import time
+
+from itertools import islice
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    ip TEXT,
+    state TEXT,
+    threat INTEGER,
+    certainty INTEGER,
+    is_key_asset INTEGER,
+    last_timestamp TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS hosts_name ON hosts (name);
+CREATE INDEX IF NOT EXISTS hosts_ip ON hosts (ip);
+CREATE INDEX IF NOT EXISTS hosts_state ON hosts (state);
+
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY,
+    type_vname TEXT,
+    category TEXT,
+    src_ip TEXT,
+    host_id INTEGER,
+    state TEXT,
+    threat INTEGER,
+    certainty INTEGER,
+    last_timestamp TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS detections_src_ip ON detections (src_ip);
+CREATE INDEX IF NOT EXISTS detections_host_id ON detections (host_id);
+CREATE INDEX IF NOT EXISTS detections_state ON detections (state);
+CREATE INDEX IF NOT EXISTS detections_type_vname ON detections (type_vname);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    entity TEXT PRIMARY KEY,
+    cursor TEXT,
+    synced_at REAL,
+    full_synced_at REAL
+);
+"""
+
+COLUMNS = {
+    'hosts': ('id', 'name', 'ip', 'state', 'threat', 'certainty', 'is_key_asset', 'last_timestamp', 'data'),
+    'detections': ('id', 'type_vname', 'category', 'src_ip', 'host_id', 'state', 'threat', 'certainty',
+                   'last_timestamp', 'data'),
+}
+
+
+class SyncEngine(object):
+    """
+    Local SQLite mirror of hosts and detections kept up to date with delta syncs
+    The first sync loads every entity; later syncs request entities ordered by their last timestamp, newest first, and
+    stop at the cursor stored by the previous sync. Entities deleted on the brain are only dropped by a full sync.
+
+    The API has no modification timestamp to order hosts by, so host deltas are keyed on the last detection time: a
+    host change that comes without a new detection (state, tags, key asset flag, score decay) is not picked up by a
+    delta sync. The same applies to detections triaged or tagged without new events. A full sync is therefore run
+    whenever the last one is older than full_sync_interval.
+    """
+
+    HOST_TIMESTAMP = 'last_detection_timestamp'
+    DETECTION_TIMESTAMP = 'last_timestamp'
+    BATCH_SIZE = 1000
+
+    def __init__(self, client, path='vectra.db', page_size=5000, full_sync_interval=86400, clock=time.time):
+        """
+        :param client: VectraClient
+        :param path: sqlite database file (default: vectra.db)
+        :param page_size: number of entities requested per page (default: 5000)
+        :param full_sync_interval: seconds after which a sync reloads every entity instead of the changes, None to only
+        run full syncs when requested (default: 86400)
+        :param clock: function returning the current time in seconds
+        """
+        self.client = client
+        self.page_size = page_size
+        self.full_sync_interval = full_sync_interval
+        self.clock = clock
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+        # mirrors created before full syncs were tracked
+        if 'full_synced_at' not in [row['name'] for row in self.db.execute('PRAGMA table_info(sync_state)')]:
+            self.db.execute('ALTER TABLE sync_state ADD COLUMN full_synced_at REAL')
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.db.close()
+
+    def cursor(self, entity):
+        """
+        Last timestamp seen by the previous sync of entity (hosts or detections)
+        :rtype: str or None
+        """
+        row = self.db.execute('SELECT cursor FROM sync_state WHERE entity = ?', (entity,)).fetchone()
+        return row['cursor'] if row else None
+
+    def full_sync_due(self, entity):
+        """
+        True when entity (hosts or detections) was never fully synced or its last full sync is older than
+        full_sync_interval
+        :rtype: bool
+        """
+        row = self.db.execute('SELECT full_synced_at FROM sync_state WHERE entity = ?', (entity,)).fetchone()
+        if row is None or row['full_synced_at'] is None:
+            return True
+        return self.full_sync_interval is not None and self.clock() - row['full_synced_at'] >= self.full_sync_interval
+
+    def sync(self, full=False):
+        """
+        Sync hosts and detections
+        :param full: reload every entity instead of the changes since the last sync, also done when a full sync is due
+        :rtype: dict of entity to number of upserted rows
+        """
+        return {
+            'hosts': self.sync_hosts(full=full),
+            'detections': self.sync_detections(full=full),
+        }
+
+    def sync_hosts(self, full=False):
+        """
+        :param full: reload every host instead of the changes since the last sync
+        :rtype: int number of upserted hosts
+        """
+        return self._sync('hosts', self.client.iter_hosts, self.HOST_TIMESTAMP, self._host_row, full)
+
+    def sync_detections(self, full=False):
+        """
+        :param full: reload every detection instead of the changes since the last sync
+        :rtype: int number of upserted detections
+        """
+        return self._sync('detections', self.client.iter_detections, self.DETECTION_TIMESTAMP, self._detection_row,
+                          full)
+
+    def _sync(self, table, iterate, timestamp_field, to_row, full):
+        started = self.clock()
+        cursor = None if full or self.full_sync_due(table) else self.cursor(table)
+        newest = cursor
+        timestamp_column = COLUMNS[table].index('last_timestamp')
+        changed = self._changed(iterate(ordering='-' + timestamp_field, page_size=self.page_size), timestamp_field,
+                                cursor)
+
+        upserted = 0
+        with self._lock, self.db:
+            if cursor is None:
+                self.db.execute('DELETE FROM {table}'.format(table=table))
+                full_synced_at = started
+            else:
+                full_synced_at = self.db.execute('SELECT full_synced_at FROM sync_state WHERE entity = ?',
+                                                 (table,)).fetchone()['full_synced_at']
+
+            while True:
+                rows = [to_row(entity) for entity in islice(changed, self.BATCH_SIZE)]
+                if not rows:
+                    break
+                self.db.executemany('INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})'.format(
+                    table=table, columns=', '.join(COLUMNS[table]), placeholders=', '.join('?' * len(COLUMNS[table]))),
+                    rows)
+                upserted += len(rows)
+                timestamps = [row[timestamp_column] for row in rows if row[timestamp_column]]
+                timestamps += [newest] if newest else []
+                newest = max(timestamps) if timestamps else None
+
+            self.db.execute('INSERT OR REPLACE INTO sync_state (entity, cursor, synced_at, full_synced_at) '
+                            'VALUES (?, ?, ?, ?)', (table, newest, started, full_synced_at))
+
+        return upserted
+
+    @staticmethod
+    def _changed(entities, timestamp_field, cursor):
+        """
+        Yield entities until the first one older than cursor
+        Entities without a timestamp (ex hosts without detections) are sorted first by the brain and always yielded
+        """
+        try:
+            for entity in entities:
+                timestamp = entity.get(timestamp_field)
+                if cursor is not None and timestamp is not None and timestamp < cursor:
+                    return
+                yield entity
+        finally:
+            entities.close()
+
+    # rows are in the order of COLUMNS
+    def _host_row(self, host):
+        return (host['id'], host.get('name'), host.get('last_source') or host.get('ip'), host.get('state'),
+                host.get('threat', host.get('t_score')), host.get('certainty', host.get('c_score')),
+                host.get('is_key_asset', host.get('key_asset')), host.get(self.HOST_TIMESTAMP), json.dumps(host))
+
+    def _detection_row(self, detection):
+        host_id = (detection.get('src_host') or {}).get('id')
+        return (detection['id'], detection.get('type_vname', detection.get('detection_type')),
+                detection.get('category', detection.get('detection_category')), detection.get('src_ip'), host_id,
+                detection.get('state'), detection.get('threat', detection.get('t_score')),
+                detection.get('certainty', detection.get('c_score')), detection.get(self.DETECTION_TIMESTAMP),
+                json.dumps(detection))
+
+    def _find(self, table, filters):
+        clauses = ['{0} = ?'.format(column) for column, value in filters if value is not None]
+        values = [value for column, value in filters if value is not None]
+        query = 'SELECT data FROM {table}'.format(table=table)
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        return [json.loads(row['data']) for row in self.db.execute(query + ' ORDER BY id', values)]
+
+    def get_host(self, host_id):
+        """
+        :rtype: dict or None
+        """
+        hosts = self._find('hosts', [('id', host_id)])
+        return hosts[0] if hosts else None
+
+    def find_hosts(self, name=None, ip=None, state=None):
+        """
+        Hosts matching every provided filter
+        :param name: host name
+        :param ip: last source ip address
+        :param state: active/inactive
+        :rtype: list of dict
+        """
+        return self._find('hosts', [('name', name), ('ip', ip), ('state', state)])
+
+    def get_detection(self, detection_id):
+        """
+        :rtype: dict or None
+        """
+        detections = self._find('detections', [('id', detection_id)])
+        return detections[0] if detections else None
+
+    def find_detections(self, src_ip=None, host_id=None, state=None, type_vname=None):
+        """
+        Detections matching every provided filter
+        :param src_ip: source ip address
+        :param host_id: id of the source host
+        :param state: active/inactive
+        :param type_vname: detection type
+        :rtype: list of dict
+        """
+        return self._find('detections', [('src_ip', src_ip), ('host_id', host_id), ('state', state),
+                                         ('type_vname', type_vname)])
@@ -0,0 +1,165 @@
+import threading
+
+
+class TagManager(object):
+    """
+    Local, version checked view of host or detection tags
+    Tags are filled in bulk from list pages that already carry them, so append and remove need a single PATCH per
+    entity instead of a GET followed by a PATCH. Writes to the same entity are serialized; an entity is only read back
+    from the brain when it is unknown or when a write conflict is detected.
+    """
+
+    def __init__(self, client, entity_type='host'):
+        """
+        :param client: VectraClient (API v2)
+        :param entity_type: host or detection
+        """
+        if entity_type not in ['host', 'detection']:
+            raise ValueError('Supported values for entity_type are host or detection')
+
+        self.client = client
+        self.entity_type = entity_type
+        self.conflicts = 0
+        self._tags = {}
+        self._versions = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._tags)
+
+    def __contains__(self, entity_id):
+        return str(entity_id) in self._tags
+
+    def load(self, items):
+        """
+        Fill local tags from host or detection list pages
+        :param items: iterable of pages (response objects or decoded dicts with results) or entities (dicts with id
+        and tags), ex client.get_all_hosts(fields='id,tags') or client.iter_hosts(fields='id,tags')
+        :rtype: int number of entities loaded
+        """
+        loaded = 0
+        for item in items:
+            if hasattr(item, 'json'):
+                item = item.json()
+            entities = item['results'] if 'results' in item else [item]
+            for entity in entities:
+                if 'tags' in entity:
+                    self._store(entity['id'], entity['tags'])
+                    loaded += 1
+        return loaded
+
+    def get(self, entity_id):
+        """
+        Current tags of entity, read from the brain only if not known locally
+        :param entity_id: host or detection id
+        :rtype: list
+        """
+        return list(self._snapshot(entity_id)[1])
+
+    def set(self, entity_id, tags):
+        """
+        Replace tags of entity
+        :param entity_id: host or detection id
+        :param tags: list of tags
+        :rtype: response of the PATCH request or None if tags were unchanged
+        """
+        return self._write(entity_id, lambda current: list(tags))
+
+    def append(self, entity_id, tags):
+        """
+        Append tags to entity, skipping tags it already has
+        :param entity_id: host or detection id
+        :param tags: list of tags
+        :rtype: response of the PATCH request or None if tags were unchanged
+        """
+        return self._write(entity_id, lambda current: current + [tag for tag in tags if tag not in current])
+
+    def remove(self, entity_id, tags):
+        """
+        Remove tags from entity
+        :param entity_id: host or detection id
+        :param tags: list of tags
+        :rtype: response of the PATCH request or None if tags were unchanged
+        """
+        return self._write(entity_id, lambda current: [tag for tag in current if tag not in tags])
+
+    def append_many(self, entity_ids, tags, max_workers=8):
+        """
+        Append tags to many entities concurrently
+        :rtype: list of BulkResult in the order of entity_ids (status_code is None for entities left unchanged)
+        """
+        return self.client._run_bulk(lambda entity_id: self.append(entity_id, tags), entity_ids,
+                                     max_workers=max_workers)
+
+    def remove_many(self, entity_ids, tags, max_workers=8):
+        """
+        Remove tags from many entities concurrently
+        :rtype: list of BulkResult in the order of entity_ids (status_code is None for entities left unchanged)
+        """
+        return self.client._run_bulk(lambda entity_id: self.remove(entity_id, tags), entity_ids,
+                                     max_workers=max_workers)
+
+    def _store(self, entity_id, tags):
+        key = str(entity_id)
+        with self._lock:
+            self._tags[key] = list(tags or [])
+            self._versions[key] = self._versions.get(key, 0) + 1
+            return self._versions[key]
+
+    def _entity_lock(self, entity_id):
+        with self._lock:
+            return self._locks.setdefault(str(entity_id), threading.Lock())
+
+    def _snapshot(self, entity_id):
+        key = str(entity_id)
+        with self._lock:
+            if key in self._tags:
+                return self._versions[key], list(self._tags[key])
+        return self._refresh(entity_id)
+
+    def _refresh(self, entity_id):
+        tags = self._read_response(entity_id).json()['tags']
+        return self._store(entity_id, tags), list(tags)
+
+    def _read_response(self, entity_id):
+        if self.entity_type == 'host':
+            return self.client.get_host_tags(host_id=entity_id)
+        return self.client.get_detection_tags(detection_id=entity_id)
+
+    def _patch(self, entity_id, tags):
+        if self.entity_type == 'host':
+            return self.client.set_host_tags(host_id=entity_id, tags=tags)
+        return self.client.set_detection_tags(detection_id=entity_id, tags=tags)
+
+    def _write(self, entity_id, change):
+        """
+        Apply change to the known tags of entity with a single PATCH
+        The write is retried once from freshly read tags when the local view was replaced while the PATCH was in
+        flight (ex a concurrent load) or the brain did not store the tags that were sent
+        """
+        with self._entity_lock(entity_id):
+            version, current = self._snapshot(entity_id)
+            for attempt in range(2):
+                tags = change(current)
+                if tags == current:
+                    return None
+
+                resp = self._patch(entity_id, tags)
+                stored = resp.json().get('tags')
+                stored = tags if stored is None else stored
+
+                key = str(entity_id)
+                with self._lock:
+                    conflict = self._versions.get(key) != version or sorted(stored) != sorted(tags)
+                    if not conflict:
+                        self._tags[key] = list(stored)
+                        self._versions[key] = version + 1
+                        return resp
+
+                self.conflicts += 1
+                if attempt == 0:
+                    version, current = self._refresh(entity_id)
+
+            self._store(entity_id, stored)
+            return resp
@@ -0,0 +1,189 @@
+import calendar
+import random
+import threading
+import time
+
+from email.utils import parsedate_tz, mktime_tz
+
+# status codes returned by the brain when it is shedding load
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+def parse_retry_after(value):
+    """
+    Parse Retry-After header value
+    :param value: delay in seconds or http date
+    :rtype: float seconds to wait or None
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        date = parsedate_tz(value)
+        if date is None:
+            return None
+        return max(0.0, mktime_tz(date) - calendar.timegm(time.gmtime()))
+
+
+class RetryPolicy(object):
+    """
+    Retry idempotent requests on connection errors and throttling/server errors with jittered exponential backoff
+    """
+
+    def __init__(self, retries=3, backoff=0.5, max_backoff=30, status_codes=(429, 502, 503, 504),
+                 methods=('GET', 'HEAD', 'OPTIONS')):
+        """
+        :param retries: maximum number of retries per request
+        :param backoff: base delay in seconds, doubled on every attempt
+        :param max_backoff: maximum delay in seconds between attempts
+        :param status_codes: response status codes that are retried
+        :param methods: http methods that are safe to retry
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.status_codes = status_codes
+        self.methods = methods
+
+    def should_retry(self, method, attempt, response=None, error=None):
+        """
+        :param method: http method of the request
+        :param attempt: number of retries already made
+        :param response: requests or aiohttp response received, if any
+        :param error: connection error raised, if any
+        :rtype: bool
+        """
+        if attempt >= self.retries or method.upper() not in self.methods:
+            return False
+        if error is not None:
+            return True
+        if response is None:
+            return False
+        # aiohttp responses carry the status code as status
+        return getattr(response, 'status_code', getattr(response, 'status', None)) in self.status_codes
+
+    def delay(self, attempt, retry_after=None):
+        """
+        Seconds to wait before the next attempt; full jitter, never shorter than the server's Retry-After
+        max_backoff only caps the backoff, a longer Retry-After is waited in full
+        :param attempt: number of retries already made
+        :param retry_after: delay requested by the server in seconds
+        :rtype: float
+        """
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if retry_after is not None:
+            delay = retry_after + delay / 2
+        return delay
+
+
+class ConcurrencyGovernor(object):
+    """
+    Adaptive limit on the number of requests in flight (additive increase, multiplicative decrease)
+    The limit grows by about one request per round of healthy responses and is cut when the brain throttles, returns
+    server errors or latency degrades; Retry-After pauses all new requests for the requested time
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=32, decrease_factor=0.5, latency_tolerance=2.0,
+                 target_latency=None):
+        """
+        :param initial: initial in-flight request limit
+        :param minimum: lowest in-flight request limit
+        :param maximum: highest in-flight request limit
+        :param decrease_factor: factor applied to the limit when throttled
+        :param latency_tolerance: latency above this multiple of the best observed latency is considered unhealthy
+        :param target_latency: fixed healthy latency threshold in seconds instead of latency_tolerance
+        """
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.target_latency = target_latency
+        self.in_flight = 0
+        self.baseline = None
+        self.throttled = 0
+        self._paused_until = 0
+        self._last_decrease = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """
+        Block until a request may be sent
+        """
+        with self._cond:
+            while True:
+                wait = self._take()
+                if wait is None:
+                    return
+                self._cond.wait(wait or None)
+
+    def try_acquire(self):
+        """
+        Take a slot without blocking, for callers that cannot block (ex asyncio)
+        :rtype: None when a request may be sent, otherwise seconds left in a pause or 0 when every slot is in use
+        """
+        with self._cond:
+            return self._take()
+
+    def _take(self):
+        wait = self._paused_until - time.time()
+        if wait > 0:
+            return wait
+        if self.in_flight >= max(self.minimum, int(self.limit)):
+            return 0
+        self.in_flight += 1
+        return None
+
+    def release(self, latency, status_code=None):
+        """
+        Record the outcome of a request and adjust the limit
+        :param latency: request latency in seconds
+        :param status_code: response status code or None on connection error
+        """
+        with self._cond:
+            self.in_flight -= 1
+            now = time.time()
+
+            if status_code is None or status_code in THROTTLE_STATUS_CODES or status_code >= 500:
+                self._decrease(now, latency)
+            elif status_code < 400:
+                if self.baseline is None or latency < self.baseline:
+                    self.baseline = latency
+                else:
+                    # let the baseline drift up slowly so a single fast response does not pin it
+                    self.baseline += (latency - self.baseline) * 0.01
+
+                threshold = self.target_latency or self.baseline * self.latency_tolerance
+                if latency <= threshold:
+                    self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+                else:
+                    self._decrease(now, latency)
+
+            self._cond.notify_all()
+
+    def _decrease(self, now, latency):
+        # responses already in flight when the limit was cut report the same congestion; cut once per round trip
+        if now - self._last_decrease > latency:
+            self.limit = max(self.minimum, self.limit * self.decrease_factor)
+            self._last_decrease = now
+            self.throttled += 1
+
+    def pause(self, seconds):
+        """
+        Hold new requests for seconds (ex Retry-After)
+        """
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.time() + seconds)
+
+    def stats(self):
+        """
+        :rtype: dict
+        """
+        with self._cond:
+            return {
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'baseline_latency': self.baseline,
+                'throttled': self.throttled,
+            }
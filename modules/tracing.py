@@ -0,0 +1,300 @@
+import itertools
+import json
+import os
+import threading
+import time
+
+
+class Span(object):
+    """
+    Timed operation of a trace; start and end are epoch seconds
+    """
+
+    __slots__ = ('name', 'category', 'start', 'end', 'span_id', 'parent_id', 'thread_id', 'thread_name', 'attrs')
+
+    def __init__(self, name, category, start, span_id, parent_id=None, attrs=None):
+        self.name = name
+        self.category = category
+        self.start = start
+        self.end = None
+        self.span_id = span_id
+        self.parent_id = parent_id
+        thread = threading.current_thread()
+        self.thread_id = thread.ident
+        self.thread_name = thread.name
+        self.attrs = attrs or {}
+
+    def __repr__(self):
+        return '<Span {name} [{duration:.6f}s]>'.format(name=self.name, duration=self.duration)
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.time()) - self.start
+
+    def set(self, **attrs):
+        """
+        Add attributes to the span (ex span.set(status=200))
+        """
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'category': self.category,
+            'start': self.start,
+            'end': self.end,
+            'duration': self.duration,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'thread_id': self.thread_id,
+            'thread_name': self.thread_name,
+            'attrs': self.attrs,
+        }
+
+
+class _ActiveSpan(object):
+    """
+    Context manager opening a span on enter and exporting it on exit
+    """
+
+    __slots__ = ('tracer', 'name', 'category', 'attrs', 'span')
+
+    def __init__(self, tracer, name, category, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.attrs = attrs
+        self.span = None
+
+    def __enter__(self):
+        self.span = self.tracer.start(self.name, self.category, **self.attrs)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.span.set(error=exc_type.__name__)
+        self.tracer.finish(self.span)
+
+
+class _NullSpan(object):
+    """
+    Context manager standing in for a span when tracing is disabled
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def set(self, **attrs):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer(object):
+    """
+    Thread safe recorder of nested spans handed to exporters as they finish
+    Spans opened on a thread are children of the span open on that thread, if any. An exporter is any object with an
+    export(span) method, called as every span finishes, and a close() method, called when the tracer is closed.
+    """
+
+    def __init__(self, exporters=None):
+        """
+        :param exporters: list of exporters (ex [JSONLinesExporter('trace.jsonl')]) - optional
+        """
+        self.exporters = list(exporters or [])
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name, category='vat', **attrs):
+        """
+        Context manager timing the enclosed block
+        ex with tracer.span('aggregate', rows=len(results)) as span: ...
+        :param name: name of the operation
+        :param category: category of the operation (ex http, page, decode, pipeline)
+        :rtype: context manager returning the Span
+        """
+        return _ActiveSpan(self, name, category, attrs)
+
+    def start(self, name, category='vat', **attrs):
+        """
+        Open a span on the current thread; it must be passed to finish() on the same thread
+        :rtype: Span
+        """
+        stack = self._stack()
+        span = Span(name, category, time.time(), next(self._ids), stack[-1].span_id if stack else None, attrs)
+        stack.append(span)
+        return span
+
+    def finish(self, span):
+        """
+        Close a span opened with start() and export it
+        """
+        span.end = time.time()
+        stack = self._stack()
+        if span in stack:
+            del stack[stack.index(span):]
+        self._export(span)
+
+    def record(self, name, start, end, category='vat', **attrs):
+        """
+        Export a span that already ended, as a child of the span open on the current thread
+        :param start: epoch seconds the operation started
+        :param end: epoch seconds the operation ended
+        :rtype: Span
+        """
+        stack = self._stack()
+        span = Span(name, category, start, next(self._ids), stack[-1].span_id if stack else None, attrs)
+        span.end = end
+        self._export(span)
+        return span
+
+    def _export(self, span):
+        for exporter in self.exporters:
+            exporter.export(span)
+
+    def close(self):
+        """
+        Close every exporter
+        """
+        for exporter in self.exporters:
+            exporter.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JSONLinesExporter(object):
+    """
+    Write every span as a JSON object on its own line
+    """
+
+    def __init__(self, path):
+        """
+        :param path: file name or file object open for writing text
+        """
+        self._owned = not hasattr(path, 'write')
+        self._file = open(path, 'w') if self._owned else path
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=str, sort_keys=True)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def close(self):
+        with self._lock:
+            if self._owned:
+                self._file.close()
+            else:
+                self._file.flush()
+
+
+class ChromeTraceExporter(object):
+    """
+    Write spans as Chrome trace events, viewable in chrome://tracing or https://ui.perfetto.dev
+    Events are written as spans finish, so a trace of an interrupted run can still be opened.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: file name or file object open for writing text
+        """
+        self._owned = not hasattr(path, 'write')
+        self._file = open(path, 'w') if self._owned else path
+        self._lock = threading.Lock()
+        self._threads = set()
+        self._pid = os.getpid()
+        self._file.write('[\n')
+        self._first = True
+
+    def _write(self, event):
+        self._file.write(('' if self._first else ',\n') + json.dumps(event, default=str, sort_keys=True))
+        self._first = False
+
+    def export(self, span):
+        args = dict(span.attrs, span_id=span.span_id)
+        if span.parent_id is not None:
+            args['parent_id'] = span.parent_id
+        event = {
+            'name': span.name,
+            'cat': span.category,
+            'ph': 'X',
+            'ts': span.start * 1e6,
+            'dur': (span.end - span.start) * 1e6,
+            'pid': self._pid,
+            'tid': span.thread_id,
+            'args': args,
+        }
+        with self._lock:
+            if span.thread_id not in self._threads:
+                self._threads.add(span.thread_id)
+                self._write({'name': 'thread_name', 'ph': 'M', 'pid': self._pid, 'tid': span.thread_id,
+                             'args': {'name': span.thread_name}})
+            self._write(event)
+
+    def close(self):
+        with self._lock:
+            self._file.write('\n]\n')
+            if self._owned:
+                self._file.close()
+            else:
+                self._file.flush()
+
+
+def open_tracer(path):
+    """
+    Tracer writing to a file: Chrome trace events when path ends with .json, JSON lines otherwise
+    :param path: trace file name
+    :rtype: Tracer
+    """
+    exporter = ChromeTraceExporter(path) if str(path).endswith('.json') else JSONLinesExporter(path)
+    return Tracer([exporter])
+
+
+def span(tracer, name, category='vat', **attrs):
+    """
+    Span context manager of tracer, or a no-op one when tracer is None
+    :rtype: context manager
+    """
+    if tracer is None:
+        return NULL_SPAN
+    return tracer.span(name, category, **attrs)
+
+
+def traced(tracer, iterable, name, category='pipeline'):
+    """
+    Iterate over iterable recording a span for the time spent waiting for every item, which shows where a pipeline
+    stage is starved by the stage before it
+    :param tracer: Tracer or None to return iterable unchanged
+    :rtype: iterable
+    """
+    if tracer is None:
+        return iterable
+    return _traced(tracer, iterable, name, category)
+
+
+def _traced(tracer, iterable, name, category):
+    iterator = iter(iterable)
+    for index in itertools.count():
+        with tracer.span(name, category, index=index) as current:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                current.set(done=True)
+                return
+        yield item
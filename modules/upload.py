@@ -0,0 +1,196 @@
+import mmap
+import os
+import sys
+import time
+import uuid
+
+from collections import namedtuple
+
+# sent and total are bytes of the multipart body, rate is bytes per second since the upload started
+UploadProgress = namedtuple('UploadProgress', ['sent', 'total', 'elapsed', 'rate'])
+
+
+class MultipartFile(object):
+    """
+    multipart/form-data body with a single file field, read from disk as it is sent
+    Only the current chunk is held in memory, so files of any size upload in constant memory. The body length is
+    known up front, so requests sends it with a Content-Length header. Pass chunks() rather than the body itself for
+    chunk_size to set how much is read and sent at a time: requests reads file-like bodies in its own 16 KiB blocks.
+    ex with MultipartFile('feed.xml') as body:
+           session.post(url, data=body.chunks(), headers={'Content-Type': body.content_type})
+    """
+
+    def __init__(self, path, field='file', filename=None, content_type='application/octet-stream',
+                 chunk_size=1024 * 1024, use_mmap=False, progress=None):
+        """
+        :param path: file to upload
+        :param field: name of the form field (default: file)
+        :param filename: file name sent with the field (default: base name of path)
+        :param content_type: content type of the file part (default: application/octet-stream)
+        :param chunk_size: bytes read and sent at a time when iterated (default: 1 MiB)
+        :param use_mmap: read the file through a read-only memory map instead of buffered reads (default: False)
+        :param progress: function called with an UploadProgress after every chunk sent - optional
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.boundary = uuid.uuid4().hex
+        self.content_type = 'multipart/form-data; boundary={0}'.format(self.boundary)
+
+        filename = (filename or os.path.basename(path)).replace('"', '%22')
+        self._head = ('--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+                      'Content-Type: {type}\r\n\r\n').format(boundary=self.boundary, field=field, filename=filename,
+                                                             type=content_type).encode('utf-8')
+        self._tail = '\r\n--{boundary}--\r\n'.format(boundary=self.boundary).encode('utf-8')
+
+        self._file = open(path, 'rb')
+        self.file_size = os.fstat(self._file.fileno()).st_size
+        self._map = None
+        if use_mmap and self.file_size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.sent = 0
+        self._position = 0
+        self._started = None
+
+    def __len__(self):
+        return len(self._head) + self.file_size + len(self._tail)
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def chunks(self):
+        """
+        Iterable of chunk_size chunks of the body that requests sends as they are yielded, with a Content-Length
+        :rtype: _Chunks
+        """
+        return _Chunks(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read(self, size=-1):
+        """
+        Next bytes of the body
+        :param size: maximum number of bytes to return, -1 for the rest of the body
+        :rtype: bytes, empty once the whole body was read
+        """
+        if self._started is None:
+            self._started = time.time()
+        total = len(self)
+        if size is None or size < 0:
+            size = total - self._position
+        size = min(size, total - self._position)
+
+        parts = []
+        head, body_end = len(self._head), len(self._head) + self.file_size
+        while size > 0:
+            if self._position < head:
+                data = self._head[self._position:self._position + size]
+            elif self._position < body_end:
+                data = self._read_file(self._position - head, min(size, body_end - self._position))
+            else:
+                offset = self._position - body_end
+                data = self._tail[offset:offset + size]
+            if not data:
+                break
+            parts.append(data)
+            self._position += len(data)
+            size -= len(data)
+
+        chunk = b''.join(parts) if len(parts) != 1 else parts[0]
+        if chunk:
+            self.sent += len(chunk)
+            if self.progress is not None:
+                self.progress(self.stats())
+        return chunk
+
+    def _read_file(self, offset, size):
+        if self._map is not None:
+            return self._map[offset:offset + size]
+        if self._file.tell() != offset:
+            self._file.seek(offset)
+        return self._file.read(size)
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=0):
+        """
+        Move to a position of the body; lets requests rewind it to resend after a redirect or a retry
+        """
+        base = {0: 0, 1: self._position, 2: len(self)}[whence]
+        self._position = max(0, min(len(self), base + offset))
+        if self._position == 0:
+            self.sent = 0
+            self._started = None
+        return self._position
+
+    def stats(self):
+        """
+        :rtype: UploadProgress
+        """
+        elapsed = time.time() - self._started if self._started is not None else 0.0
+        return UploadProgress(self.sent, len(self), elapsed, self.sent / elapsed if elapsed > 0 else 0.0)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+class _Chunks(object):
+    """
+    Iterable view of a MultipartFile with a length and no read(), which requests streams chunk by chunk
+    """
+
+    def __init__(self, body):
+        self.body = body
+
+    def __len__(self):
+        return len(self.body)
+
+    def __iter__(self):
+        return iter(self.body)
+
+    def seek(self, offset, whence=0):
+        return self.body.seek(offset, whence)
+
+
+def _megabytes(value):
+    return value / (1024.0 * 1024.0)
+
+
+class ProgressPrinter(object):
+    """
+    Progress callback writing the bytes sent, percentage and throughput at most once per interval, and once at the end
+    """
+
+    def __init__(self, stream=None, interval=1.0):
+        """
+        :param stream: file to write to (default: sys.stderr)
+        :param interval: minimum seconds between two lines (default: 1)
+        """
+        self.stream = stream or sys.stderr
+        self.interval = interval
+        self._last = None
+
+    def __call__(self, progress):
+        now = time.time()
+        done = progress.sent >= progress.total
+        if not done and self._last is not None and now - self._last < self.interval:
+            return
+        self._last = now
+        self.stream.write('{sent:.1f}/{total:.1f} MiB ({percent:.0%}) at {rate:.1f} MiB/s\n'.format(
+            sent=_megabytes(progress.sent), total=_megabytes(progress.total),
+            percent=float(progress.sent) / progress.total if progress.total else 1.0,
+            rate=_megabytes(progress.rate)))
+        self.stream.flush()
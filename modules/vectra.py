@@ -1,11 +1,43 @@
 import json
+import math
 import requests
+import time
 import warnings
 
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from requests.adapters import HTTPAdapter
+
+from .cache import ResponseCache
+from .jsonstream import iter_results
+from .metrics import MetricsRegistry, endpoint_template
+from .page import Page, get_loads
+from .records import Detection, Host, records
+from .rules import RuleCatalog
+from .search import SearchCache
+from .throttle import ConcurrencyGovernor, RetryPolicy, parse_retry_after
+from .tracing import span
+from .upload import MultipartFile
+
 # requests.packages.urllib3.disable_warnings()
 warnings.filterwarnings('always', '.*', PendingDeprecationWarning)
 
 
+class HTTPException(Exception):
+    """
+    Unexpected response from the Vectra brain
+    args are (status_code, content) for compatibility with the previously raised generic exception
+    """
+
+    def __init__(self, status_code, content, response=None):
+        super(HTTPException, self).__init__(status_code, content)
+        self.status_code = status_code
+        self.content = content
+        self.response = response
+        self.retry_after = parse_retry_after(response.headers.get('Retry-After')) if response is not None else None
+
+
 def request_error_handler(func):
     def request_handler(self, **kwargs):
         response = func(self, **kwargs)
@@ -13,8 +45,7 @@ def request_error_handler(func):
         if response.status_code in [200, 201]:
             return response
         else:
-            # TODO implement exception class to more gracefully handle exception
-            raise Exception(response.status_code, response.content)
+            raise HTTPException(response.status_code, response.content, response=response)
 
     return request_handler
 
@@ -33,6 +64,15 @@ def deprecation(message):
     warnings.warn(message, PendingDeprecationWarning)
 
 
+# (connect, read) timeout in seconds applied to every request unless overridden
+DEFAULT_TIMEOUT = (10, 300)
+# bytes read from the socket at a time when streaming response bodies
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# per item outcome of bulk operations
+BulkResult = namedtuple('BulkResult', ['id', 'success', 'status_code', 'latency', 'error'])
+
+
 def param_deprecation(key):
     message = '{0} will be deprecated with Vectra API v1 which will be annouced in an upcoming release'.format(key)
     warnings.warn(message, PendingDeprecationWarning)
@@ -40,7 +80,9 @@ def param_deprecation(key):
 
 class VectraClient(object):
 
-    def __init__(self, url=None, token=None, user=None, password=None, verify=False):
+    def __init__(self, url=None, token=None, user=None, password=None, verify=False, timeout=DEFAULT_TIMEOUT,
+                 pool_connections=10, pool_maxsize=10, pool_block=False, cache=None, governor=None, retry=True,
+                 json_backend=None, raw_decode=True, metrics=None, tracer=None, search_cache=None):
         """
         Initialize Vectra client
         :param url: IP or hostname of Vectra brain (ex https://www.example.com) - required
@@ -48,12 +90,44 @@ class VectraClient(object):
         :param user: Username to authenticate to Vectra brain when using API v1*
         :param password: Password when using username to authenticate using API v1*
         :param verify: Verify SSL (default: False) - optional
+        :param timeout: default timeout in seconds, or (connect, read) tuple, for every request - optional
+        :param pool_connections: number of per-host connection pools to keep (default: 10) - optional
+        :param pool_maxsize: maximum number of keep-alive connections per host (default: 10) - optional
+        :param pool_block: block when pool_maxsize connections to a host are in use instead of opening
+        extra connections (default: False) - optional
+        :param cache: ResponseCache instance, or True for a default one, to cache host, detection, tag, rule and threat
+        feed lookups by id; writes through this client invalidate affected entries (default: None) - optional
+        :param governor: ConcurrencyGovernor instance, or True for a default one, to adapt the number of requests in
+        flight to the brain's throttling and latency (default: None) - optional
+        :param retry: RetryPolicy instance, True for the default policy or False to disable retrying idempotent
+        requests on connection errors, 429 and 5xx responses (default: True) - optional
+        :param json_backend: JSON decoder used for pages of get_all_* generators: orjson, ujson, simplejson, json or a
+        function (default: the fastest installed) - optional
+        :param raw_decode: decode pages from the response bytes rather than from the text decoded by requests
+        (default: True) - optional
+        :param metrics: MetricsRegistry instance, or True for a default one, to record per endpoint latency, response
+        size, status code, retry, cache, page and decoding metrics (default: None) - optional
+        :param tracer: Tracer recording a span for every http request, page of get_all_* generators and page decoding
+        (default: None) - optional
+        :param search_cache: SearchCache instance, or True for a default one, to cache advanced search pages by
+        normalized query; writes through this client clear it (default: None) - optional
         :rtype: requests object
         *Either token or user are required
         """
         self.url = url
         self.version = 2 if token else 1
         self.verify = verify
+        self.timeout = timeout
+        # an empty cache is falsy, so only True and False are special cased
+        self.cache = ResponseCache() if cache is True else None if cache is False else cache
+        self.governor = ConcurrencyGovernor() if governor is True else governor or None
+        self.retry = RetryPolicy() if retry is True else retry or None
+        self.loads = get_loads(json_backend)
+        self.raw_decode = raw_decode
+        self.metrics = MetricsRegistry() if metrics is True else metrics or None
+        self.tracer = tracer
+        self.search_cache = SearchCache() if search_cache is True else None if search_cache is False else search_cache
+        self._rule_catalog = None
 
         if token:
             self.url = '{url}/api/v2'.format(url=url)
@@ -69,6 +143,135 @@ class VectraClient(object):
             raise RuntimeError("At least one form of authentication is required. Please provide a token or username"
                                " and password")
 
+        self.session = self._build_session(pool_connections, pool_maxsize, pool_block)
+
+    def _build_session(self, pool_connections, pool_maxsize, pool_block):
+        """
+        Build pooled keep-alive session with authentication and ssl verification applied once per client
+        :param pool_connections: number of per-host connection pools to keep
+        :param pool_maxsize: maximum number of connections kept per host
+        :param pool_block: block when no pooled connection is available
+        :rtype: requests.Session
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.verify = self.verify
+
+        if self.version == 2:
+            session.headers.update(self.headers)
+        else:
+            session.auth = self.auth
+
+        return session
+
+    def _request(self, method, path, cached=False, **kwargs):
+        """
+        Issue request through the client's pooled session
+        :param method: http method
+        :param path: path relative to the api url (ex /hosts/1) or absolute url
+        :param cached: serve GET from and store successful responses in the response cache when enabled
+        :rtype: requests.Response
+        """
+        if self.search_cache is not None and method != 'GET':
+            self.search_cache.clear()
+        if self.cache is not None:
+            if method != 'GET':
+                self._invalidate(path)
+            elif cached:
+                key = ('/' + path.strip('/'), json.dumps(kwargs.get('params'), sort_keys=True, default=str))
+                resp = self.cache.get(key)
+                if self.metrics is not None:
+                    self.metrics.observe_cache(endpoint_template(path), resp is not None)
+                if resp is None:
+                    resp = self._request(method, path, **kwargs)
+                    if resp.status_code == 200:
+                        self.cache.set(key, resp)
+                return resp
+
+        url = path if str(path).startswith('http') else self.url + path
+        kwargs.setdefault('timeout', self.timeout)
+        # requests lets REQUESTS_CA_BUNDLE override session.verify, so pass it explicitly
+        kwargs.setdefault('verify', self.verify)
+
+        metrics, tracer = self.metrics, self.tracer
+        endpoint = endpoint_template(path) if metrics is not None or tracer is not None else None
+
+        attempt = 0
+        while True:
+            start = time.time()
+            resp, error = self._send(method, url, **kwargs)
+            if metrics is not None:
+                metrics.observe_request(method, endpoint, time.time() - start, response=resp, error=error)
+            if tracer is not None:
+                tracer.record('{method} {endpoint}'.format(method=method, endpoint=endpoint), start, time.time(),
+                              category='http', method=method, url=url, attempt=attempt,
+                              status=resp.status_code if resp is not None else type(error).__name__)
+            retry_after = parse_retry_after(resp.headers.get('Retry-After')) if resp is not None else None
+            if retry_after and self.governor is not None:
+                self.governor.pause(retry_after)
+
+            if self.retry is None or not self.retry.should_retry(method, attempt, response=resp, error=error):
+                if error is not None:
+                    raise error
+                return resp
+
+            if resp is not None:
+                resp.close()
+            # streamed bodies were consumed by the failed attempt
+            if hasattr(kwargs.get('data'), 'seek'):
+                kwargs['data'].seek(0)
+            time.sleep(self.retry.delay(attempt, retry_after))
+            attempt += 1
+            if metrics is not None:
+                metrics.observe_retry(method, endpoint)
+
+    def _send(self, method, url, **kwargs):
+        """
+        Send a single request, holding a governor slot while it is in flight
+        :rtype: tuple (response or None, connection error or None)
+        """
+        if self.governor is not None:
+            self.governor.acquire()
+
+        resp, error = None, None
+        start = time.time()
+        try:
+            resp = self.session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        finally:
+            if self.governor is not None:
+                self.governor.release(time.time() - start, resp.status_code if resp is not None else None)
+
+        return resp, error
+
+    def _invalidate(self, path):
+        """
+        Drop cached responses affected by a write to path
+        Entries for the path itself, entries below it and the unfiltered collection listing are removed; tag writes
+        also remove the tagged host or detection
+        :param path: path of the write request (ex /tagging/host/1)
+        """
+        segments = path.split('?')[0].strip('/').split('/')
+        self.cache.invalidate('/'.join(segments))
+        self.cache.invalidate(segments[0], prefix=False)
+        if segments[0] == 'tagging' and len(segments) > 2:
+            self.cache.invalidate('{type}s/{id}'.format(type=segments[1], id=segments[2]))
+
+    def close(self):
+        """
+        Close pooled connections
+        """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
     @staticmethod
     def _generate_host_params(args):
         """
@@ -114,6 +317,153 @@ class VectraClient(object):
                 transformed_list.append(host)
         return transformed_list
 
+    def _get_all_pages(self, get_page, kwargs, max_workers=None, ordered=True):
+        """
+        Generator to retrieve every page of a paginated endpoint
+        Pages are retrieved by following the next link unless max_workers is set, in which case the remaining page
+        numbers are derived from the count of the first response and fetched on a bounded worker pool
+        :param get_page: method returning a single page (ex get_hosts)
+        :param kwargs: query parameters passed to get_page
+        :param max_workers: number of concurrent page requests (int)
+        :param ordered: yield pages in page order, otherwise as they complete
+        :rtype: generator of Page
+        """
+        first_page = int(kwargs.get('page') or 1)
+        with span(self.tracer, 'page', category='page', number=first_page):
+            page = self._page(get_page(**kwargs))
+        yield page
+
+        if not max_workers or max_workers < 2:
+            page_number = first_page
+            while page.next:
+                path = page.next.replace(self.url, '')
+                page_number += 1
+                with span(self.tracer, 'page', category='page', number=page_number):
+                    page = self._page(self.custom_endpoint(path=path))
+                yield page
+            return
+
+        body = page.json()
+        if not body['next']:
+            return
+
+        # the first page is full when there is a next page, so its length is the effective (possibly capped) page size
+        last_page = int(math.ceil(body['count'] / float(len(body['results']))))
+        remaining = iter(range(first_page + 1, last_page + 1))
+
+        def fetch(params):
+            # decode on the worker so parsing overlaps with the requests still in flight
+            with span(self.tracer, 'page', category='page', number=params['page']):
+                page = self._page(get_page(**params))
+                page.json()
+            return page
+
+        def submit(page_number):
+            params = dict(kwargs, page=page_number, page_size=len(body['results']))
+            return executor.submit(fetch, params)
+
+        # keep a bounded window of requests in flight so unconsumed pages do not pile up in memory
+        window = max_workers * 2
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        pending = ()
+        try:
+            if ordered:
+                pending = deque(submit(page_number) for page_number in islice(remaining, window))
+                while pending:
+                    page = pending.popleft().result()
+                    for page_number in remaining:
+                        pending.append(submit(page_number))
+                        break
+                    yield page
+            else:
+                pending = set(submit(page_number) for page_number in islice(remaining, window))
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        for page_number in remaining:
+                            pending.add(submit(page_number))
+                            break
+                        yield future.result()
+        finally:
+            for future in list(pending):
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _page(self, resp):
+        """
+        Wrap a page response so its body is decoded once with the client's JSON backend
+        :rtype: Page
+        """
+        metrics, tracer = self.metrics, self.tracer
+        if metrics is None and tracer is None:
+            return Page(resp, loads=self.loads, raw=self.raw_decode)
+
+        endpoint = endpoint_template(resp.url or '')
+        if metrics is not None:
+            metrics.observe_page(endpoint)
+
+        def on_decode(seconds):
+            if metrics is not None:
+                metrics.observe_decode(endpoint, seconds)
+            if tracer is not None:
+                end = time.time()
+                tracer.record('decode', end - seconds, end, category='decode', endpoint=endpoint,
+                              bytes=len(resp.content))
+        return Page(resp, loads=self.loads, raw=self.raw_decode, on_decode=on_decode)
+
+    def _iter_entities(self, path, params):
+        """
+        Generator to stream every entity of a paginated endpoint one at a time
+        Each page body is parsed incrementally as it is received and decoded exactly once
+        :param path: path of the list endpoint (ex /hosts)
+        :param params: query parameters for the first page
+        :rtype: generator of dict
+        """
+        while path:
+            resp = self._request('GET', path, params=params, stream=True)
+            try:
+                if resp.status_code not in [200, 201]:
+                    raise HTTPException(resp.status_code, resp.content, response=resp)
+
+                meta = {}
+                for entity in iter_results(resp.iter_content(chunk_size=STREAM_CHUNK_SIZE), meta=meta,
+                                           encoding=resp.encoding or 'utf-8'):
+                    yield entity
+            finally:
+                resp.close()
+
+            # next is an absolute url that already carries the query parameters
+            path, params = meta.get('next'), None
+
+    def _run_bulk(self, func, ids, max_workers=8):
+        """
+        Call func for every id on a bounded worker pool and collect per item results
+        :param func: function taking an id and returning a response, or None when no request was needed
+        (ex lambda i: self.set_key_asset(host_id=i))
+        :param ids: list of ids
+        :param max_workers: number of concurrent requests
+        :rtype: list of BulkResult in the order of ids; responses other than 2xx are failures
+        """
+        def run(item_id):
+            start = time.time()
+            try:
+                resp = func(item_id)
+                status_code = resp.status_code if resp is not None else None
+                # func may return the response of a method without request_error_handler (ex delete_rule)
+                if status_code is not None and not 200 <= status_code < 300:
+                    raise HTTPException(status_code, resp.content, response=resp)
+                return BulkResult(item_id, True, status_code, time.time() - start, None)
+            except HTTPException as e:
+                return BulkResult(item_id, False, e.status_code, time.time() - start, e)
+            except (requests.RequestException, ValueError) as e:
+                return BulkResult(item_id, False, None, time.time() - start, e)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            return list(executor.map(run, ids))
+        finally:
+            executor.shutdown()
+
     # TODO Consolidate get methods
     @request_error_handler
     def get_hosts(self, **kwargs):
@@ -145,25 +495,30 @@ class VectraClient(object):
         :param threat_gte: threat score greater than or equal to (int)
         """
 
-        if self.version == 2:
-            return requests.get('{url}/hosts'.format(url=self.url), headers=self.headers,
-                                params=self._generate_host_params(kwargs), verify=self.verify)
-        else:
-            return requests.get('{url}/hosts'.format(url=self.url), auth=self.auth,
-                                params=self._generate_host_params(kwargs), verify=self.verify)
+        return self._request('GET', '/hosts', params=self._generate_host_params(kwargs))
 
-    def get_all_hosts(self, **kwargs):
+    def get_all_hosts(self, max_workers=None, ordered=True, as_records=False, projection=None, **kwargs):
         """
         Generator to retrieve all hosts page by page
         Same parameters as get_host()
+        :param max_workers: fetch remaining pages concurrently with up to max_workers requests in flight (int)
+        :param ordered: yield pages in page order, otherwise as they complete (default: True)
+        :param as_records: yield compact Host records one at a time instead of pages (default: False)
+        :param projection: Projection learning the fields to request; hosts are yielded one at a time as dicts that
+        record the fields read (max_workers and ordered are ignored)
         """
-        resp = self.get_hosts(**kwargs)
-        yield resp
-        while resp.json()['next']:
-            url = resp.json()['next']
-            path = url.replace(self.url, '')
-            resp = self.custom_endpoint(path=path)
-            yield resp
+        if projection is not None:
+            return projection.iter_hosts(self, **kwargs)
+        pages = self._get_all_pages(self.get_hosts, kwargs, max_workers=max_workers, ordered=ordered)
+        return records(Host, pages) if as_records else pages
+
+    def iter_hosts(self, **kwargs):
+        """
+        Generator to retrieve all hosts one at a time, parsing each page incrementally as it is received
+        Same parameters as get_hosts()
+        :rtype: generator of dict
+        """
+        return self._iter_entities('/hosts', self._generate_host_params(kwargs))
 
     @request_error_handler
     def get_host_by_id(self, host_id=None, **kwargs):
@@ -175,12 +530,8 @@ class VectraClient(object):
         if not host_id:
             raise Exception('Host id required')
 
-        if self.version == 2:
-            return requests.get('{url}/hosts/{id}'.format(url=self.url, id=host_id), headers=self.headers,
-                                params=self._generate_host_params(kwargs), verify=self.verify)
-        else:
-            return requests.get('{url}/hosts/{id}'.format(url=self.url, id=host_id), auth=self.auth,
-                                params=self._generate_host_params(kwargs), verify=self.verify)
+        return self._request('GET', '/hosts/{id}'.format(id=host_id), params=self._generate_host_params(kwargs),
+                             cached=True)
 
     @validate_api_v2
     @request_error_handler
@@ -194,18 +545,31 @@ class VectraClient(object):
         if not host_id:
             raise ValueError('Host id required')
 
-        headers = self.headers.copy()
-        headers.update({
+        headers = {
             'Content-Type': 'application/x-www-form-urlencoded'
-        })
+        }
 
         if set:
             payload = 'key_asset=True'
         else:
             payload = 'key_asset=False'
 
-        return requests.patch('{url}/hosts/{id}'.format(url=self.url, id=host_id), headers=headers, data=payload,
-                              verify=self.verify)
+        return self._request('PATCH', '/hosts/{id}'.format(id=host_id), headers=headers, data=payload)
+
+    @validate_api_v2
+    def set_key_assets(self, host_ids=None, set=True, max_workers=8):
+        """
+        (Un)set hosts as key assets concurrently
+        :param host_ids: list of ids of hosts needing to be set - required
+        :param set: set flag to true if setting hosts as key assets
+        :param max_workers: number of concurrent requests (default: 8)
+        :rtype: list of BulkResult(id, success, status_code, latency, error) in the order of host_ids
+        """
+        if host_ids is None:
+            raise ValueError('Host ids required')
+
+        return self._run_bulk(lambda host_id: self.set_key_asset(host_id=host_id, set=set), host_ids,
+                              max_workers=max_workers)
 
     @validate_api_v2
     @request_error_handler
@@ -214,8 +578,7 @@ class VectraClient(object):
         Get host ags
         :param host_id:
         """
-        return requests.get('{url}/tagging/host/{id}'.format(url=self.url, id=host_id), headers=self.headers,
-                            verify=False)
+        return self._request('GET', '/tagging/host/{id}'.format(id=host_id), cached=True)
 
     @validate_api_v2
     @request_error_handler
@@ -239,14 +602,13 @@ class VectraClient(object):
         else:
             raise TypeError('tags must be of type list')
 
-        headers = self.headers.copy()
-        headers.update({
+        headers = {
             'Content-Type': "application/json",
             'Cache-Control': "no-cache"
-        })
+        }
 
-        return requests.patch('{url}/tagging/host/{id}'.format(url=self.url, id=host_id), headers=headers,
-                              data=json.dumps(payload), verify=self.verify)
+        return self._request('PATCH', '/tagging/host/{id}'.format(id=host_id), headers=headers,
+                             data=json.dumps(payload))
 
     # TODO consolidate get methods
     @request_error_handler
@@ -276,25 +638,30 @@ class VectraClient(object):
         :param threat_gte threat score is greater than or equal to (int)
         """
 
-        if self.version == 2:
-            return requests.get('{url}/detections'.format(url=self.url), headers=self.headers,
-                                params=self._generate_detection_params(kwargs), verify=self.verify)
-        else:
-            return requests.get('{url}/detections'.format(url=self.url), auth=self.auth,
-                                params=self._generate_detection_params(kwargs), verify=self.verify)
+        return self._request('GET', '/detections', params=self._generate_detection_params(kwargs))
 
-    def get_all_detections(self, **kwargs):
+    def get_all_detections(self, max_workers=None, ordered=True, as_records=False, projection=None, **kwargs):
         """
         Generator to retrieve all detections page by page
         Same parameters as get_detections()
+        :param max_workers: fetch remaining pages concurrently with up to max_workers requests in flight (int)
+        :param ordered: yield pages in page order, otherwise as they complete (default: True)
+        :param as_records: yield compact Detection records one at a time instead of pages (default: False)
+        :param projection: Projection learning the fields to request; detections are yielded one at a time as dicts
+        that record the fields read (max_workers and ordered are ignored)
+        """
+        if projection is not None:
+            return projection.iter_detections(self, **kwargs)
+        pages = self._get_all_pages(self.get_detections, kwargs, max_workers=max_workers, ordered=ordered)
+        return records(Detection, pages) if as_records else pages
+
+    def iter_detections(self, **kwargs):
+        """
+        Generator to retrieve all detections one at a time, parsing each page incrementally as it is received
+        Same parameters as get_detections()
+        :rtype: generator of dict
         """
-        resp = self.get_detections(**kwargs)
-        yield resp
-        while resp.json()['next']:
-            url = resp.json()['next']
-            path = url.replace(self.url, '')
-            resp = self.custom_endpoint(path=path).json()
-            yield resp
+        return self._iter_entities('/detections', self._generate_detection_params(kwargs))
 
     @request_error_handler
     def get_detection_by_id(self, detection_id=None, **kwargs):
@@ -306,12 +673,8 @@ class VectraClient(object):
         if not detection_id:
             raise Exception('Detection id required')
 
-        if self.version == 2:
-            return requests.get('{url}/detections/{id}'.format(url=self.url, id=detection_id), headers=self.headers,
-                                params=self._generate_detection_params(kwargs), verify=self.verify)
-        else:
-            return requests.get('{url}/detections/{id}'.format(url=self.url, id=detection_id), auth=self.auth,
-                                params=self._generate_detection_params(kwargs), verify=self.verify)
+        return self._request('GET', '/detections/{id}'.format(id=detection_id),
+                             params=self._generate_detection_params(kwargs), cached=True)
 
     @validate_api_v2
     @request_error_handler
@@ -320,8 +683,7 @@ class VectraClient(object):
         Get detection tags
         :param detection_id:
         """
-        return requests.get('{url}/tagging/detection/{id}'.format(url=self.url, id=detection_id), headers=self.headers,
-                            verify=False)
+        return self._request('GET', '/tagging/detection/{id}'.format(id=detection_id), cached=True)
 
     @validate_api_v2
     @request_error_handler
@@ -345,32 +707,61 @@ class VectraClient(object):
         else:
             raise TypeError('tags must be of type list')
 
-        headers = self.headers.copy()
-        headers.update({
+        headers = {
             'Content-Type': "application/json",
             'Cache-Control': "no-cache"
-        })
+        }
+
+        return self._request('PATCH', '/tagging/detection/{id}'.format(id=detection_id), headers=headers,
+                             data=json.dumps(payload))
 
-        return requests.patch('{url}/tagging/detection/{id}'.format(url=self.url, id=detection_id), headers=headers,
-                              data=json.dumps(payload), verify=self.verify)
+    @property
+    def rule_catalog(self):
+        """
+        RuleCatalog indexing every triage rule by id and name, created on first use and kept up to date with the rules
+        created, updated and deleted through this client
+        :rtype: RuleCatalog
+        """
+        if self._rule_catalog is None:
+            self._rule_catalog = RuleCatalog(self)
+        return self._rule_catalog
 
     @validate_api_v2
     def get_rules(self, name=None, rule_id=None):
         """
         Get triage rules
-        :param name: name of triage rule to retrieve
+        :param name: name of triage rule to retrieve, looked up in the rule catalog across every page of rules
         :param rule_id: id of triage rule to retrieve
+        :rtype: requests.Response, or the rule (dict) or None when retrieving by name
         """
         if rule_id:
-            return requests.get('{url}/rules/{id}'.format(url=self.url, id=rule_id), headers=self.headers, verify=False)
+            return self._request('GET', '/rules/{id}'.format(id=rule_id), cached=True)
         elif name:
-            for rule in requests.get('{url}/rules'.format(url=self.url), headers=self.headers,
-                            verify=False).json()['results']:
-                if rule['description'] == name:
-                    return rule
+            return self.rule_catalog.find(name)
         else:
-            return requests.get('{url}/rules'.format(url=self.url), headers=self.headers,
-                            verify=False)
+            return self._request('GET', '/rules', cached=True)
+
+    @request_error_handler
+    def _get_rules_page(self, **kwargs):
+        """
+        Page of triage rules, never served from the response cache
+        :param page: page number
+        :param page_size: number of rules per page
+        """
+        return self._request('GET', '/rules', params=kwargs)
+
+    def _rule_written(self, resp, rule_id=None):
+        """
+        Apply a successful rule write to the rule catalog, if one is in use
+        :param resp: response of the write
+        :param rule_id: id of the deleted rule, None for creates and updates
+        """
+        if self._rule_catalog is None or resp.status_code not in [200, 201, 204]:
+            return
+        if rule_id is not None:
+            self._rule_catalog.discard(rule_id)
+        else:
+            self._rule_catalog.put(resp.json())
 
     @validate_api_v2
     @request_error_handler
@@ -393,6 +784,23 @@ class VectraClient(object):
         :param remote1_port: destination ports to  triage
         :returns request object
         """
+        payload = self._generate_rule_payload(detection_category=detection_category, detection_type=detection_type,
+                                              triage_category=triage_category, description=description,
+                                              is_whitelist=is_whitelist, ip=ip, host=host, sensor_luid=sensor_luid,
+                                              all_hosts=all_hosts, **kwargs)
+
+        resp = self._request('POST', '/rules', json=payload)
+        self._rule_written(resp)
+        return resp
+
+    def _generate_rule_payload(self, detection_category=None, detection_type=None, triage_category=None,
+                               description=None, is_whitelist=False, ip=[], host=[], sensor_luid=[], all_hosts=False,
+                               **kwargs):
+        """
+        Validate triage rule parameters and generate request payload
+        Same parameters as create_rule()
+        :rtype: dict
+        """
         if not all([detection_category, detection_type, triage_category, description]):
             raise KeyError("missing required parameter: "
                              "detection_category, detection_type, triage_category, description")
@@ -433,8 +841,7 @@ class VectraClient(object):
                 raise TypeError("{} must be of type: list".format(k))
             payload[k] = v
 
-        return requests.post('{url}/rules'.format(url=self.url), headers=self.headers, json=payload,
-                             verify=self.verify)
+        return payload
 
     @validate_api_v2
     @request_error_handler
@@ -454,9 +861,37 @@ class VectraClient(object):
         if not rule_id and not name:
             raise ValueError("rule name or id must be provided")
 
-        id = self.get_rules(name=name)['id'] if name else rule_id
-        rule = self.get_rules(rule_id=id).json()
+        id = self.rule_catalog.id_for(name) if name else rule_id
+        if id is None:
+            raise ValueError("no triage rule named {}".format(name))
+        rule = self._update_rule_payload(self.get_rules(rule_id=id).json(), append=append, **kwargs)
+
+        resp = self._request('PUT', '/rules/{id}'.format(id=id), json=rule)
+        self._rule_written(resp)
+        return resp
+
+    @validate_api_v2
+    @request_error_handler
+    def replace_rule(self, rule_id=None, rule=None):
+        """
+        Replace a triage rule with a complete rule, without reading it first
+        :param rule_id: id of rule to replace
+        :param rule: complete triage rule (dict), ex a rule from rule_catalog with updated fields
+        """
+        if not rule_id or not rule:
+            raise ValueError("rule id and rule must be provided")
 
+        resp = self._request('PUT', '/rules/{id}'.format(id=rule_id), json=rule)
+        self._rule_written(resp)
+        return resp
+
+    def _update_rule_payload(self, rule, append=False, **kwargs):
+        """
+        Apply updated lists to an existing triage rule
+        :param rule: triage rule as returned by the api (dict)
+        :param append: set to True if appending to existing list (boolean)
+        :rtype: dict
+        """
         valid_keys = ['ip', 'host', 'sensor_luid', 'remote1_ip', 'remote1_dns', 'remote1_port']
 
         for k, v in kwargs.items():
@@ -470,8 +905,7 @@ class VectraClient(object):
             else:
                 rule[k] = v
 
-        return requests.put('{url}/rules/{id}'.format(url=self.url, id=id), headers=self.headers, json=rule,
-                            verify=self.verify)
+        return rule
 
     @validate_api_v2
     def delete_rule(self, rule_id=None, restore_detections=True):
@@ -485,25 +919,24 @@ class VectraClient(object):
             'restore_detections': restore_detections
         }
 
-        return requests.delete('{url}/rules/{id}'.format(url=self.url, id=rule_id), headers=self.headers, params=params,
-                               verify=self.verify)
+        resp = self._request('DELETE', '/rules/{id}'.format(id=rule_id), params=params)
+        self._rule_written(resp, rule_id=rule_id)
+        return resp
 
     @validate_api_v2
     @request_error_handler
     def get_proxies(self, proxy_id=None):
         if proxy_id:
-            return requests.get('{url}/proxies/{id}'.format(url=self.url, id=proxy_id), headers=self.headers,
-                                verify=self.verify)
+            return self._request('GET', '/proxies/{id}'.format(id=proxy_id))
         else:
-            return requests.get('{url}/proxies'.format(url=self.url), headers=self.headers, verify=self.verify)
+            return self._request('GET', '/proxies')
 
     @validate_api_v2
     @request_error_handler
     def add_proxy(self, address=None, enable=True):
-        headers = self.headers
-        headers.update({
+        headers = {
             "Content-Type": "application/json"
-        })
+        }
 
         payload = {
             "proxy": {
@@ -512,15 +945,14 @@ class VectraClient(object):
             }
         }
 
-        return requests.post('{url}/proxies'.format(url=self.url), json=payload, headers=headers, verify=self.verify)
+        return self._request('POST', '/proxies', json=payload, headers=headers)
 
     @validate_api_v2
     @request_error_handler
     def update_proxy(self, proxy_id=None, address=None, enable=True):
-        headers = self.headers
-        headers.update({
+        headers = {
             "Content-Type": "application/json"
-        })
+        }
 
         proxy = self.get_proxies(proxy_id=proxy_id).json()['proxies']
         payload = {
@@ -530,13 +962,11 @@ class VectraClient(object):
             }
         }
 
-        return requests.patch('{url}/proxies/{id}'.format(url=self.url, id=proxy_id), json=payload, headers=headers,
-                              verify=self.verify)
+        return self._request('PATCH', '/proxies/{id}'.format(id=proxy_id), json=payload, headers=headers)
 
     @validate_api_v2
     def delete_proxy(self,proxy_id=None):
-        return requests.delete('{url}/proxies/{id}'.format(url=self.url, id=proxy_id), headers=self.headers,
-                              verify=self.verify)
+        return self._request('DELETE', '/proxies/{id}'.format(id=proxy_id))
 
     @validate_api_v2
     @request_error_handler
@@ -551,7 +981,23 @@ class VectraClient(object):
         :param duration: days that the threat feed will be applied
         :returns: request object
         """
+        payload = self._generate_feed_payload(name=name, category=category, certainty=certainty, itype=itype,
+                                              duration=duration)
 
+        headers = {
+            'Content-Type': "application/json",
+            'Cache-Control': "no-cache"
+        }
+
+        return self._request('POST', '/threatFeeds', data=json.dumps(payload), headers=headers)
+
+    @staticmethod
+    def _generate_feed_payload(name=None, category=None, certainty=None, itype=None, duration=None):
+        """
+        Generate threat feed payload
+        Same parameters as create_feed()
+        :rtype: dict
+        """
         # TODO update category to detection_category
         payload = {
             "threatFeed": {
@@ -565,14 +1011,7 @@ class VectraClient(object):
             }
         }
 
-        headers = self.headers.copy()
-        headers.update({
-            'Content-Type': "application/json",
-            'Cache-Control': "no-cache"
-        })
-
-        return requests.post('{url}/threatFeeds'.format(url=self.url), data=json.dumps(payload), headers=headers,
-                             verify=self.verify)
+        return payload
 
     @validate_api_v2
     @request_error_handler
@@ -581,8 +1020,7 @@ class VectraClient(object):
         Deletes threat feed from Vectra
         :param feed_id: id of threat feed (returned by get_feed_by_name())
         """
-        return requests.delete('{url}/threatFeeds/{id}'.format(url=self.url, id=feed_id),
-                               headers=self.headers, verify=self.verify)
+        return self._request('DELETE', '/threatFeeds/{id}'.format(id=feed_id))
 
     @validate_api_v2
     @request_error_handler
@@ -590,7 +1028,7 @@ class VectraClient(object):
         """
         Gets list of currently configured threat feeds
         """
-        return requests.get('{url}/threatFeeds'.format(url=self.url), headers=self.headers, verify=self.verify)
+        return self._request('GET', '/threatFeeds', cached=True)
 
     @validate_api_v2
     def get_feed_by_name(self, name=None):
@@ -599,7 +1037,7 @@ class VectraClient(object):
         :param name: name of threat feed
         """
         try:
-            response = requests.get('{url}/threatFeeds'.format(url=self.url), headers=self.headers, verify=self.verify)
+            response = self._request('GET', '/threatFeeds')
         except requests.ConnectionError:
             raise Exception('Unable to connect to remote host')
 
@@ -608,34 +1046,74 @@ class VectraClient(object):
                 if feed['name'].lower() == name.lower():
                     return feed['id']
         else:
-            raise Exception(response.status_code, response.content)
+            raise HTTPException(response.status_code, response.content, response=response)
 
     @validate_api_v2
     @request_error_handler
-    def post_stix_file(self, feed_id=None, stix_file=None):
+    def post_stix_file(self, feed_id=None, stix_file=None, progress=None, use_mmap=False, chunk_size=1024 * 1024):
         """
         Uploads STIX file to new threat feed or overwrites STIX file in existing threat feed
+        The multipart body is streamed from disk, so memory use does not grow with the size of the file
         :param feed_id: id of threat feed (returned by get_feed_by_name)
         :param stix_file: stix filename
+        :param progress: function called with an UploadProgress (sent, total, elapsed, rate) as the body is sent,
+        ex ProgressPrinter() - optional
+        :param use_mmap: read the file through a memory map (default: False)
+        :param chunk_size: bytes read from the file and sent at a time, which is also how often progress is called
+        (default: 1 MiB)
         """
-        return requests.post('{url}/threatFeeds/{id}'.format(url=self.url, id=feed_id), headers=self.headers,
-                             files={'file': open(stix_file)}, verify=self.verify)
+        with MultipartFile(stix_file, chunk_size=chunk_size, use_mmap=use_mmap, progress=progress) as body:
+            return self._request('POST', '/threatFeeds/{id}'.format(id=feed_id), data=body.chunks(),
+                                 headers={'Content-Type': body.content_type})
 
     @validate_api_v2
     @request_error_handler
-    def advanced_search(self, stype=None, page_size=50, query=None):
+    def advanced_search(self, stype=None, page_size=50, query=None, page=None):
         """
         Advanced search
         :param stype: search type (hosts, detections)
         :param page_size: number of objects returned per page (default: 50, max: 5000)
         :param advanced query (download the following guide for more details on query language
             https://support.vectranetworks.com/hc/en-us/articles/360003225254-Search-Reference-Guide)
+        :param page: page number to return - optional
+        """
+        if stype not in ["hosts", "detections"]:
+            raise ValueError("Supported values for stype are hosts or detections")
+        # the query is passed as a parameter so requests url-encodes it (ex &, # and + in quoted values)
+        params = {'page_size': page_size, 'query_string': query}
+        if page:
+            params['page'] = page
+        path = '/search/{stype}/'.format(stype=stype)
+        if self.search_cache is None:
+            return self._request('GET', path, params=params)
+
+        resp = self.search_cache.lookup(stype, query, page_size, page)
+        if self.metrics is not None:
+            self.metrics.observe_cache(endpoint_template(path), resp is not None)
+        if resp is None:
+            resp = self._request('GET', path, params=params)
+            if resp.status_code == 200:
+                self.search_cache.store(stype, query, page_size, page, resp)
+        return resp
+
+    @validate_api_v2
+    def iter_advanced_search(self, stype=None, query=None, page_size=5000, max_workers=None, ordered=True):
+        """
+        Generator to retrieve every result of an advanced search one at a time
+        Pages are retrieved by following the next link unless max_workers is set, in which case the remaining pages are
+        derived from the count of the first page and fetched concurrently
+        :param stype: search type (hosts, detections)
+        :param query: advanced query (see advanced_search)
+        :param page_size: number of objects requested per page (default: 5000, max: 5000)
+        :param max_workers: fetch remaining pages concurrently with up to max_workers requests in flight (int)
+        :param ordered: yield results in page order, otherwise as pages complete (default: True)
+        :rtype: generator of dict
         """
         if stype not in ["hosts", "detections"]:
             raise ValueError("Supported values for stype are hosts or detections")
-        return requests.get('{url}/search/{stype}/?page_size={ps}&query_string={query}'.format(url=self.url, stype=stype,
-                                                ps=page_size, query=query),
-                            headers=self.headers, verify=self.verify)
+        pages = self._get_all_pages(self.advanced_search, {'stype': stype, 'query': query, 'page_size': page_size},
+                                    max_workers=max_workers, ordered=ordered)
+        return (entity for page in pages for entity in page.json()['results'])
 
     @request_error_handler
     def custom_endpoint(self, path=None, **kwargs):
@@ -646,7 +1124,4 @@ class VectraClient(object):
         for k, v in kwargs.items():
             params[k] = v
 
-        if self.version == 2:
-            return requests.get(self.url + path, headers=self.headers, params=params, verify=self.verify)
-        else:
-            return requests.get(self.url + path, auth=self.auth, params=params, verify=self.verify)
+        return self._request('GET', path, params=params)
@@ -0,0 +1,601 @@
+import aiohttp
+import asyncio
+import json
+import time
+
+from collections import deque
+from itertools import islice
+
+from .throttle import ConcurrencyGovernor, RetryPolicy, parse_retry_after
+from .vectra import DEFAULT_TIMEOUT, HTTPException, VectraClient, deprecation, validate_api_v2
+
+# seconds between checks for a free governor slot
+GOVERNOR_POLL_INTERVAL = 0.01
+
+
+def request_error_handler(func):
+    async def request_handler(self, **kwargs):
+        response = await func(self, **kwargs)
+
+        if response.status in [200, 201]:
+            return response
+        else:
+            raise HTTPException(response.status, await response.read(), response=response)
+
+    return request_handler
+
+
+class AsyncVectraClient(object):
+
+    # number of triage rules requested per page when looking a rule up by name
+    RULES_PAGE_SIZE = 5000
+
+    def __init__(self, url=None, token=None, user=None, password=None, verify=False, timeout=DEFAULT_TIMEOUT,
+                 limit=100, limit_per_host=10, governor=None, retry=True):
+        """
+        Initialize asyncio Vectra client
+        Methods mirror VectraClient and return aiohttp responses whose body has already been read
+        :param url: IP or hostname of Vectra brain (ex https://www.example.com) - required
+        :param token: API token for authentication when using API v2*
+        :param user: Username to authenticate to Vectra brain when using API v1*
+        :param password: Password when using username to authenticate using API v1*
+        :param verify: Verify SSL (default: False) - optional
+        :param timeout: default timeout in seconds, or (connect, read) tuple, for every request - optional
+        :param limit: maximum number of simultaneous connections in the shared pool (default: 100) - optional
+        :param limit_per_host: maximum number of simultaneous connections per host (default: 10) - optional
+        :param governor: ConcurrencyGovernor instance, or True for a default one, to adapt the number of requests in
+        flight to the brain's throttling and latency (default: None) - optional
+        :param retry: RetryPolicy instance, True for the default policy or False to disable retrying idempotent
+        requests on connection errors, 429 and 5xx responses (default: True) - optional
+        *Either token or user are required
+        """
+        self.url = url
+        self.version = 2 if token else 1
+        self.verify = verify
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.governor = ConcurrencyGovernor() if governor is True else governor or None
+        self.retry = RetryPolicy() if retry is True else retry or None
+        self._session = None
+
+        if isinstance(timeout, tuple):
+            self.timeout = aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+        else:
+            self.timeout = aiohttp.ClientTimeout(total=timeout)
+
+        if token:
+            self.url = '{url}/api/v2'.format(url=url)
+            self.headers = {
+                'Authorization': "Token " + token.strip(),
+            }
+            self.auth = None
+        elif user and password:
+            self.url = '{url}/api'.format(url=url)
+            self.headers = {}
+            self.auth = aiohttp.BasicAuth(user, password)
+            deprecation('Deprecation of the Vectra API v1 will be announced in an upcoming release. Migrate to API v2'
+                        ' when possible')
+        else:
+            raise RuntimeError("At least one form of authentication is required. Please provide a token or username"
+                               " and password")
+
+    _generate_host_params = staticmethod(VectraClient._generate_host_params)
+    _generate_detection_params = staticmethod(VectraClient._generate_detection_params)
+    _generate_feed_payload = staticmethod(VectraClient._generate_feed_payload)
+    _generate_rule_payload = VectraClient._generate_rule_payload
+    _update_rule_payload = VectraClient._update_rule_payload
+    _transform_hosts = VectraClient._transform_hosts
+
+    @property
+    def session(self):
+        """
+        Shared aiohttp session, created on first use inside the running event loop
+        :rtype: aiohttp.ClientSession
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                             ssl=None if self.verify else False)
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.headers, auth=self.auth,
+                                                  timeout=self.timeout)
+        return self._session
+
+    @staticmethod
+    def _encode_params(params):
+        """
+        aiohttp only accepts str, int and float query values; encode bools the way requests does
+        :param params: dict of query parameters
+        :rtype: dict
+        """
+        return dict((k, str(v) if isinstance(v, bool) else v) for k, v in params.items())
+
+    async def _request(self, method, path, params=None, **kwargs):
+        """
+        Issue request through the shared connection pool and read the response body
+        Requests are retried and held by the governor the same way as VectraClient._request
+        :param method: http method
+        :param path: path relative to the api url (ex /hosts/1) or absolute url
+        :rtype: aiohttp.ClientResponse
+        """
+        url = path if str(path).startswith('http') else self.url + path
+        if params:
+            kwargs['params'] = self._encode_params(params)
+
+        attempt = 0
+        while True:
+            response, error = await self._send(method, url, **kwargs)
+            retry_after = parse_retry_after(response.headers.get('Retry-After')) if response is not None else None
+            if retry_after and self.governor is not None:
+                self.governor.pause(retry_after)
+
+            if self.retry is None or not self.retry.should_retry(method, attempt, response=response, error=error):
+                if error is not None:
+                    raise error
+                return response
+
+            await asyncio.sleep(self.retry.delay(attempt, retry_after))
+            attempt += 1
+
+    async def _send(self, method, url, **kwargs):
+        """
+        Send a single request, holding a governor slot while it is in flight
+        :rtype: tuple (response or None, connection error or None)
+        """
+        if self.governor is not None:
+            while True:
+                wait = self.governor.try_acquire()
+                if wait is None:
+                    break
+                await asyncio.sleep(wait or GOVERNOR_POLL_INTERVAL)
+
+        response, error = None, None
+        start = time.time()
+        try:
+            async with self.session.request(method, url, **kwargs) as response:
+                await response.read()
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            response, error = None, e
+        finally:
+            if self.governor is not None:
+                self.governor.release(time.time() - start, response.status if response is not None else None)
+
+        return response, error
+
+    async def close(self):
+        """
+        Close pooled connections
+        """
+        if self._session is not None:
+            await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _get_all_pages(self, get_page, kwargs, max_workers=None, ordered=True):
+        """
+        Async generator to retrieve every page of a paginated endpoint
+        Pages are retrieved by following the next link unless max_workers is set, in which case the remaining page
+        numbers are derived from the count of the first response and requested concurrently
+        :param get_page: coroutine method returning a single page (ex get_hosts)
+        :param kwargs: query parameters passed to get_page
+        :param max_workers: number of concurrent page requests (int)
+        :param ordered: yield pages in page order, otherwise as they complete
+        """
+        resp = await get_page(**kwargs)
+        yield resp
+        body = await resp.json()
+
+        if not max_workers or max_workers < 2:
+            while body['next']:
+                path = body['next'].replace(self.url, '')
+                resp = await self.custom_endpoint(path=path)
+                yield resp
+                body = await resp.json()
+            return
+
+        if not body['next']:
+            return
+
+        page_size = len(body['results'])
+        first_page = int(kwargs.get('page') or 1)
+        last_page = -(-body['count'] // page_size)
+        remaining = iter(range(first_page + 1, last_page + 1))
+
+        def submit(page):
+            return asyncio.ensure_future(get_page(**dict(kwargs, page=page, page_size=page_size)))
+
+        pending = ()
+        try:
+            if ordered:
+                pending = deque(submit(page) for page in islice(remaining, max_workers))
+                while pending:
+                    resp = await pending.popleft()
+                    for page in remaining:
+                        pending.append(submit(page))
+                        break
+                    yield resp
+            else:
+                pending = set(submit(page) for page in islice(remaining, max_workers))
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        for page in remaining:
+                            pending.add(submit(page))
+                            break
+                        yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    # TODO Consolidate get methods
+    @request_error_handler
+    async def get_hosts(self, **kwargs):
+        """
+        Query all hosts - all parameters are optional
+        Same parameters as VectraClient.get_hosts()
+        """
+        return await self._request('GET', '/hosts', params=self._generate_host_params(kwargs))
+
+    def get_all_hosts(self, max_workers=None, ordered=True, **kwargs):
+        """
+        Async generator to retrieve all hosts page by page
+        Same parameters as get_hosts()
+        :param max_workers: request remaining pages concurrently with up to max_workers requests in flight (int)
+        :param ordered: yield pages in page order, otherwise as they complete (default: True)
+        """
+        return self._get_all_pages(self.get_hosts, kwargs, max_workers=max_workers, ordered=ordered)
+
+    @request_error_handler
+    async def get_host_by_id(self, host_id=None, **kwargs):
+        """
+        Get host by id
+        :param host_id: host id - required
+        :param fields: comma separated string of fields to be filtered and returned - optional
+        """
+        if not host_id:
+            raise Exception('Host id required')
+
+        return await self._request('GET', '/hosts/{id}'.format(id=host_id),
+                                   params=self._generate_host_params(kwargs))
+
+    @validate_api_v2
+    @request_error_handler
+    async def set_key_asset(self, host_id=None, set=True):
+        """
+        (Un)set host as key asset
+        :param host_id: id of host needing to be set - required
+        :param set: set flag to true if setting host as key asset
+        """
+        if not host_id:
+            raise ValueError('Host id required')
+
+        headers = {
+            'Content-Type': 'application/x-www-form-urlencoded'
+        }
+
+        if set:
+            payload = 'key_asset=True'
+        else:
+            payload = 'key_asset=False'
+
+        return await self._request('PATCH', '/hosts/{id}'.format(id=host_id), headers=headers, data=payload)
+
+    @validate_api_v2
+    @request_error_handler
+    async def get_host_tags(self, host_id=None):
+        """
+        Get host tags
+        :param host_id:
+        """
+        return await self._request('GET', '/tagging/host/{id}'.format(id=host_id))
+
+    @validate_api_v2
+    @request_error_handler
+    async def set_host_tags(self, host_id=None, tags=[], append=False):
+        """
+        Set host tags
+        :param host_id:
+        :param tags: list of tags to add to host
+        :param append: overwrites existing list if set to False, appends to existing tags if set to True
+        Set to empty list to clear tags (default: False)
+        """
+        if append and type(tags) == list:
+            current_list = (await (await self.get_host_tags(host_id=host_id)).json())['tags']
+            payload = {
+                "tags": current_list + tags
+            }
+        elif type(tags) == list:
+            payload = {
+                "tags": tags
+            }
+        else:
+            raise TypeError('tags must be of type list')
+
+        headers = {
+            'Content-Type': "application/json",
+            'Cache-Control': "no-cache"
+        }
+
+        return await self._request('PATCH', '/tagging/host/{id}'.format(id=host_id), headers=headers,
+                                   data=json.dumps(payload))
+
+    # TODO consolidate get methods
+    @request_error_handler
+    async def get_detections(self, **kwargs):
+        """
+        Query all detections - all paramters are optional
+        Same parameters as VectraClient.get_detections()
+        """
+        return await self._request('GET', '/detections', params=self._generate_detection_params(kwargs))
+
+    def get_all_detections(self, max_workers=None, ordered=True, **kwargs):
+        """
+        Async generator to retrieve all detections page by page
+        Same parameters as get_detections()
+        :param max_workers: request remaining pages concurrently with up to max_workers requests in flight (int)
+        :param ordered: yield pages in page order, otherwise as they complete (default: True)
+        """
+        return self._get_all_pages(self.get_detections, kwargs, max_workers=max_workers, ordered=ordered)
+
+    @request_error_handler
+    async def get_detection_by_id(self, detection_id=None, **kwargs):
+        """
+        Get detection by id
+        :param detection_id: detection id - required
+        :param fields: comma separated string of fields to be filtered and returned
+        """
+        if not detection_id:
+            raise Exception('Detection id required')
+
+        return await self._request('GET', '/detections/{id}'.format(id=detection_id),
+                                   params=self._generate_detection_params(kwargs))
+
+    @validate_api_v2
+    @request_error_handler
+    async def get_detection_tags(self, detection_id=None):
+        """
+        Get detection tags
+        :param detection_id:
+        """
+        return await self._request('GET', '/tagging/detection/{id}'.format(id=detection_id))
+
+    @validate_api_v2
+    @request_error_handler
+    async def set_detection_tags(self, detection_id=None, tags=[], append=False):
+        """
+        Set detection tags
+        :param detection_id:
+        :param tags: list of tags to add to detection
+        :param append: overwrites existing list if set to False, appends to existing tags if set to True
+        Set to empty list to clear all tags (default: False)
+        """
+        if append and type(tags) == list:
+            current_list = (await (await self.get_detection_tags(detection_id=detection_id)).json())['tags']
+            payload = {
+                "tags": current_list + tags
+            }
+        elif type(tags) == list:
+            payload = {
+                "tags": tags
+            }
+        else:
+            raise TypeError('tags must be of type list')
+
+        headers = {
+            'Content-Type': "application/json",
+            'Cache-Control': "no-cache"
+        }
+
+        return await self._request('PATCH', '/tagging/detection/{id}'.format(id=detection_id), headers=headers,
+                                   data=json.dumps(payload))
+
+    @validate_api_v2
+    async def get_rules(self, name=None, rule_id=None):
+        """
+        Get triage rules
+        :param name: name of triage rule to retrieve
+        :param rule_id: id of triage rule to retrieve
+        """
+        if rule_id:
+            return await self._request('GET', '/rules/{id}'.format(id=rule_id))
+        elif name:
+            # every page is searched, the first page only holds the oldest rules
+            pages = self._get_all_pages(self._get_rules_page, {'page_size': self.RULES_PAGE_SIZE})
+            try:
+                async for page in pages:
+                    for rule in (await page.json())['results']:
+                        if rule['description'] == name:
+                            return rule
+            finally:
+                await pages.aclose()
+        else:
+            return await self._request('GET', '/rules')
+
+    @validate_api_v2
+    @request_error_handler
+    async def _get_rules_page(self, **kwargs):
+        """
+        Single page of triage rules
+        :param page: page number
+        :param page_size: number of rules per page
+        """
+        return await self._request('GET', '/rules', params=kwargs)
+
+    @validate_api_v2
+    @request_error_handler
+    async def create_rule(self, **kwargs):
+        """
+        Create triage rule
+        Same parameters as VectraClient.create_rule()
+        """
+        return await self._request('POST', '/rules', json=self._generate_rule_payload(**kwargs))
+
+    @validate_api_v2
+    @request_error_handler
+    async def update_rule(self, rule_id=None, name=None, append=False, **kwargs):
+        """
+        Update triage rule
+        Same parameters as VectraClient.update_rule()
+        """
+        if not rule_id and not name:
+            raise ValueError("rule name or id must be provided")
+
+        if name:
+            found = await self.get_rules(name=name)
+            if found is None:
+                raise ValueError("no triage rule named {}".format(name))
+            id = found['id']
+        else:
+            id = rule_id
+        rule = self._update_rule_payload(await (await self.get_rules(rule_id=id)).json(), append=append, **kwargs)
+
+        return await self._request('PUT', '/rules/{id}'.format(id=id), json=rule)
+
+    @validate_api_v2
+    async def delete_rule(self, rule_id=None, restore_detections=True):
+        """
+        Delete triage rule
+        :param rule_id:
+        :param restore_detections: restore previously triaged detections (bool) default behavior is to restore
+        detections
+        """
+        params = {
+            'restore_detections': restore_detections
+        }
+
+        return await self._request('DELETE', '/rules/{id}'.format(id=rule_id), params=params)
+
+    @validate_api_v2
+    @request_error_handler
+    async def get_proxies(self, proxy_id=None):
+        if proxy_id:
+            return await self._request('GET', '/proxies/{id}'.format(id=proxy_id))
+        else:
+            return await self._request('GET', '/proxies')
+
+    @validate_api_v2
+    @request_error_handler
+    async def add_proxy(self, address=None, enable=True):
+        payload = {
+            "proxy": {
+                "address": address,
+                "considerProxy": enable
+            }
+        }
+
+        return await self._request('POST', '/proxies', json=payload)
+
+    @validate_api_v2
+    @request_error_handler
+    async def update_proxy(self, proxy_id=None, address=None, enable=True):
+        proxy = (await (await self.get_proxies(proxy_id=proxy_id)).json())['proxies']
+        payload = {
+            "proxy": {
+                "address": address if address else proxy['ip'],
+                "considerProxy": enable
+            }
+        }
+
+        return await self._request('PATCH', '/proxies/{id}'.format(id=proxy_id), json=payload)
+
+    @validate_api_v2
+    async def delete_proxy(self, proxy_id=None):
+        return await self._request('DELETE', '/proxies/{id}'.format(id=proxy_id))
+
+    @validate_api_v2
+    @request_error_handler
+    async def create_feed(self, name=None, category=None, certainty=None, itype=None, duration=None):
+        """
+        Creates new threat feed
+        Same parameters as VectraClient.create_feed()
+        """
+        payload = self._generate_feed_payload(name=name, category=category, certainty=certainty, itype=itype,
+                                              duration=duration)
+
+        headers = {
+            'Content-Type': "application/json",
+            'Cache-Control': "no-cache"
+        }
+
+        return await self._request('POST', '/threatFeeds', data=json.dumps(payload), headers=headers)
+
+    @validate_api_v2
+    @request_error_handler
+    async def delete_feed(self, feed_id=None):
+        """
+        Deletes threat feed from Vectra
+        :param feed_id: id of threat feed (returned by get_feed_by_name())
+        """
+        return await self._request('DELETE', '/threatFeeds/{id}'.format(id=feed_id))
+
+    @validate_api_v2
+    @request_error_handler
+    async def get_feeds(self):
+        """
+        Gets list of currently configured threat feeds
+        """
+        return await self._request('GET', '/threatFeeds')
+
+    @validate_api_v2
+    async def get_feed_by_name(self, name=None):
+        """
+        Gets configured threat feed by name and returns id (used in conjunction with updating and deleting feeds)
+        :param name: name of threat feed
+        """
+        try:
+            response = await self._request('GET', '/threatFeeds')
+        except aiohttp.ClientConnectionError:
+            raise Exception('Unable to connect to remote host')
+
+        if response.status == 200:
+            for feed in (await response.json())['threatFeeds']:
+                if feed['name'].lower() == name.lower():
+                    return feed['id']
+        else:
+            raise HTTPException(response.status, await response.read(), response=response)
+
+    @validate_api_v2
+    @request_error_handler
+    async def post_stix_file(self, feed_id=None, stix_file=None):
+        """
+        Uploads STIX file to new threat feed or overwrites STIX file in existing threat feed
+        :param feed_id: id of threat feed (returned by get_feed_by_name)
+        :param stix_file: stix filename
+        """
+        with open(stix_file, 'rb') as fd:
+            data = aiohttp.FormData()
+            data.add_field('file', fd)
+            return await self._request('POST', '/threatFeeds/{id}'.format(id=feed_id), data=data)
+
+    @validate_api_v2
+    @request_error_handler
+    async def advanced_search(self, stype=None, page_size=50, query=None):
+        """
+        Advanced search
+        :param stype: search type (hosts, detections)
+        :param page_size: number of objects returned per page (default: 50, max: 5000)
+        :param advanced query (download the following guide for more details on query language
+            https://support.vectranetworks.com/hc/en-us/articles/360003225254-Search-Reference-Guide)
+        """
+        if stype not in ["hosts", "detections"]:
+            raise ValueError("Supported values for stype are hosts or detections")
+
+        params = {
+            'page_size': page_size,
+            'query_string': query
+        }
+
+        return await self._request('GET', '/search/{stype}/'.format(stype=stype), params=params)
+
+    @request_error_handler
+    async def custom_endpoint(self, path=None, **kwargs):
+        if not str(path).startswith('/'):
+            path = '/' + str(path)
+
+        params = {}
+        for k, v in kwargs.items():
+            params[k] = v
+
+        return await self._request('GET', path, params=params)
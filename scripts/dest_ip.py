@@ -3,8 +3,9 @@ import json
 import requests
 import vat.vectra as vectra
 
-from operator import itemgetter
-from vat.cli import commonArgs, getPassword
+from vat.analytics import GroupCounter, detection_pages
+from vat.cli import commonArgs, getPassword, traceArgs
+from vat.tracing import open_tracer, span, traced
 
 
 requests.packages.urllib3.disable_warnings()
@@ -16,7 +17,10 @@ subparsers = parser.add_subparsers(dest='action')
 
 parser_host = subparsers.add_parser('host',
                                     help='retrieve data from Vectra brain')
-parser_host = commonArgs(parser_host)
+parser_host = traceArgs(commonArgs(parser_host))
+parser_host.add_argument('--all',
+                         action='store_true',
+                         help='stream every page of detections instead of a single page')
 parser_host.add_argument('--summary',
                     help='summarize based on total count or per detection (default: %(default)s)', choices=['total', 'detection'], default='total')
 
@@ -28,10 +32,11 @@ parser_file.add_argument('filename',
                                     help='file to import data')
 
 args = vars(parser.parse_args())
+tracer = open_tracer(args['trace']) if args.get('trace') else None
 
 if args['action'] == 'file':
     filename = open(args['filename'], 'r')
-    response = json.loads(filename.read())
+    pages = [json.loads(filename.read())['results']]
 else:
     if args['user']:
         args['password'] = getPassword()
@@ -39,48 +44,28 @@ else:
         print ('This script only supports v1 of the API. Please use --user')
         exit(0)
 
-    vc = vectra.VectraClient(url=args['url'], user=args['user'], password=args['password'])
+    vc = vectra.VectraClient(url=args['url'], user=args['user'], password=args['password'], tracer=tracer)
 
-    response = vc.get_detections(state=args['state'], page_size=args['page_size'], page=args['page'],
-                                 fields=args['fields'],
-                                 order=args['order']).json()
+    pages = detection_pages(vc, args)
 
 if args['summary'] == 'detection':
-    detectionList = []
-    detectionCount = []
-    for result in response['results']:
-        name = result['type_vname']
-        for detection_detail in result['detection_detail_set']:
-            destination = detection_detail['dst_ip']
-            if destination is None:
-                continue
-            else:
-                detectionList.append([name, destination])
-
-    countSet = [list(x) for x in set(tuple(x) for x in detectionList)]
-    for pair in countSet:
-        value = detectionList.count(pair)
-        detectionCount.append([pair[0], pair[1], value])
-        # print(pair, value)
-
-    detectionCount = sorted(detectionCount, key=itemgetter(2, 0), reverse=True)
+    counter = GroupCounter(keys=['type_vname'], detail_keys=['dst_ip'], skip_none=True)
+else:
+    counter = GroupCounter(detail_keys=['dst_ip'], skip_none=True)
+
+for results in traced(tracer, pages, 'wait for page'):
+    with span(tracer, 'aggregate', category='pipeline', rows=len(results)):
+        counter.update(results)
 
+if tracer is not None:
+    tracer.close()
+
+if args['summary'] == 'detection':
     print('\n\n{:*<40}{:*<30}{:*<5}'.format('Detection', 'Destination', 'Count'))
-    for det in detectionCount:
+    for det in counter.most_common():
         print('{:<40}{:<30}{:<5}'.format(*det))
 
 if args['summary'] == 'total':
-    dstDict = {}
-    for result in response['results']:
-        for detection_detail in result.get('detection_detail_set'):
-            if detection_detail['dst_ip'] is None:
-                continue
-            if detection_detail['dst_ip'] in dstDict:
-                dstDict[detection_detail['dst_ip']] += 1
-            else:
-                dstDict[detection_detail['dst_ip']] = 1
-
-#    pprint.pprint(srcDict)
     print('\n\n{:*<40}{:*<5}'.format('Destination', 'Count'))
-    for key, value in sorted(dstDict.iteritems(), key=lambda (k, v): v, reverse=True):
-        print('{:<40}{:<5}'.format(key, value))
+    for dst in counter.most_common():
+        print('{:<40}{:<5}'.format(*dst))
@@ -3,7 +3,9 @@ import json
 import requests
 import vat.vectra as vectra
 
-from vat.cli import commonArgs, getPassword
+from vat.analytics import GroupCounter, detection_pages
+from vat.cli import commonArgs, getPassword, traceArgs
+from vat.tracing import open_tracer, span, traced
 
 requests.packages.urllib3.disable_warnings()
 
@@ -14,7 +16,10 @@ subparsers = parser.add_subparsers(dest='action')
 
 parser_host = subparsers.add_parser('host',
                                     help='retrieve data from Vectra brain')
-parser_host = commonArgs(parser_host)
+parser_host = traceArgs(commonArgs(parser_host))
+parser_host.add_argument('--all',
+                         action='store_true',
+                         help='stream every page of detections instead of a single page')
 
 parser_file = subparsers.add_parser('file',
                                     help='Load data from file')
@@ -22,10 +27,11 @@ parser_file.add_argument('filename',
                                     help='file to import data')
 
 args = vars(parser.parse_args())
+tracer = open_tracer(args['trace']) if args.get('trace') else None
 
 if args['action'] == 'file':
     filename = open(args['filename'], 'r')
-    response = json.loads(filename.read())
+    pages = [json.loads(filename.read())['results']]
 else:
     if args['user']:
         args['password'] = getPassword()
@@ -33,22 +39,18 @@ else:
         print ('This script only supports v1 of the API. Please use --user')
         exit(0)
 
-    vc = vectra.VectraClient(url=args['url'], user=args['user'], password=args['password'])
+    vc = vectra.VectraClient(url=args['url'], user=args['user'], password=args['password'], tracer=tracer)
 
-    response = vc.get_detections(state=args['state'], page_size=args['page_size'], page=args['page'],
-                                 fields=args['fields'],
-                                 order=args['order']).json()
+    pages = detection_pages(vc, args)
 
-detectionDict = {}
+counter = GroupCounter(keys=['type_vname'])
+for results in traced(tracer, pages, 'wait for page'):
+    with span(tracer, 'aggregate', category='pipeline', rows=len(results)):
+        counter.update(results)
 
-for result in response['results']:
-    if result['type_vname'] not in detectionDict:
-        detectionDict[result['type_vname']] = 1
-    else:
-        detectionDict[result['type_vname']] += 1
-
-# pprint.pprint(detectionDict)
+if tracer is not None:
+    tracer.close()
 
 print('\n\n{:*<40}{:*<5}'.format('Detection', 'Count'))
-for key, value in sorted(detectionDict.iteritems(), key=lambda (k, v): v, reverse=True):
-    print('{:<40}{:<5}'.format(key, value))
\ No newline at end of file
+for det in counter.most_common():
+    print('{:<40}{:<5}'.format(*det))
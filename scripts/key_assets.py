@@ -33,24 +33,23 @@ def main():
 
     set_ka = True if not args['unset'] else False
 
-    if args['file'] and args['type'] == 'hostname':
-        hostfile = open(args['target'], 'r')
-        for host in hostfile.readlines():
-            try:
-                host_id = vc.get_hosts(name=host.strip()).json()['results'][0]['id']
-                resp = vc.set_key_asset(host_id=host_id, set=set_ka)
-                respCode(args, resp, host.strip())
-            except IndexError:
-                print host.strip() + " is not present in Vectra"
-    elif args['file'] and args['type'] == 'ip':
-        hostfile = open(args['target'], 'r')
-        for host in hostfile.readlines():
-            try:
-                host_id = vc.get_hosts(last_source=host.strip()).json()['results'][0]['id']
-                resp = vc.set_key_asset(host_id=host_id, set=set_ka)
-                respCode(args, resp, host.strip())
-            except IndexError:
-                print host.strip() + " is not present in Vectra"
+    if args['file']:
+        with open(args['target'], 'r') as hostfile:
+            targets = [line.strip() for line in hostfile if line.strip()]
+
+        if args['type'] == 'id':
+            host_ids = dict((target, target) for target in targets)
+        else:
+            host_ids = resolveHosts(vc, targets, 'name' if args['type'] == 'hostname' else 'last_source')
+
+        for target in targets:
+            if target not in host_ids:
+                print(target + " is not present in Vectra")
+
+        names = dict((host_id, target) for target, host_id in host_ids.items())
+        results = vc.set_key_assets(host_ids=list(names), set=set_ka, max_workers=args['workers'])
+        for result in results:
+            bulkRespCode(args, result, names[result.id])
     else:
         if args['type'] == 'hostname':
             hosts = vc.get_hosts(name=args['target']).json()['results']
@@ -80,16 +79,46 @@ def commonArgs(parser):
     parser.add_argument('--unset',
                         action='store_true',
                         help='set flag to unset host as key asset')
+    parser.add_argument('--workers',
+                        type=int,
+                        help='number of concurrent requests when using --file (default: %(default)s)',
+                        default=8)
     return parser
 
 
+def resolveHosts(vc, targets, field):
+    """
+    Map hostnames or ip addresses to host ids with a single pass over all hosts
+    :param vc: VectraClient
+    :param targets: list of hostnames or ip addresses
+    :param field: host field to match (name or last_source)
+    :rtype: dict of target to host id
+    """
+    wanted = set(targets)
+    host_ids = {}
+    for host in vc.iter_hosts(fields='id,name,last_source', page_size=5000):
+        if host[field] in wanted and host[field] not in host_ids:
+            host_ids[host[field]] = host['id']
+    return host_ids
+
+
 def respCode(args, resp, hostname):
     if resp.status_code == 200 and args['unset']:
-        print "Successfully unset host " + str(hostname) + " as key asset"
+        print("Successfully unset host " + str(hostname) + " as key asset")
     elif resp.status_code == 200 and not args['unset']:
-        print "Successfully set host " + str(hostname) + " as key asset"
+        print("Successfully set host " + str(hostname) + " as key asset")
+    else:
+        print("Unknown response")
+
+
+def bulkRespCode(args, result, hostname):
+    action = 'unset' if args['unset'] else 'set'
+    if result.success:
+        print("Successfully {action} host {host} as key asset ({latency:.0f} ms)".format(
+            action=action, host=hostname, latency=result.latency * 1000))
     else:
-        print "Unknown response"
+        print("Failed to {action} host {host} as key asset: {status} {error}".format(
+            action=action, host=hostname, status=result.status_code, error=result.error))
 
 
 if __name__ == '__main__':
@@ -1,14 +1,16 @@
 #! /usr/bin/env python
 
 import argparse
+import json
 import logging
+import os
 import requests
 import smtplib
+import sqlite3
 import vat.vectra as vectra
 
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from tinydb import TinyDB, Query
 
 
 requests.packages.urllib3.disable_warnings()
@@ -34,20 +36,47 @@ params = {
     'toAddr': ''
 }
 
-vdb = TinyDB('vectra.json')
-ht = vdb.table('hosts')
-upd = vdb.table('updates')
+# known host ids are kept in an indexed sqlite table; vectra.json is the TinyDB file used by earlier versions
+DB_FILE = 'new_hosts.db'
+LEGACY_DB_FILE = 'vectra.json'
 
-vc = vectra.VectraClient(url=params['url'], token=params['token'])
-hosts = vc.get_hosts(fields='id,name,last_source').json()['results']
 
+def open_db(path=DB_FILE, legacy_path=LEGACY_DB_FILE):
+    db = sqlite3.connect(path)
+    db.execute('CREATE TABLE IF NOT EXISTS hosts (id INTEGER PRIMARY KEY, name TEXT, ip TEXT)')
 
-def insert_host(db, host):
-    db.insert({
-        'id': host['id'],
-        'name': host['name'],
-        'ip': host['last_source']
-    })
+    if not db.execute('SELECT COUNT(*) FROM hosts').fetchone()[0] and os.path.exists(legacy_path):
+        with open(legacy_path) as legacy:
+            legacy_hosts = json.load(legacy).get('hosts', {}).values()
+        with db:
+            db.executemany('INSERT OR IGNORE INTO hosts VALUES (?, ?, ?)',
+                           [(host['id'], host['name'], host['ip']) for host in legacy_hosts])
+        logger.info('imported {num} hosts from {file}'.format(num=len(legacy_hosts), file=legacy_path))
+
+    return db
+
+
+def find_new_hosts(vc, known_ids):
+    """
+    Set difference of every host on the brain against the known host ids
+    :rtype: list of dict (id, name, ip)
+    """
+    new_hosts = []
+    for page in vc.get_all_hosts(fields='id,name,last_source', page_size=5000):
+        for host in page.json()['results']:
+            if host['id'] not in known_ids:
+                new_hosts.append({
+                    'id': host['id'],
+                    'name': host['name'],
+                    'ip': host['last_source']
+                })
+    return new_hosts
+
+
+def insert_hosts(db, hosts):
+    with db:
+        db.executemany('INSERT OR REPLACE INTO hosts VALUES (?, ?, ?)',
+                       [(host['id'], host['name'], host['ip']) for host in hosts])
 
 
 def send_message(hosts):
@@ -71,24 +100,24 @@ def send_message(hosts):
 
 
 def main():
-    if len(ht) > 0:
-        Host = Query()
-        [insert_host(upd, host) for host in hosts if not ht.search(Host.id == host['id'])]
-        ht.insert_multiple(upd.all())
-        logger.info('hosts added: {num}'.format(num=len(upd)))
-        [logger.debug('id: {id}, host: {name}, ip: {ip} added'.format(id=host['id'], name=host['name'],
-            ip=host['last_source'])) for host in hosts]
-
-        if len(upd) > 0:
-            send_message(upd)
-            vdb.purge_table('updates')
+    db = open_db()
+    vc = vectra.VectraClient(url=params['url'], token=params['token'])
+
+    known_ids = set(row[0] for row in db.execute('SELECT id FROM hosts'))
+    new_hosts = find_new_hosts(vc, known_ids)
+
+    # hosts are only recorded once notified, so a failed message is sent again on the next run
+    if known_ids and new_hosts:
+        send_message(new_hosts)
+    insert_hosts(db, new_hosts)
+
+    if known_ids:
+        logger.info('hosts added: {num}'.format(num=len(new_hosts)))
     else:
         logger.info('initial pass')
-        logger.info('creating hosts table')
-        [insert_host(ht, host) for host in hosts]
-        logger.info('hosts added: {num}'.format(num=len(ht)))
-        [logger.debug('id: {id}, host: {name}, ip: {ip} added'.format(id=host['id'], name=host['name'],
-            ip=host['last_source'])) for host in hosts]
+        logger.info('hosts added: {num}'.format(num=len(new_hosts)))
+    [logger.debug('id: {id}, host: {name}, ip: {ip} added'.format(id=host['id'], name=host['name'],
+        ip=host['ip'])) for host in new_hosts]
 
 
 if __name__ == '__main__':
@@ -3,8 +3,9 @@ import json
 import requests
 import vat.vectra as vectra
 
-from operator import itemgetter
-from vat.cli import commonArgs, getPassword
+from vat.analytics import GroupCounter, detection_pages
+from vat.cli import commonArgs, getPassword, traceArgs
+from vat.tracing import open_tracer, span, traced
 
 requests.packages.urllib3.disable_warnings()
 
@@ -15,7 +16,10 @@ subparsers = parser.add_subparsers(dest='action')
 
 parser_host = subparsers.add_parser('host',
                                     help='retrieve data from Vectra brain')
-parser_host = commonArgs(parser_host)
+parser_host = traceArgs(commonArgs(parser_host))
+parser_host.add_argument('--all',
+                         action='store_true',
+                         help='stream every page of detections instead of a single page')
 parser_host.add_argument('--summary',
                     help='summarize based on total count or per detection (default: %(default)s)', choices=['total', 'detection'], default='total')
 
@@ -27,10 +31,11 @@ parser_file.add_argument('filename',
                                     help='file to import data')
 
 args = vars(parser.parse_args())
+tracer = open_tracer(args['trace']) if args.get('trace') else None
 
 if args['action'] == 'file':
     filename = open(args['filename'], 'r')
-    response = json.loads(filename.read())
+    pages = [json.loads(filename.read())['results']]
 else:
     if args['user']:
         args['password'] = getPassword()
@@ -38,42 +43,29 @@ else:
         print ('This script only supports v1 of the API. Please use --user')
         exit(0)
 
-    vc = vectra.VectraClient(url=args['url'], user=args['user'], password=args['password'])
+    vc = vectra.VectraClient(url=args['url'], user=args['user'], password=args['password'], tracer=tracer)
 
-    response = vc.get_detections(state=args['state'], page_size=args['page_size'], page=args['page'],
-                                 fields=args['fields'],
-                                 order=args['order']).json()
+    pages = detection_pages(vc, args)
 
 if args['summary'] == 'detection':
-    srcList = []
-    count = []
-    for result in response['results']:
-        name = result['type_vname']
-        srcIp = result['src_ip']
-        srcList.append([result['type_vname'], result['src_ip']])
+    counter = GroupCounter(keys=['type_vname', 'src_ip'])
+else:
+    counter = GroupCounter(keys=['src_ip'])
 
-    srcSet = [list(x) for x in set(tuple(x) for x in srcList)]
-    for pair in srcSet:
-        value = srcList.count(pair)
-        count.append([pair[0], pair[1], value])
-        # print(pair, value)
+for results in traced(tracer, pages, 'wait for page'):
+    with span(tracer, 'aggregate', category='pipeline', rows=len(results)):
+        counter.update(results)
 
-    count = sorted(count, key=itemgetter(2, 1), reverse=True)
+if tracer is not None:
+    tracer.close()
 
+if args['summary'] == 'detection':
     print('\n\n{:*<40}{:*<20}{:*<5}'.format('Detection', 'Source', 'Count'))
-    for det in count:
+    for det in counter.most_common():
         print('{:<40}{:<20}{:<5}'.format(*det))
 
 
 if args['summary'] == 'total':
-    srcDict = {}
-    for result in response['results']:
-        if result['src_ip'] in srcDict:
-            srcDict[result['src_ip']] += 1
-        else:
-            srcDict[result['src_ip']] = 1
-
-#    pprint.pprint(srcDict)
     print('\n\n{:*<40}{:*<5}'.format('Source', 'Count'))
-    for key, value in sorted(srcDict.iteritems(), key=lambda (k, v): v, reverse=True):
-        print('{:<40}{:<5}'.format(key, value))
+    for src in counter.most_common():
+        print('{:<40}{:<5}'.format(*src))
@@ -0,0 +1,53 @@
+#! /usr/bin/env python
+
+import argparse
+import requests
+import vat.vectra as vectra
+
+from vat.rules import RuleReconciler, format_plan, load_rules
+
+requests.packages.urllib3.disable_warnings()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sync triage rules with a JSON or YAML desired state file (This script is only supported by v2 "
+                    "endpoint which requires token auth)"
+    )
+    parser.add_argument('--url',
+                        required=True,
+                        help='IP or FQDN for Vectra brain (http://www.example.com)')
+    parser.add_argument('--token',
+                        required=True,
+                        help='Authentication token')
+    parser.add_argument('--prune',
+                        action='store_true',
+                        help='delete rules that are not in the desired state file')
+    parser.add_argument('--dry-run',
+                        action='store_true',
+                        help='print the changes without applying them')
+    parser.add_argument('--workers',
+                        type=int,
+                        default=8,
+                        help='number of concurrent writes (default: %(default)s)')
+    parser.add_argument('file',
+                        help='desired state file (.json, .yml or .yaml)')
+    args = parser.parse_args()
+
+    vc = vectra.VectraClient(url=args.url, token=args.token)
+    reconciler = RuleReconciler(vc, prune=args.prune, max_workers=args.workers)
+    changes, results = reconciler.sync(load_rules(args.file), dry_run=args.dry_run)
+
+    print(format_plan(changes))
+    if results is None:
+        return 0
+
+    failed = [result for result in results if not result.success]
+    for result in failed:
+        print('Failed to {action} {name}: {error}'.format(action=result.id.action, name=result.id.name,
+                                                          error=result.error))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    exit(main())
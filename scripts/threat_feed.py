@@ -5,6 +5,8 @@ import pprint
 import requests
 import vat.vectra as vectra
 
+from vat.upload import ProgressPrinter
+
 requests.packages.urllib3.disable_warnings()
 
 
@@ -37,6 +39,10 @@ def main():
                         action='store',
                         help='SITX file')
 
+    parser_create.add_argument('--progress',
+                        action='store_true',
+                        help='Print upload progress and throughput')
+
     parser_create.add_argument('--category',
                         required=True,
                         action='store',
@@ -83,6 +89,10 @@ def main():
                                action='store',
                                help='SITX file')
 
+    parser_edit.add_argument('--progress',
+                               action='store_true',
+                               help='Print upload progress and throughput')
+
     # Command line arguments for deleting a threat feed
     parser_delete = subparsers.add_parser('delete', help='Delete threat feed')
     parser_delete.add_argument('--feed',
@@ -120,14 +130,16 @@ def main():
         feed_id = vc.create_feed(name=args['feed'], category=args['category'], certainty=args['certainty'],
                                  itype=args['type'], duration=args['duration']).json()['threatFeed']['id']
         print 'Threat feed created\nUploading STIX file\n'
-        vc.post_stix_file(feed_id=feed_id, stix_file=args['file'])
+        vc.post_stix_file(feed_id=feed_id, stix_file=args['file'],
+                          progress=ProgressPrinter() if args['progress'] else None)
 
         print "success"
 
     if args['action'] == 'update':
         feed_id = vc.get_feed_by_name(name=args['feed'])
         if feed_id:
-            vc.post_stix_file(feed_id=feed_id, stix_file=args['file'])
+            vc.post_stix_file(feed_id=feed_id, stix_file=args['file'],
+                              progress=ProgressPrinter() if args['progress'] else None)
             print "success"
         else:
             print 'Could not find threat feed'
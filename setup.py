@@ -5,6 +5,9 @@ _Vectra API Tools_ is set of resources that is designed to save time and repetit
     - _cli.py_ is a set of common parameters which can be imported into scripts which are designed to be run from the command line
     - _stix_taxii.py_ is a module that provides a taxii client to ingest threat feeds and write to STIX file
     - _vectra.py_ is module that provides methods that simplify interaction with the Vectra API. There are methods to support most entities including hosts, detections, and advance search.
+    - _vectra_async.py_ is an asyncio version of the vectra.py client (requires the async extra: aiohttp)
+    - _export.py_ writes hosts and detections to Parquet or Arrow IPC files (requires the export extra: pyarrow)
+    - _fakebrain.py_ is a local stand-in brain serving synthetic hosts and detections for offline and load testing
 """
 
 setup(
@@ -20,7 +23,12 @@ setup(
         'vat': 'modules'
     },
     packages=['vat'],
-    install_requires=['requests', 'pytz', 'cabby', 'stix'],
+    install_requires=['requests', 'pytz', 'cabby', 'stix', 'futures; python_version < "3.2"'],
+    extras_require={
+        'async': ['aiohttp'],
+        'export': ['pyarrow'],
+        'speedups': ['orjson; python_version >= "3.6"']
+    },
     python_requires='>=2.6, !=3.0.*, !=3.1.*, !=3.2.*, <4',
     classifiers=[
         'Development Status :: 4 - Beta',
@@ -1,6 +1,8 @@
 import pytest
 import vat.vectra as vectra
 
+from vat.fakebrain import FakeBrain
+
 
 def pytest_addoption(parser):
     parser.addoption('--url', action='store', help='url or ip of vectra brain')
@@ -24,5 +26,16 @@ def vc_v2(request):
     return vectra.VectraClient(url=brain, token=token)
 
 
+@pytest.fixture(scope='session')
+def fake_brain():
+    with FakeBrain(hosts=200, detections=1000, rules=60) as brain:
+        yield brain
+
+
+@pytest.fixture
+def vc_fake(fake_brain):
+    return vectra.VectraClient(url=fake_brain.url, token=fake_brain.token)
+
+
 # def pytest_namespace():
 #     return {'threatFeed': None}
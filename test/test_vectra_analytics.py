@@ -0,0 +1,53 @@
+from vat.analytics import GroupCounter, count_by, detection_pages
+
+detections = [
+    {'type_vname': 'Port Scan', 'src_ip': '10.0.0.1',
+     'detection_detail_set': [{'dst_ip': '10.0.0.5', 'dst_port': 22}, {'dst_ip': '10.0.0.6', 'dst_port': 22}]},
+    {'type_vname': 'Port Scan', 'src_ip': '10.0.0.2',
+     'detection_detail_set': [{'dst_ip': '10.0.0.5', 'dst_port': 22}]},
+    {'type_vname': 'Hidden HTTPS Tunnel', 'src_ip': '10.0.0.1',
+     'detection_detail_set': [{'dst_ip': '8.8.8.8', 'dst_port': 443}, {'dst_ip': None, 'dst_port': 443}]},
+]
+
+
+def test_detection_keys():
+    assert count_by(detections, keys=['src_ip']) == [('10.0.0.1', 2), ('10.0.0.2', 1)]
+
+
+def test_detail_keys():
+    assert count_by(detections, keys=['type_vname'], detail_keys=['dst_ip'], skip_none=True) == [
+        ('Port Scan', '10.0.0.5', 2), ('Hidden HTTPS Tunnel', '8.8.8.8', 1), ('Port Scan', '10.0.0.6', 1)]
+
+
+def test_none_groups():
+    rows = detections + [{'type_vname': 'Port Scan', 'src_ip': None}]
+    assert count_by(rows, keys=['src_ip']) == [('10.0.0.1', 2), ('10.0.0.2', 1), (None, 1)]
+    assert count_by(rows, keys=['src_ip'], skip_none=True) == [('10.0.0.1', 2), ('10.0.0.2', 1)]
+    assert count_by(detections, detail_keys=['dst_ip'])[-1] == (None, 1)
+
+
+def test_top_n():
+    assert count_by(detections, detail_keys=['dst_port'], top=1) == [(22, 3)]
+
+
+def test_incremental_update():
+    counter = GroupCounter(keys=['type_vname'], detail_keys=['dst_port'])
+    for detection in detections:
+        counter.update([detection])
+
+    assert counter.most_common() == count_by(detections, keys=['type_vname'], detail_keys=['dst_port'])
+    assert counter.rows == 5
+
+
+def test_detection_pages(vc_fake):
+    args = {'state': None, 'page_size': 300, 'page': None, 'fields': 'id,threat', 'order': '-threat'}
+
+    pages = list(detection_pages(vc_fake, args))
+    assert len(pages) == 1 and len(pages[0]) == 300
+
+    args['all'] = True
+    detections = [detection for page in detection_pages(vc_fake, args) for detection in page]
+    assert len(detections) == 1000
+    assert detections[:300] == pages[0]
+    # --order is sent as ordering
+    assert [d['threat'] for d in detections] == sorted((d['threat'] for d in detections), reverse=True)
@@ -0,0 +1,109 @@
+import asyncio
+import pytest
+import requests
+
+from vat.fakebrain import FakeBrain, Faults
+from vat.throttle import RetryPolicy
+
+requests.packages.urllib3.disable_warnings()
+
+vectra_async = pytest.importorskip('vat.vectra_async')
+
+
+@pytest.fixture
+def avc(fake_brain):
+    return vectra_async.AsyncVectraClient(url=fake_brain.url, token=fake_brain.token)
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_get_hosts(avc, vc_fake):
+    async def get_count():
+        async with avc:
+            return (await (await avc.get_hosts()).json())['count']
+
+    assert run(get_count()) == vc_fake.get_hosts().json()['count']
+
+
+def test_host_generator(avc, vc_fake):
+    async def collect():
+        host_ids = []
+        async with avc:
+            async for page in avc.get_all_hosts(page_size=10, max_workers=4, ordered=False):
+                host_ids += [host['id'] for host in (await page.json())['results']]
+        return host_ids
+
+    host_ids = run(collect())
+    assert len(host_ids) == vc_fake.get_hosts().json()['count']
+    assert len(set(host_ids)) == len(host_ids)
+
+
+def test_detection_id(avc, vc_fake):
+    det_id = vc_fake.get_detections().json()['results'][0]['id']
+
+    async def get_detection():
+        async with avc:
+            return await (await avc.get_detection_by_id(detection_id=det_id)).json()
+
+    assert run(get_detection())['id'] == det_id
+
+
+def test_concurrent_requests(avc, vc_fake):
+    host_ids = [host['id'] for host in vc_fake.get_hosts(page_size=20).json()['results']]
+
+    async def get_hosts():
+        async with avc:
+            responses = await asyncio.gather(*[avc.get_host_by_id(host_id=host_id) for host_id in host_ids])
+            return [(await resp.json())['id'] for resp in responses]
+
+    assert run(get_hosts()) == host_ids
+
+
+def test_rule_by_name_beyond_first_page():
+    async def get_rule(avc, name):
+        async with avc:
+            return await avc.get_rules(name=name)
+
+    with FakeBrain(hosts=10, detections=10, rules=120) as brain:
+        avc = vectra_async.AsyncVectraClient(url=brain.url, token=brain.token)
+        avc.RULES_PAGE_SIZE = 50
+
+        assert run(get_rule(avc, 'rule-00110'))['id'] == 110
+        assert run(get_rule(avc, 'no such rule')) is None
+
+
+def test_update_rule_unknown_name():
+    async def update(avc, name):
+        async with avc:
+            return await avc.update_rule(name=name, ip=['10.0.0.1'])
+
+    with FakeBrain(hosts=10, detections=10, rules=10) as brain:
+        avc = vectra_async.AsyncVectraClient(url=brain.url, token=brain.token)
+
+        with pytest.raises(ValueError, match='no triage rule named no such rule'):
+            run(update(avc, 'no such rule'))
+
+
+def test_retry_and_governor():
+    async def collect(avc):
+        host_ids = []
+        async with avc:
+            async for page in avc.get_all_hosts(page_size=10, max_workers=4):
+                host_ids += [host['id'] for host in (await page.json())['results']]
+        return host_ids
+
+    faults = Faults(throttle_rate=0.3, error_rate=0.1, retry_after=0.01)
+    with FakeBrain(hosts=100, detections=0, faults=faults) as brain:
+        avc = vectra_async.AsyncVectraClient(url=brain.url, token=brain.token, governor=True,
+                                             retry=RetryPolicy(retries=10, backoff=0.01))
+
+        assert run(collect(avc)) == list(range(1, 101))
+        assert brain.stats()['statuses'][429] > 0
+        assert avc.governor.stats()['throttled'] > 0
+        assert avc.governor.stats()['in_flight'] == 0
@@ -0,0 +1,53 @@
+import pytest
+import requests
+import vat.vectra as vectra
+
+from vat.cache import ResponseCache
+
+requests.packages.urllib3.disable_warnings()
+
+
+@pytest.fixture
+def vc_cached(fake_brain):
+    return vectra.VectraClient(url=fake_brain.url, token=fake_brain.token, cache=ResponseCache(maxsize=2))
+
+
+def test_cache_hit(vc_cached):
+    host_id = vc_cached.get_hosts().json()['results'][0]['id']
+    resp1 = vc_cached.get_host_by_id(host_id=host_id)
+    resp2 = vc_cached.get_host_by_id(host_id=host_id)
+
+    assert resp1 is resp2
+    assert vc_cached.cache.stats()['hits'] == 1
+
+
+def test_cache_eviction(vc_cached):
+    host_ids = [host['id'] for host in vc_cached.get_hosts(page_size=3).json()['results']]
+    for host_id in host_ids:
+        vc_cached.get_host_by_id(host_id=host_id)
+
+    assert len(vc_cached.cache) == 2
+    assert vc_cached.cache.stats()['evictions'] == 1
+
+
+def test_cache_invalidation(vc_cached):
+    host = vc_cached.get_hosts().json()['results'][0]
+    host_id = host['id']
+    host_tags = host['tags']
+
+    vc_cached.get_host_tags(host_id=host_id)
+    vc_cached.set_host_tags(host_id=host_id, tags=['pytest'])
+    assert vc_cached.get_host_tags(host_id=host_id).json()['tags'] == ['pytest']
+    assert vc_cached.get_host_by_id(host_id=host_id).json()['tags'] == ['pytest']
+
+    vc_cached.set_host_tags(host_id=host_id, tags=host_tags)
+    assert vc_cached.get_host_tags(host_id=host_id).json()['tags'] == host_tags
+
+
+@pytest.mark.parametrize('cache', [True, ResponseCache()])
+def test_cache_enabled(fake_brain, cache):
+    vc = vectra.VectraClient(url=fake_brain.url, token=fake_brain.token, cache=cache)
+
+    assert isinstance(vc.cache, ResponseCache)
+    assert vc.cache is cache or cache is True
+    assert vectra.VectraClient(url=fake_brain.url, token=fake_brain.token, cache=False).cache is None
@@ -0,0 +1,66 @@
+import pytest
+import requests
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+from vat.export import DETECTION_COLUMNS, ColumnarExporter, export_detections, export_hosts
+
+requests.packages.urllib3.disable_warnings()
+
+
+DETECTIONS = [
+    {'id': 1, 'type_vname': 'Hidden HTTP Tunnel', 'category': 'COMMAND & CONTROL', 'state': 'active', 't_score': 40,
+     'c_score': '60', 'src_host': {'id': 7}, 'last_timestamp': '2018-08-31T14:02:19Z', 'tags': ['a'],
+     'detection_detail_set': [{'dst_ip': '1.1.1.1'}]},
+    {'id': 2, 'type_vname': 'Port Scan', 'category': 'RECONNAISSANCE', 'state': 'inactive', 'threat': 10,
+     'last_timestamp': '2018-09-01T01:00:00.500Z'},
+    {'id': 3, 'type_vname': 'Hidden HTTP Tunnel', 'category': 'COMMAND & CONTROL', 'state': 'active'},
+]
+
+
+@pytest.mark.parametrize('format', ['parquet', 'arrow'])
+def test_exporter_row_groups(tmpdir, format):
+    path = str(tmpdir.join('detections.' + format))
+    with ColumnarExporter(path, DETECTION_COLUMNS, format=format, row_group_size=2) as exporter:
+        exporter.write_page({'results': DETECTIONS[:1]})
+        exporter.write_page({'results': DETECTIONS[1:]})
+
+    assert (exporter.rows, exporter.row_groups) == (3, 2)
+
+    if format == 'parquet':
+        table = pq.read_table(path)
+        assert pq.ParquetFile(path).metadata.num_row_groups == 2
+    else:
+        table = pa.ipc.open_file(path).read_all()
+
+    rows = table.to_pylist()
+    assert [row['type_vname'] for row in rows] == ['Hidden HTTP Tunnel', 'Port Scan', 'Hidden HTTP Tunnel']
+    assert [row['threat'] for row in rows] == [40, 10, None]
+    assert rows[0]['certainty'] == 60
+    assert rows[0]['src_host_id'] == 7
+    assert rows[0]['last_timestamp'].year == 2018
+    assert rows[0]['tags'] == ['a']
+    assert rows[0]['detection_detail_set'] == '[{"dst_ip": "1.1.1.1"}]'
+    assert pa.types.is_dictionary(table.schema.field('category').type)
+
+
+def test_exporter_format(tmpdir):
+    with pytest.raises(ValueError):
+        ColumnarExporter(str(tmpdir.join('detections.csv')), DETECTION_COLUMNS, format='csv')
+
+
+def test_export_hosts(vc_fake, tmpdir):
+    path = str(tmpdir.join('hosts.parquet'))
+    count = export_hosts(vc_fake, path, page_size=100, row_group_size=100)
+
+    assert count == vc_fake.get_hosts().json()['count']
+    assert pq.read_table(path).num_rows == count
+
+
+def test_export_detections(vc_fake, tmpdir):
+    path = str(tmpdir.join('detections.arrow'))
+    count = export_detections(vc_fake, path, format='arrow', page_size=100)
+
+    assert count == vc_fake.get_detections().json()['count']
+    assert pa.ipc.open_file(path).read_all().num_rows == count
@@ -0,0 +1,190 @@
+import pytest
+import requests
+import vat.vectra as vectra
+
+from vat import jsonstream
+from vat.fakebrain import FakeBrain, Faults, SyntheticData
+from vat.throttle import RetryPolicy
+
+requests.packages.urllib3.disable_warnings()
+
+
+@pytest.fixture
+def brain(fake_brain):
+    return fake_brain
+
+
+@pytest.fixture
+def vc(vc_fake):
+    return vc_fake
+
+
+def test_synthetic_data_deterministic():
+    first, second = SyntheticData(seed=1), SyntheticData(seed=1)
+
+    assert first.host(7) == second.host(7)
+    assert first.detection(42) == second.detection(42)
+    assert first.detection(42) != SyntheticData(seed=2).detection(42)
+    assert first.host(first.hosts + 1) is None
+
+
+def test_pagination(vc):
+    body = vc.get_hosts(page_size=30).json()
+
+    assert body['count'] == 200
+    assert len(body['results']) == 30
+    assert 'page=2' in body['next']
+
+    pages = list(vc.get_all_detections(page_size=300))
+    assert [len(page.results) for page in pages] == [300, 300, 300, 100]
+
+
+def test_parallel_pages(vc):
+    ids = [d['id'] for page in vc.get_all_detections(page_size=100, max_workers=4) for d in page.results]
+
+    assert ids == list(range(1, 1001))
+
+
+def test_parallel_host_pages(vc):
+    sequential = [h['id'] for page in vc.get_all_hosts(page_size=30) for h in page.json()['results']]
+    pages = list(vc.get_all_hosts(page_size=30, max_workers=4))
+
+    assert [h['id'] for page in pages for h in page.json()['results']] == sequential
+    assert [page.json()['next'] is None for page in pages] == [False] * 6 + [True]
+
+
+@pytest.mark.parametrize('kind', ['hosts', 'detections'])
+def test_parallel_pages_unordered(vc, brain, kind):
+    get_all = vc.get_all_hosts if kind == 'hosts' else vc.get_all_detections
+    count = brain.data.hosts if kind == 'hosts' else brain.data.detections
+    requests_before = brain.requests
+
+    pages = list(get_all(page_size=count // 4 - 1, max_workers=4, ordered=False))
+    ids = [entity['id'] for page in pages for entity in page.json()['results']]
+
+    assert sorted(ids) == list(range(1, count + 1))
+    # one request per page, no page requested twice
+    assert brain.requests - requests_before == len(pages) == 5
+
+
+def test_host_iterator(vc):
+    page_ids = [host['id'] for page in vc.get_all_hosts(page_size=30) for host in page.json()['results']]
+    iter_ids = [host['id'] for host in vc.iter_hosts(page_size=30)]
+
+    assert iter_ids == page_ids == list(range(1, 201))
+
+
+def test_detection_iterator(vc):
+    detections = list(vc.iter_detections(page_size=300, state='active'))
+
+    assert len(detections) == vc.get_detections(state='active', page_size=1).json()['count']
+    assert detections == [d for page in vc.get_all_detections(page_size=300, state='active') for d in page.results]
+
+
+def test_iterator_decodes_pages_once(vc, monkeypatch):
+    parsed = []
+
+    def iter_results(chunks, **kwargs):
+        parsed.append(1)
+        return jsonstream.iter_results(chunks, **kwargs)
+
+    def decoded_again(*args, **kwargs):
+        raise AssertionError('page body decoded a second time')
+
+    monkeypatch.setattr(vectra, 'iter_results', iter_results)
+    monkeypatch.setattr(requests.Response, 'json', decoded_again)
+    monkeypatch.setattr(requests.Response, 'text', property(decoded_again))
+    monkeypatch.setattr(requests.Response, 'content', property(decoded_again))
+
+    assert len(list(vc.iter_detections(page_size=300))) == 1000
+    # a single incremental parse of the streamed body per page
+    assert len(parsed) == 4
+
+
+def test_fields_and_filters(vc):
+    host = vc.get_hosts(page_size=1, fields='id,name').json()['results'][0]
+    assert sorted(host) == ['id', 'name']
+
+    detections = vc.get_detections(threat_gte=50, page_size=5000).json()['results']
+    assert detections and all(d['threat'] >= 50 for d in detections)
+
+    newest = vc.get_detections(ordering='-last_timestamp', page_size=1).json()['results'][0]
+    assert newest['id'] == 1000
+
+
+def test_authentication(brain):
+    with pytest.raises(vectra.HTTPException) as e:
+        vectra.VectraClient(url=brain.url, token='wrong').get_hosts()
+    assert e.value.status_code == 401
+
+    v1 = vectra.VectraClient(url=brain.url, user=brain.user, password=brain.password)
+    assert v1.get_hosts().json()['count'] == 200
+
+
+def test_tags_and_key_assets(vc):
+    vc.set_host_tags(host_id=3, tags=['pytest'])
+    vc.set_host_tags(host_id=3, tags=['foo'], append=True)
+    assert vc.get_host_tags(host_id=3).json()['tags'] == ['pytest', 'foo']
+
+    vc.set_key_asset(host_id=3, set=True)
+    assert vc.get_host_by_id(host_id=3).json()['is_key_asset']
+    assert 3 in [h['id'] for h in vc.get_hosts(is_key_asset=True, page_size=5000).json()['results']]
+
+
+def test_rules(vc):
+    assert vc.get_rules().json()['count'] == 60
+
+    rule_id = vc.create_rule(detection_category='botnet activity', detection_type='outbound dos',
+                             triage_category='misconfiguration', description='pytest_ip', ip=['10.0.0.1']).json()['id']
+    vc.update_rule(rule_id=rule_id, append=True, ip=['10.0.0.2'])
+    assert vc.get_rules(rule_id=rule_id).json()['ip'] == ['10.0.0.1', '10.0.0.2']
+    assert vc.delete_rule(rule_id=rule_id).json()['_meta']['level'] == 'success'
+
+
+def test_proxies_and_feeds(vc, brain, tmpdir):
+    proxy = vc.add_proxy(address='192.168.254.254').json()['proxy']
+    assert vc.update_proxy(proxy_id=proxy['id'], enable=False).json()['proxy']['considerProxy'] is False
+
+    vc.create_feed(name='pytest', category='cnc', certainty='Medium', itype='Watchlist', duration=14)
+    feed_id = vc.get_feed_by_name(name='pytest')
+    stix = tmpdir.join('stix.xml')
+    stix.write('<stix/>')
+    assert vc.post_stix_file(feed_id=feed_id, stix_file=str(stix)).status_code == 200
+    assert brain.uploads[int(feed_id)] > 0
+    assert vc.delete_feed(feed_id=feed_id).status_code == 200
+
+
+def test_advanced_search(vc):
+    basic = vc.get_hosts(certainty_gte=50, threat_gte=50, page_size=5000).json()['count']
+    adv = vc.advanced_search(stype='hosts', page_size=5000, query='host.certainty:>=50 and host.threat:>=50')
+
+    assert adv.json()['count'] == basic
+
+
+def test_faults():
+    faults = Faults(throttle_rate=0.3, error_rate=0.1, retry_after=0.01)
+    with FakeBrain(hosts=100, detections=0, faults=faults) as brain:
+        vc = vectra.VectraClient(url=brain.url, token=brain.token, retry=RetryPolicy(retries=10, backoff=0.01))
+        ids = [h['id'] for page in vc.get_all_hosts(page_size=10) for h in page.results]
+
+        assert ids == list(range(1, 101))
+        assert brain.stats()['statuses'][429] > 0
+
+
+def test_search_scans_once():
+    with FakeBrain(hosts=50, detections=500) as brain:
+        vc = vectra.VectraClient(url=brain.url, token=brain.token)
+        generate = brain.data.detection
+        generated = []
+        brain.data.detection = lambda i, **kwargs: generated.append(i) or generate(i, **kwargs)
+
+        query = 'detection.threat:>=50'
+        ids = [d['id'] for d in vc.iter_advanced_search(stype='detections', query=query, page_size=20)]
+        assert len(ids) > 100
+        # one scan for the match, then only the detections returned on each page
+        assert len(generated) == 500 + len(ids)
+
+        # writes clear cached matches
+        brain.update_detection(ids[0], threat=0)
+        again = vc.advanced_search(stype='detections', query=query, page_size=5000).json()['results']
+        assert [d['id'] for d in again] == ids[1:]
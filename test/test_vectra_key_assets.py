@@ -0,0 +1,64 @@
+import importlib.util
+import os
+import pytest
+import requests
+import sys
+import vat.vectra as vectra
+
+from vat.fakebrain import FakeBrain
+
+requests.packages.urllib3.disable_warnings()
+
+SCRIPT = os.path.join(os.path.dirname(__file__), '..', 'scripts', 'key_assets.py')
+
+
+@pytest.fixture
+def brain():
+    # key asset flags written by these tests stay on the brain, so each test gets its own
+    with FakeBrain(hosts=50, detections=100) as brain:
+        yield brain
+
+
+@pytest.fixture
+def vc(brain):
+    return vectra.VectraClient(url=brain.url, token=brain.token)
+
+
+def key_assets(vc):
+    return set(host['id'] for host in vc.iter_hosts(is_key_asset=True, page_size=5000))
+
+
+def test_key_assets_bulk(vc):
+    host_ids = [7, 9999, 3, 12]
+
+    results = vc.set_key_assets(host_ids=host_ids, set=True, max_workers=4)
+
+    assert [result.id for result in results] == host_ids
+    assert [(result.success, result.status_code) for result in results] == [(True, 200), (False, 404), (True, 200),
+                                                                            (True, 200)]
+    assert isinstance(results[1].error, vectra.HTTPException)
+    assert all(result.error is None and result.latency >= 0 for result in results if result.success)
+    assert {3, 7, 12} <= key_assets(vc)
+
+    results = vc.set_key_assets(host_ids=[3, 7], set=False)
+    assert all(result.success for result in results)
+    assert not {3, 7} & key_assets(vc)
+
+
+def test_script_file(vc, tmpdir, monkeypatch, capsys):
+    spec = importlib.util.spec_from_file_location('key_assets', SCRIPT)
+    script = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(script)
+
+    names = [vc.get_host_by_id(host_id=host_id).json()['name'] for host_id in (4, 5)]
+    targets = tmpdir.join('hosts.txt')
+    targets.write('\n'.join(names + ['no-such-host', '']))
+    monkeypatch.setattr(sys, 'argv', ['key_assets.py', 'hostname', '--url', vc.url[:-len('/api/v2')],
+                                      '--token', 'token', '--file', str(targets)])
+
+    script.main()
+
+    output = capsys.readouterr().out
+    assert 'no-such-host is not present in Vectra' in output
+    assert all('Successfully set host {} as key asset'.format(name) in output for name in names)
+    assert {4, 5} <= key_assets(vc)
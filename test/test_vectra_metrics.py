@@ -0,0 +1,103 @@
+import pytest
+import requests
+import vat.vectra as vectra
+
+from vat.cache import ResponseCache
+from vat.fakebrain import FakeBrain, Faults
+from vat.metrics import MetricsRegistry, endpoint_template
+from vat.throttle import RetryPolicy
+
+requests.packages.urllib3.disable_warnings()
+
+
+@pytest.fixture
+def vc_metrics(fake_brain):
+    return vectra.VectraClient(url=fake_brain.url, token=fake_brain.token, metrics=True, cache=ResponseCache())
+
+
+@pytest.mark.parametrize('path,endpoint', [
+    ('/hosts', '/hosts'),
+    ('/hosts/12', '/hosts/{id}'),
+    ('/tagging/detection/3/', '/tagging/detection/{id}'),
+    ('https://brain/api/v2/detections?page=2&page_size=50', '/detections'),
+    ('https://brain/api/rules/7', '/rules/{id}'),
+    ('/search/hosts/?page_size=50&query_string=host.threat:>50', '/search/hosts'),
+])
+def test_endpoint_template(path, endpoint):
+    assert endpoint_template(path) == endpoint
+
+
+def test_histogram_buckets():
+    registry = MetricsRegistry(latency_buckets=(0.1, 1))
+    for seconds in (0.05, 0.1, 0.5, 2):
+        registry.observe('request_duration_seconds', ('GET', '/hosts'), seconds)
+
+    histogram = registry.get('request_duration_seconds', endpoint='/hosts')
+    assert histogram['count'] == 4
+    assert histogram['sum'] == pytest.approx(2.65)
+    assert histogram['buckets'] == [(0.1, 2), (1, 3), (float('inf'), 4)]
+
+
+def test_get_sums_labels():
+    registry = MetricsRegistry()
+    registry.inc('requests_total', ('GET', '/hosts', '200'), 2)
+    registry.inc('requests_total', ('GET', '/hosts/{id}', '404'))
+
+    assert registry.get('requests_total') == 3
+    assert registry.get('requests_total', status='404') == 1
+    assert registry.get('requests_total', endpoint='/rules') == 0
+    with pytest.raises(ValueError):
+        registry.get('requests_total', host='brain')
+
+
+def test_prometheus_format():
+    registry = MetricsRegistry(latency_buckets=(0.5,))
+    registry.inc('requests_total', ('GET', '/search/"hosts"', '200'))
+    registry.observe('request_duration_seconds', ('GET', '/hosts'), 0.25)
+    text = registry.to_prometheus()
+
+    assert '# TYPE vectra_client_requests_total counter' in text
+    assert 'vectra_client_requests_total{endpoint="/search/\\"hosts\\"",method="GET",status="200"} 1' in text
+    assert 'vectra_client_request_duration_seconds_bucket{endpoint="/hosts",le="0.5",method="GET"} 1' in text
+    assert 'vectra_client_request_duration_seconds_bucket{endpoint="/hosts",le="+Inf",method="GET"} 1' in text
+    assert 'vectra_client_request_duration_seconds_count{endpoint="/hosts",method="GET"} 1' in text
+
+
+def test_client_request_metrics(vc_metrics):
+    pages = list(vc_metrics.get_all_hosts(page_size=50))
+    for page in pages:
+        page.json()
+    vc_metrics.get_host_by_id(host_id=1)
+    vc_metrics.get_host_by_id(host_id=1)
+    with pytest.raises(vectra.HTTPException):
+        vc_metrics.get_host_by_id(host_id=99999)
+    metrics = vc_metrics.metrics
+
+    assert metrics.get('requests_total', endpoint='/hosts', status='200') == len(pages)
+    assert metrics.get('requests_total', endpoint='/hosts/{id}', status='200') == 1
+    assert metrics.get('requests_total', endpoint='/hosts/{id}', status='404') == 1
+    assert metrics.get('cache_requests_total', endpoint='/hosts/{id}', result='hit') == 1
+    assert metrics.get('pages_total', endpoint='/hosts') == len(pages)
+    assert metrics.get('decode_duration_seconds', endpoint='/hosts')['count'] == len(pages)
+    assert metrics.get('request_duration_seconds', method='GET')['count'] == len(pages) + 2
+    assert metrics.get('response_bytes', endpoint='/hosts')['sum'] == sum(len(page.content) for page in pages)
+    assert 'vectra_client_pages_total{endpoint="/hosts"}' in metrics.to_prometheus()
+
+
+def test_client_retry_metrics():
+    with FakeBrain(hosts=5, detections=5, faults=Faults(error_rate=0.5, seed=1)) as brain:
+        client = vectra.VectraClient(url=brain.url, token=brain.token, metrics=MetricsRegistry(),
+                                     retry=RetryPolicy(retries=20, backoff=0))
+        for _ in range(10):
+            assert client.get_detections().status_code == 200
+
+    metrics = client.metrics
+    assert metrics.get('requests_total', status='200') == 10
+    assert metrics.get('retries_total', endpoint='/detections') == metrics.get('requests_total', status='503') > 0
+
+
+def test_metrics_disabled(vc_fake):
+    page = next(vc_fake.get_all_hosts(page_size=10))
+
+    assert vc_fake.metrics is None
+    assert page._on_decode is None
@@ -0,0 +1,68 @@
+import json
+import pytest
+import requests
+
+from vat.page import BACKENDS, Page, get_loads
+
+requests.packages.urllib3.disable_warnings()
+
+
+class Response(object):
+    status_code = 200
+
+    def __init__(self, body):
+        self.content = json.dumps(body).encode('utf-8')
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+
+def counting(loads):
+    calls = []
+
+    def wrapper(data):
+        calls.append(type(data))
+        return loads(data)
+    return wrapper, calls
+
+
+def test_page_decodes_once():
+    loads, calls = counting(json.loads)
+    page = Page(Response({'count': 1, 'next': None, 'results': [{'id': 1}]}), loads=loads)
+
+    assert page.json()['results'] == [{'id': 1}]
+    assert page.results == [{'id': 1}]
+    assert (page.count, page.next) == (1, None)
+    assert page.status_code == 200
+    assert calls == [bytes]
+
+
+def test_page_text_decode():
+    loads, calls = counting(json.loads)
+    page = Page(Response({'results': []}), loads=loads, raw=False)
+
+    assert page.results == []
+    assert calls == [type(u'')]
+
+
+@pytest.mark.parametrize('backend', list(BACKENDS))
+def test_backends(backend):
+    try:
+        loads = get_loads(backend)
+    except ImportError:
+        pytest.skip('{} is not installed'.format(backend))
+
+    assert loads(b'{"results": [{"name": "h\\u00e9"}]}') == {'results': [{'name': u'h\u00e9'}]}
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_loads('yaml')
+
+
+def test_generator_pages(vc_fake):
+    pages = list(vc_fake.get_all_hosts(page_size=10))
+
+    assert all(isinstance(page, Page) for page in pages)
+    assert sum(len(page.results) for page in pages) == pages[0].count
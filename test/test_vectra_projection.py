@@ -0,0 +1,110 @@
+import json
+import pytest
+import requests
+
+from vat.projection import Projection
+
+requests.packages.urllib3.disable_warnings()
+
+
+class Page(object):
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class Client(object):
+    """
+    Minimal client serving hosts with the fields parameter applied
+    """
+
+    def __init__(self, hosts, page_size=2):
+        self.hosts = hosts
+        self.page_size = page_size
+        self.requests = []
+
+    def _project(self, host, fields):
+        return dict((k, v) for k, v in host.items() if not fields or k in fields.split(','))
+
+    def get_hosts(self, page=1, fields=None, **kwargs):
+        self.requests.append(('hosts', page, fields))
+        start = (page - 1) * self.page_size
+        results = [self._project(host, fields) for host in self.hosts[start:start + self.page_size]]
+        return Page({'results': results, 'next': 'next' if start + self.page_size < len(self.hosts) else None})
+
+    def get_host_by_id(self, host_id=None, fields=None):
+        self.requests.append(('host', host_id, fields))
+        return Page(self._project(self.hosts[host_id - 1], fields))
+
+
+HOSTS = [{'id': i, 'name': 'host-%d' % i, 'note': 'note-%d' % i, 'detection_set': list(range(i))}
+         for i in range(1, 6)]
+
+
+def test_projection_learns_fields(tmpdir):
+    path = str(tmpdir.join('hosts.json'))
+    client = Client(HOSTS)
+    projection = Projection(path=path)
+
+    names = [host['name'] for host in projection.iter_hosts(client)]
+
+    assert names == [host['name'] for host in HOSTS]
+    assert [fields for kind, page, fields in client.requests] == [None, 'id,name', 'id,name']
+    assert json.load(open(path)) == ['name']
+
+
+def test_projection_refetch_on_miss(tmpdir):
+    client = Client(HOSTS)
+    projection = Projection(fields=['name'])
+
+    notes = [host['note'] if host['id'] > 2 else None for host in projection.iter_hosts(client)]
+
+    assert notes == [None, None] + [host['note'] for host in HOSTS[2:]]
+    # hosts 3 and 4 were requested on the same page before note was read
+    assert projection.misses == 2
+    assert ('host', 4, 'id,name,note') in client.requests
+    assert client.requests[-1] == ('hosts', 3, 'id,name,note')
+
+
+def test_projection_persisted(tmpdir):
+    path = str(tmpdir.join('hosts.json'))
+    Projection(path=path, fields=['name', 'note']).save()
+    client = Client(HOSTS)
+
+    list(Projection(path=path).iter_hosts(client))
+
+    assert client.requests[0] == ('hosts', 1, 'id,name,note')
+
+
+def test_projection_brain(vc_fake, tmpdir):
+    projection = Projection(path=str(tmpdir.join('hosts.json')))
+    names = [host['name'] for host in vc_fake.get_all_hosts(page_size=10, projection=projection)]
+
+    assert names == [host['name'] for host in vc_fake.iter_hosts(page_size=10)]
+    assert projection.query() == 'id,name'
+
+
+def test_projection_whole_entity(tmpdir):
+    path = str(tmpdir.join('hosts.json'))
+    client = Client(HOSTS)
+    projection = Projection(path=path, fields=['name'])
+
+    dumped = [json.dumps(host, sort_keys=True) for host in projection.iter_hosts(client)]
+
+    assert dumped == [json.dumps(host, sort_keys=True) for host in HOSTS]
+    # both hosts of the first page are fetched again, later pages are requested with every field
+    assert projection.misses == 2
+    assert client.requests[-1] == ('hosts', 3, None)
+    assert Projection(path=path).query() is None
+
+
+@pytest.mark.parametrize('read', [lambda host: sorted(host.items()), lambda host: sorted(host.values(), key=str),
+                                  lambda host: sorted(host), lambda host: sorted(host.keys()), len, dict,
+                                  lambda host: host.copy()])
+def test_projection_whole_entity_access(read):
+    client = Client(HOSTS)
+    hosts = list(Projection(fields=['name']).iter_hosts(client))
+
+    assert [read(host) for host in hosts] == [read(host) for host in HOSTS]
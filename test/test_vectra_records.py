@@ -0,0 +1,86 @@
+import pickle
+import pytest
+
+from vat.records import Detection, Host, records
+
+
+DETECTION = {
+    'id': 1,
+    'type_vname': 'Hidden HTTP Tunnel',
+    'category': 'COMMAND & CONTROL',
+    'state': 'active',
+    'threat': 40,
+    'tags': ['pytest'],
+    'src_host': {'id': 7, 'name': 'host-7'},
+    'detection_detail_set': [{'dst_ip': '1.1.1.1'}],
+}
+
+
+def test_fields():
+    detection = Detection(DETECTION)
+
+    assert detection.id == 1
+    assert detection['threat'] == 40
+    assert detection.tags == ('pytest',)
+    assert detection.get('note') is None
+    assert 'note' not in detection
+    with pytest.raises(AttributeError):
+        detection.note
+    with pytest.raises(KeyError):
+        detection['note']
+
+
+def test_lazy_nested_fields():
+    detection = Detection(DETECTION)
+
+    assert not isinstance(detection._nested, dict)
+    assert detection.detection_detail_set == [{'dst_ip': '1.1.1.1'}]
+    assert detection['src_host']['id'] == 7
+    assert isinstance(detection._nested, dict)
+
+
+def test_interned_strings():
+    first = Detection(dict(DETECTION, type_vname=''.join(['Hidden ', 'HTTP Tunnel'])))
+    second = Detection(dict(DETECTION, type_vname=''.join(['Hidden HTTP ', 'Tunnel'])))
+
+    assert first.type_vname is second.type_vname
+
+
+def test_round_trip():
+    detection = Detection(DETECTION)
+
+    assert detection.to_dict() == DETECTION
+    assert pickle.loads(pickle.dumps(detection)) == detection
+    assert not hasattr(detection, '__dict__')
+
+
+def test_records_from_pages():
+    pages = [{'results': [{'id': 1, 'name': 'a'}]}, {'results': [{'id': 2, 'name': 'b', 'detection_set': []}]}]
+    hosts = list(records(Host, pages))
+
+    assert [host.name for host in hosts] == ['a', 'b']
+    assert hosts[1].detection_set == []
+
+
+def test_host_records_from_client(vc_fake):
+    hosts = [host for page in vc_fake.get_all_hosts(page_size=30) for host in page.json()['results']]
+    host_records = list(vc_fake.get_all_hosts(page_size=30, as_records=True))
+
+    assert [record.id for record in host_records] == [host['id'] for host in hosts]
+    assert [record.to_dict() for record in host_records] == hosts
+    assert host_records[0]['detection_set'] == hosts[0]['detection_set']
+
+
+def test_detection_records_from_client(vc_fake):
+    detections = [det for page in vc_fake.get_all_detections(page_size=300) for det in page.json()['results']]
+    detection_records = list(vc_fake.get_all_detections(page_size=300, max_workers=4, as_records=True))
+
+    record, detection = detection_records[-1], detections[-1]
+    # nested fields stay serialized until first read
+    assert not isinstance(record._nested, dict)
+    assert record.detection_detail_set == detection['detection_detail_set']
+    assert record['src_host'] == detection['src_host']
+    assert isinstance(record._nested, dict)
+
+    assert all(isinstance(record, Detection) for record in detection_records)
+    assert [record.to_dict() for record in detection_records] == detections
@@ -0,0 +1,174 @@
+import pytest
+import requests
+import vat.vectra as vectra
+
+from vat.fakebrain import FakeBrain
+from vat.rules import RuleCatalog, RuleChange, RuleReconciler, format_plan, load_rules
+
+requests.packages.urllib3.disable_warnings()
+
+
+@pytest.fixture
+def brain():
+    # more rules than the default page size of 50
+    with FakeBrain(hosts=10, detections=10, rules=120) as brain:
+        yield brain
+
+
+@pytest.fixture
+def vc(brain):
+    return vectra.VectraClient(url=brain.url, token=brain.token)
+
+
+def create(vc, name):
+    return vc.create_rule(detection_category='reconnaissance', detection_type='port scan',
+                          triage_category='misconfiguration', description=name, all_hosts=True)
+
+
+def test_load_every_page(vc):
+    catalog = RuleCatalog(vc, page_size=50)
+
+    assert catalog.load() == 120
+    assert [rule['id'] for rule in catalog] == list(range(1, 121))
+
+
+def test_get_rules_by_name_beyond_first_page(vc):
+    assert vc.get_rules(name='rule-00110')['id'] == 110
+    assert vc.get_rules(name='rule-00005')['id'] == 5
+    assert vc.rule_catalog.loads == 1
+
+
+def test_missing_name_reloads_once(vc, brain):
+    catalog = vc.rule_catalog
+    catalog.load()
+    brain.rules[500] = dict(brain.rules[1], id=500, description='created elsewhere')
+
+    assert catalog.find('created elsewhere')['id'] == 500
+    assert catalog.find('never created') is None
+    assert catalog.loads == 3
+
+
+def test_writes_update_catalog(vc):
+    catalog = vc.rule_catalog
+    catalog.load()
+    rule_id = create(vc, 'pytest rule').json()['id']
+
+    assert catalog.id_for('pytest rule') == rule_id
+    assert vc.update_rule(name='pytest rule', append=True, remote1_port=['443']).status_code == 200
+    assert catalog.get(rule_id)['remote1_port'] == ['443']
+
+    vc.delete_rule(rule_id=rule_id)
+    assert catalog.find_all('pytest rule') == []
+    assert catalog.loads == 1
+
+
+def test_duplicate_names(vc):
+    first = create(vc, 'dup').json()['id']
+    second = create(vc, 'dup').json()['id']
+
+    assert vc.get_rules(name='dup')['id'] == first
+    assert [rule['id'] for rule in vc.rule_catalog.find_all('dup')] == [first, second]
+
+
+def test_ttl(vc):
+    now = [0]
+    catalog = RuleCatalog(vc, ttl=60, clock=lambda: now[0])
+    len(catalog)
+    now[0] = 59
+    catalog.get(1)
+    now[0] = 60
+    catalog.get(1)
+
+    assert catalog.loads == 2
+
+
+def test_update_unknown_name(vc):
+    with pytest.raises(ValueError):
+        vc.update_rule(name='no such rule', ip=['10.0.0.1'])
+
+
+def desired_state(brain, count=120):
+    rules = []
+    for rule_id in range(1, count + 1):
+        rule = brain.rules[rule_id]
+        rules.append({'name': rule['description'], 'detection_category': rule['detection_category'].upper(),
+                      'detection_type': rule['detection'], 'triage_category': rule['triage_category'],
+                      'is_whitelist': rule['is_whitelist'], 'ip': list(reversed(rule['ip'])),
+                      'remote1_dns': rule['remote1_dns']})
+    return rules
+
+
+def test_reconcile_no_changes(vc, brain):
+    assert RuleReconciler(vc).plan(desired_state(brain)) == []
+
+
+def test_reconcile(brain):
+    client = vectra.VectraClient(url=brain.url, token=brain.token, metrics=True)
+    desired = desired_state(brain, count=100)
+    desired[0]['remote1_dns'] = ['changed.example.com']
+    desired[1]['host'] = [3, 4]
+    desired.append({'name': 'new rule', 'detection_category': 'reconnaissance', 'detection_type': 'port scan',
+                    'triage_category': 'backup', 'ip': ['10.0.0.9']})
+
+    reconciler = RuleReconciler(client, prune=True)
+    changes = reconciler.plan(desired)
+    assert [(c.action, c.name) for c in changes[:3]] == [('create', 'new rule'), ('update', 'rule-00001'),
+                                                          ('update', 'rule-00002')]
+    assert changes[1].changes == {'remote1_dns': (brain.rules[1]['remote1_dns'], ['changed.example.com'])}
+    assert set(c.rule_id for c in changes[3:]) == set(range(101, 121))
+    assert 'remote1_dns: ' in format_plan(changes)
+
+    results = reconciler.apply(changes)
+    assert all(result.success for result in results)
+    assert RuleReconciler(client, prune=True).plan(desired) == []
+    assert brain.rules[2]['host'][0].endswith('/hosts/3')
+    # two list passes and one write per change
+    assert client.metrics.get('requests_total') == 2 + len(changes)
+
+
+def test_reconcile_invalid_rule(vc):
+    with pytest.raises(ValueError):
+        RuleReconciler(vc).plan([{'name': 'bad', 'detection_category': 'unknown', 'detection_type': 'x',
+                                  'triage_category': 'y', 'all_hosts': True}])
+
+
+def test_load_rules(tmpdir):
+    path = tmpdir.join('rules.json')
+    path.write('{"rules": [{"name": "a"}]}')
+
+    assert load_rules(str(path)) == [{'name': 'a'}]
+
+
+def test_reconcile_duplicates(vc, brain):
+    first = create(vc, 'rule-00001').json()['id']
+    second = create(vc, 'rule-00001').json()['id']
+    desired = desired_state(brain)
+
+    with pytest.raises(ValueError) as e:
+        RuleReconciler(vc).plan(desired)
+    assert '(id {})'.format(first) in str(e.value) and '(id {})'.format(second) in str(e.value)
+
+    changes = RuleReconciler(vc, prune=True).plan(desired)
+    assert [(c.action, c.rule_id) for c in changes] == [('delete', first), ('delete', second)]
+    RuleReconciler(vc, prune=True).apply(changes)
+    assert RuleReconciler(vc, prune=True).plan(desired) == []
+
+
+def test_reconcile_invalid_update(vc, brain):
+    desired = desired_state(brain, count=1)
+    desired[0]['detection_category'] = 'unknown'
+
+    with pytest.raises(ValueError):
+        RuleReconciler(vc).plan(desired)
+
+
+def test_reconcile_failed_writes(vc, brain):
+    changes = [RuleChange('delete', 'gone', 999, {}, {}),
+               RuleChange('update', 'rule-00001', 998, {}, dict(brain.rules[1], id=998)),
+               RuleChange('delete', 'rule-00002', 2, {}, brain.rules[2])]
+
+    results = RuleReconciler(vc).apply(changes)
+
+    assert [(r.success, r.status_code) for r in results] == [(False, 404), (False, 404), (True, 200)]
+    assert isinstance(results[0].error, vectra.HTTPException)
+    assert 2 not in brain.rules
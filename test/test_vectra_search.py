@@ -0,0 +1,89 @@
+import pytest
+import requests
+import vat.vectra as vectra
+
+from vat.search import SearchCache, normalize_query, query_fingerprint
+
+requests.packages.urllib3.disable_warnings()
+
+QUERY = 'detection.certainty:>=50 OR detection.threat:>=50'
+
+
+def test_query_encoding(vc_fake):
+    # unencoded, & and # would end the query after the first term
+    resp = vc_fake.advanced_search(stype='hosts', query='host.name:"a&b#c" OR host.state:"active"')
+
+    assert resp.json()['count'] == vc_fake.get_hosts(state='active').json()['count']
+
+
+def test_advanced_search_page(vc_fake):
+    first = vc_fake.advanced_search(stype='detections', page_size=20, query=QUERY).json()
+    second = vc_fake.advanced_search(stype='detections', page_size=20, query=QUERY, page=2).json()
+
+    assert first['count'] > 40
+    assert len(second['results']) == 20
+    assert second['results'][0]['id'] > first['results'][-1]['id']
+
+
+@pytest.mark.parametrize('max_workers,ordered', [(None, True), (4, True), (4, False)])
+def test_iter_advanced_search(vc_fake, max_workers, ordered):
+    expected = vc_fake.advanced_search(stype='detections', page_size=5000, query=QUERY).json()['results']
+    results = list(vc_fake.iter_advanced_search(stype='detections', query=QUERY, page_size=30,
+                                                max_workers=max_workers, ordered=ordered))
+
+    if ordered:
+        assert [r['id'] for r in results] == [r['id'] for r in expected]
+    else:
+        assert sorted(r['id'] for r in results) == sorted(r['id'] for r in expected)
+
+
+def test_iter_advanced_search_validation(vc_fake):
+    with pytest.raises(ValueError):
+        vc_fake.iter_advanced_search(stype='rules', query=QUERY)
+
+
+@pytest.mark.parametrize('query,normalized', [
+    ('host.threat:>=50  and\thost.certainty:>=50', 'host.certainty:>=50 AND host.threat:>=50'),
+    ('(host.certainty:>=50) AND host.threat:>=50', 'host.certainty:>=50 AND host.threat:>=50'),
+    ('b:1 or a:1 and (d:1 OR c:1)', '(c:1 OR d:1) AND a:1 OR b:1'),
+    ('a:1 OR (b:1 OR a:1)', 'a:1 OR b:1'),
+    ('not (b:1 or a:1)', 'NOT (a:1 OR b:1)'),
+    ('host.name: "Host  A" and host.state:active', 'host.name:"Host  A" AND host.state:active'),
+    ('a:1 b:1', 'a:1 b:1'),
+    ('a:"unterminated  or', 'a:"unterminated or'),
+])
+def test_normalize_query(query, normalized):
+    assert normalize_query(query) == normalized
+
+
+def test_fingerprint():
+    assert query_fingerprint('a:1 and b:[1 TO 5]') == query_fingerprint('b:[1 TO 5] AND  a:1')
+    assert query_fingerprint('a:1 AND b:1') != query_fingerprint('a:1 OR b:1')
+    assert query_fingerprint('a:"x"') != query_fingerprint('a:"X"')
+
+
+def test_search_cache_expiry():
+    now = [0]
+    cache = SearchCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.store('hosts', 'a:1 AND b:1', 50, None, 'page 1')
+
+    assert cache.lookup('hosts', 'b:1 and a:1', 50) == 'page 1'
+    assert cache.lookup('hosts', 'b:1 and a:1', 50, page=2) is None
+    assert cache.lookup('detections', 'a:1 AND b:1', 50) is None
+    now[0] = 10
+    assert cache.lookup('hosts', 'a:1 AND b:1', 50) is None
+    assert cache.stats()['normalized_hits'] == 1
+    assert cache.stats()['expirations'] == 1
+
+
+def test_client_search_cache(fake_brain):
+    client = vectra.VectraClient(url=fake_brain.url, token=fake_brain.token, search_cache=True)
+    first = client.advanced_search(stype='detections', query=QUERY)
+    again = client.advanced_search(stype='detections', query='detection.threat:>=50 or  detection.certainty:>=50')
+
+    assert again is first
+    assert client.advanced_search(stype='detections', query=QUERY, page_size=10) is not first
+    assert client.search_cache.stats()['hits'] == 1
+
+    client.set_detection_tags(detection_id=first.json()['results'][0]['id'], tags=['pytest'])
+    assert client.advanced_search(stype='detections', query=QUERY) is not first
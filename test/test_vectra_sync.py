@@ -0,0 +1,100 @@
+import pytest
+import requests
+import sqlite3
+import vat.vectra as vectra
+
+from vat.fakebrain import FakeBrain
+from vat.sync import SyncEngine
+
+requests.packages.urllib3.disable_warnings()
+
+
+@pytest.fixture
+def brain():
+    with FakeBrain(hosts=100, detections=400) as brain:
+        yield brain
+
+
+@pytest.fixture
+def vc(brain):
+    return vectra.VectraClient(url=brain.url, token=brain.token)
+
+
+@pytest.fixture
+def clock():
+    return [0]
+
+
+@pytest.fixture
+def engine(vc, tmpdir, clock):
+    return SyncEngine(vc, path=str(tmpdir.join('vectra.db')), page_size=20, full_sync_interval=3600,
+                      clock=lambda: clock[0])
+
+
+def test_full_sync(vc, engine):
+    counts = engine.sync()
+
+    assert counts['hosts'] == vc.get_hosts().json()['count']
+    assert counts['detections'] == vc.get_detections().json()['count']
+    assert engine.cursor('hosts') is not None
+    assert engine.cursor('detections') is not None
+
+
+def test_delta_sync(brain, engine):
+    first = engine.sync_hosts()
+    cursor = engine.cursor('hosts')
+    # the host at the cursor is seen again by every delta sync, timestamps are compared inclusively
+    newest = [h['id'] for h in engine.find_hosts() if h['last_detection_timestamp'] == cursor]
+    host = min(engine.find_hosts(), key=lambda h: h['last_detection_timestamp'])
+    brain.update_host(host['id'], name='pytest-changed', last_detection_timestamp='2030-01-01T00:00:00Z')
+
+    upserted = []
+    host_row = engine._host_row
+    engine._host_row = lambda entity: upserted.append(entity['id']) or host_row(entity)
+    delta = engine.sync_hosts()
+
+    assert delta < first
+    assert sorted(upserted) == sorted([host['id']] + newest)
+    assert engine.get_host(host['id'])['name'] == 'pytest-changed'
+    assert engine.cursor('hosts') == '2030-01-01T00:00:00Z' > cursor
+
+
+def test_lookups(vc, engine):
+    engine.sync_hosts()
+    host = vc.get_hosts().json()['results'][0]
+
+    assert engine.get_host(host['id'])['name'] == host['name']
+    assert host['id'] in [h['id'] for h in engine.find_hosts(name=host['name'])]
+    assert all(h['state'] == 'active' for h in engine.find_hosts(state='active'))
+
+
+def test_periodic_full_sync(brain, engine, clock):
+    engine.sync_hosts()
+    # a host whose last detection is older than the cursor, so delta syncs stop before it
+    host = min((h for h in engine.find_hosts() if h['last_detection_timestamp']),
+               key=lambda h: h['last_detection_timestamp'])
+    state = 'inactive' if host['state'] == 'active' else 'active'
+    brain.update_host(host['id'], state=state)
+
+    clock[0] = 3599
+    engine.sync_hosts()
+    assert engine.get_host(host['id'])['state'] != state
+
+    clock[0] = 3600
+    assert engine.full_sync_due('hosts')
+    assert engine.sync_hosts() == 100
+    assert engine.get_host(host['id'])['state'] == state
+    assert not engine.full_sync_due('hosts')
+
+
+def test_mirror_without_full_sync_column(vc, tmpdir):
+    path = str(tmpdir.join('vectra.db'))
+    db = sqlite3.connect(path)
+    db.execute('CREATE TABLE sync_state (entity TEXT PRIMARY KEY, cursor TEXT, synced_at REAL)')
+    db.execute("INSERT INTO sync_state VALUES ('hosts', '2019-01-01T00:00:00Z', 0)")
+    db.commit()
+    db.close()
+
+    engine = SyncEngine(vc, path=path)
+    assert engine.full_sync_due('hosts')
+    assert engine.sync_hosts() == 100
@@ -0,0 +1,72 @@
+import pytest
+import requests
+import vat.vectra as vectra
+
+from vat.fakebrain import FakeBrain
+from vat.tags import TagManager
+
+requests.packages.urllib3.disable_warnings()
+
+
+@pytest.fixture
+def brain():
+    # tags written by these tests stay on the brain, so each test gets its own
+    with FakeBrain(hosts=50, detections=100) as brain:
+        yield brain
+
+
+@pytest.fixture
+def vc(brain):
+    return vectra.VectraClient(url=brain.url, token=brain.token)
+
+
+def test_load(vc):
+    tm = TagManager(vc, entity_type='host')
+    count = tm.load(vc.get_all_hosts(fields='id,tags'))
+
+    assert count == vc.get_hosts().json()['count']
+    assert len(tm) == count
+
+
+def test_append_remove(vc):
+    host = vc.get_hosts().json()['results'][0]
+    host_id = host['id']
+    host_tags = host['tags']
+
+    tm = TagManager(vc, entity_type='host')
+    tm.load([host])
+
+    tm.append(host_id, ['pytest'])
+    assert vc.get_host_tags(host_id=host_id).json()['tags'] == host_tags + ['pytest']
+    assert tm.append(host_id, ['pytest']) is None
+
+    tm.remove(host_id, ['pytest'])
+    assert vc.get_host_tags(host_id=host_id).json()['tags'] == host_tags
+    assert tm.conflicts == 0
+
+
+def test_detection_append_many(vc):
+    detections = vc.get_detections(page_size=3).json()['results']
+    detection_ids = [det['id'] for det in detections]
+
+    tm = TagManager(vc, entity_type='detection')
+    tm.load(detections)
+
+    results = tm.append_many(detection_ids, ['pytest'])
+    assert all(result.success for result in results)
+    assert all('pytest' in vc.get_detection_tags(detection_id=det_id).json()['tags'] for det_id in detection_ids)
+
+    tm.remove_many(detection_ids, ['pytest'])
+    for det in detections:
+        assert vc.get_detection_tags(detection_id=det['id']).json()['tags'] == det['tags']
+
+
+def test_append_without_read(vc, brain):
+    tm = TagManager(vc, entity_type='host')
+    tm.load(vc.get_all_hosts(fields='id,tags'))
+    requests_before = brain.requests
+
+    tm.append(1, ['pytest'])
+
+    assert brain.requests == requests_before + 1
+    assert 'pytest' in vc.get_host_tags(host_id=1).json()['tags']
@@ -0,0 +1,26 @@
+import requests
+import vat.vectra as vectra
+
+from vat.fakebrain import FakeBrain, Faults
+from vat.throttle import RetryPolicy, parse_retry_after
+
+requests.packages.urllib3.disable_warnings()
+
+
+def test_delay_honours_retry_after():
+    policy = RetryPolicy(backoff=0.5, max_backoff=30)
+
+    assert all(60 <= policy.delay(attempt, parse_retry_after('60')) <= 75 for attempt in range(5))
+    assert all(policy.delay(attempt) <= 30 for attempt in range(10))
+
+
+def test_client_waits_retry_after(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(vectra.time, 'sleep', sleeps.append)
+    faults = Faults(throttle_rate=0.5, retry_after=60)
+    with FakeBrain(hosts=20, detections=0, faults=faults) as brain:
+        vc = vectra.VectraClient(url=brain.url, token=brain.token, retry=RetryPolicy(retries=20))
+        ids = [h['id'] for page in vc.get_all_hosts(page_size=5) for h in page.results]
+
+    assert ids == list(range(1, 21))
+    assert sleeps and all(seconds >= 60 for seconds in sleeps)
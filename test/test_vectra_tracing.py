@@ -0,0 +1,117 @@
+import io
+import json
+import pytest
+import requests
+import vat.vectra as vectra
+
+from vat.tracing import ChromeTraceExporter, JSONLinesExporter, Tracer, open_tracer, span, traced
+
+requests.packages.urllib3.disable_warnings()
+
+
+class ListExporter(object):
+    def __init__(self):
+        self.spans = []
+        self.closed = False
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def exporter():
+    return ListExporter()
+
+
+def test_nested_spans(exporter):
+    tracer = Tracer([exporter])
+    with tracer.span('outer', rows=2) as outer:
+        with tracer.span('inner') as inner:
+            inner.set(status=200)
+        tracer.record('decode', inner.start, inner.end, category='decode')
+
+    assert [s.name for s in exporter.spans] == ['inner', 'decode', 'outer']
+    assert inner.parent_id == outer.span_id
+    assert exporter.spans[1].parent_id == outer.span_id
+    assert outer.parent_id is None
+    assert outer.attrs == {'rows': 2} and inner.attrs == {'status': 200}
+    assert outer.start <= inner.start <= inner.end <= outer.end
+
+
+def test_span_error(exporter):
+    tracer = Tracer([exporter])
+    with pytest.raises(KeyError):
+        with tracer.span('lookup'):
+            raise KeyError('id')
+
+    assert exporter.spans[0].attrs == {'error': 'KeyError'}
+    with tracer.span('next') as next_span:
+        pass
+    assert next_span.parent_id is None
+
+
+def test_disabled_helpers():
+    items = [1, 2]
+
+    assert traced(None, items, 'wait') is items
+    with span(None, 'aggregate') as current:
+        current.set(rows=1)
+
+
+def test_traced_iterable(exporter):
+    tracer = Tracer([exporter])
+
+    assert list(traced(tracer, iter('ab'), 'wait')) == ['a', 'b']
+    assert [s.attrs for s in exporter.spans] == [{'index': 0}, {'index': 1}, {'index': 2, 'done': True}]
+
+
+def test_json_lines_exporter():
+    output = io.StringIO()
+    with Tracer([JSONLinesExporter(output)]) as tracer:
+        with tracer.span('page', category='page', number=1):
+            pass
+
+    line = json.loads(output.getvalue())
+    assert (line['name'], line['category'], line['attrs']) == ('page', 'page', {'number': 1})
+    assert line['end'] - line['start'] == pytest.approx(line['duration'])
+
+
+def test_chrome_trace_exporter(tmpdir):
+    path = str(tmpdir.join('trace.json'))
+    tracer = open_tracer(path)
+    with tracer.span('page', category='page'):
+        with tracer.span('GET /hosts', category='http'):
+            pass
+    tracer.close()
+
+    with open(path) as f:
+        events = json.load(f)
+    assert isinstance(tracer.exporters[0], ChromeTraceExporter)
+    assert [e['ph'] for e in events] == ['M', 'X', 'X']
+    http, page = events[1:]
+    assert http['args']['parent_id'] == page['args']['span_id']
+    assert page['ts'] <= http['ts'] and http['dur'] <= page['dur']
+
+
+def test_client_spans(fake_brain, exporter):
+    client = vectra.VectraClient(url=fake_brain.url, token=fake_brain.token, tracer=Tracer([exporter]))
+    pages = [page.json() for page in client.get_all_detections(page_size=250)]
+    spans = dict((s.span_id, s) for s in exporter.spans)
+
+    http = [s for s in exporter.spans if s.category == 'http']
+    assert [s.name for s in http] == ['GET /detections'] * len(pages)
+    assert all(s.attrs['status'] == 200 for s in http)
+    assert [spans[s.parent_id].attrs['number'] for s in http] == list(range(1, len(pages) + 1))
+    assert len([s for s in exporter.spans if s.category == 'decode']) == len(pages)
+
+
+def test_client_spans_workers(fake_brain, exporter):
+    client = vectra.VectraClient(url=fake_brain.url, token=fake_brain.token, tracer=Tracer([exporter]))
+    count = len(list(client.get_all_detections(page_size=100, max_workers=4)))
+    pages = [s for s in exporter.spans if s.category == 'page']
+
+    assert sorted(s.attrs['number'] for s in pages) == list(range(1, count + 1))
+    assert len(set(s.thread_id for s in pages)) > 1
@@ -0,0 +1,103 @@
+import email
+import io
+import os
+import pytest
+import requests
+import vat.vectra as vectra
+
+from vat.fakebrain import FakeBrain
+from vat.upload import MultipartFile, ProgressPrinter
+
+requests.packages.urllib3.disable_warnings()
+
+
+@pytest.fixture
+def brain():
+    with FakeBrain(hosts=0, detections=0) as brain:
+        yield brain
+
+
+@pytest.fixture
+def vc(brain):
+    return vectra.VectraClient(url=brain.url, token=brain.token)
+
+
+@pytest.fixture
+def stix(tmpdir):
+    path = tmpdir.join('feed.xml')
+    path.write_binary(os.urandom(3 * 1024 * 1024 + 17))
+    return str(path)
+
+
+def parse(body):
+    message = email.message_from_bytes(b'Content-Type: ' + body.content_type.encode() + b'\r\n\r\n' + body.read())
+    return message.get_payload()
+
+
+@pytest.mark.parametrize('use_mmap', [False, True])
+def test_multipart_body(stix, use_mmap):
+    with MultipartFile(stix, use_mmap=use_mmap) as body:
+        parts = parse(body)
+        assert body.tell() == len(body)
+
+    assert len(parts) == 1
+    assert parts[0].get_param('name', header='Content-Disposition') == 'file'
+    assert parts[0].get_filename() == 'feed.xml'
+    with open(stix, 'rb') as f:
+        assert parts[0].get_payload(decode=True) == f.read()
+
+
+def test_chunks_and_rewind(stix):
+    with MultipartFile(stix, chunk_size=1024 * 1024, use_mmap=True) as body:
+        chunks = list(body)
+        assert max(len(chunk) for chunk in chunks) == 1024 * 1024
+        assert sum(len(chunk) for chunk in chunks) == len(body)
+
+        body.seek(0)
+        assert b''.join(body) == b''.join(chunks)
+
+
+def test_empty_file(tmpdir):
+    path = tmpdir.join('empty.xml')
+    path.write('')
+    with MultipartFile(str(path), use_mmap=True) as body:
+        assert parse(body)[0].get_payload() == ''
+
+
+@pytest.mark.parametrize('use_mmap', [False, True])
+def test_post_stix_file(vc, brain, stix, use_mmap):
+    feed_id = vc.create_feed(name='pytest', category='cnc', certainty='Medium', itype='Watchlist',
+                             duration=14).json()['threatFeed']['id']
+    updates = []
+
+    resp = vc.post_stix_file(feed_id=feed_id, stix_file=stix, progress=updates.append, use_mmap=use_mmap)
+
+    assert resp.status_code == 200
+    assert brain.uploads[int(feed_id)] == updates[-1].total > os.path.getsize(stix)
+    assert updates[-1].sent == updates[-1].total
+    assert [update.sent for update in updates] == sorted(update.sent for update in updates)
+
+
+def test_progress_printer(stix):
+    out = io.StringIO()
+    with MultipartFile(stix, progress=ProgressPrinter(stream=out, interval=3600)) as body:
+        list(body)
+
+    lines = out.getvalue().splitlines()
+    assert len(lines) == 2
+    assert lines[-1].startswith('3.0/3.0 MiB (100%) at ')
+
+
+@pytest.mark.parametrize('chunk_size', [256 * 1024, 1024 * 1024])
+def test_post_stix_file_chunk_size(vc, brain, stix, chunk_size):
+    feed_id = vc.create_feed(name='pytest', category='cnc', certainty='Medium', itype='Watchlist',
+                             duration=14).json()['threatFeed']['id']
+    sent = [0]
+
+    vc.post_stix_file(feed_id=feed_id, stix_file=stix, chunk_size=chunk_size,
+                      progress=lambda progress: sent.append(progress.sent))
+
+    sizes = [b - a for a, b in zip(sent, sent[1:])]
+    assert sizes[:-1] == [chunk_size] * (len(sizes) - 1)
+    assert 0 < sizes[-1] <= chunk_size
+    assert brain.uploads[int(feed_id)] == sent[-1]